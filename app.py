@@ -1,12 +1,26 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, render_template, request, jsonify, session, g
+from datetime import datetime, timezone
 import sqlite3
 import os
-import pandas as pd
+import hmac
 import numpy as np
 import math
-import unicodedata
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import time
+from engine import paths
+from engine.cache import LRUCache, SharedCache
+from engine.artifacts import artifact_lock, etl_state, fit_model, load_artifacts, read_manifest, refresh_artifacts, save_artifacts, stored_digests
+from engine.analyzer import get_analyzer
+from engine.catalogue import Catalogue, SeriesTexts
+from engine.collaborative import LIKE_THRESHOLD, CooccurrenceIndex, RatingJournal
+from engine.embeddings import LSHIndex
+from engine.inverted_index import InvertedIndex
+from engine.metrics import CONTENT_TYPE, REGISTRY, SamplingProfiler, begin_request, render_gauge, stage
+from engine.model import vocabulary_terms
+from engine.recommender import Recommender
+from engine.db import ConnectionPool
+from engine.schema import TOP_RATED_SQL, UPSERT_RATING_SQL, check_schema
+from engine.snapshot import ModelReloader, ModelSnapshot
+from engine.suggest import SuggestIndex
 
 # =============================================================================
 # CONFIGURATION
@@ -14,59 +28,367 @@ from sklearn.metrics.pairwise import cosine_similarity
 app = Flask(__name__, template_folder='Interface/Html_Js', static_folder='Interface')
 app.secret_key = 'cle_secrete_projet_sae' 
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, 'database', 'series.db')
+# Base, modèle et métriques : mêmes chemins que les scripts (SERIESMINER_DATABASE_DIR, cf. engine/paths.py)
+DB_PATH = paths.DB_PATH
+ARTIFACT_DIR = paths.ARTIFACT_DIR  # Modèle pré-calculé (scripts/build_model.py)
+SEARCH_CANDIDATES = 50  # Séries candidates re-classées par les bonus de la recherche
+RECO_WEIGHT_BY_RATING = False  # Pondère les séries aimées par leur note (sinon : poids 1)
+RECO_CF_WEIGHT = 0.5  # Part du filtrage collaboratif item-item dans le score (0 : content-based seul)
+RECO_CACHE_SIZE = 4096  # Utilisateurs gardés en cache (LRU)
+RECO_CACHE_TTL = 300.0  # Durée de vie d'une recommandation en cache (secondes)
+RECO_SHARED_CACHE = None  # Cache SQLite partagé entre workers, ex. paths.database_path('cache.db')
+SEARCH_CACHE_SIZE = 2048  # Requêtes de recherche gardées en cache (LRU)
+SEARCH_CACHE_TTL = 600.0  # Durée de vie d'un résultat de recherche (secondes)
+SUGGEST_LIMIT = 8  # Suggestions renvoyées par /api/suggest (titres, puis termes)
+SEARCH_BATCH_MAX = 1000  # Requêtes au plus par appel de /api/search/batch
+SEARCH_PREFIX_MIN = 3  # Longueur minimale d'un préfixe réutilisé pendant la frappe ("bre" -> "break")
+TOP_RATED_KEY = 'top_rated'  # Entrée partagée par tous les visiteurs anonymes
+DB_POOL_SIZE = 16  # Connexions SQLite gardées ouvertes par worker
+MODEL_WATCH_INTERVAL = 30.0  # Vérification du journal de l'ETL et du modèle sur disque (None : désactivée)
+SIMILAR_TABLES = 16  # Index LSH de /api/similar : tables de hachage (rappel ↑, latence ↑)
+SIMILAR_BITS = 12  # Bits par table (cases plus petites : latence ↓, rappel ↓)
+SIMILAR_PROBES = 2  # Cases voisines visitées par table (rappel ↑, latence ↑)
+ADMIN_TOKEN = os.environ.get('SERIESMINER_ADMIN_TOKEN')  # Jeton (en-tête X-Admin-Token) des routes d'admin ; sans jeton : désactivées
+PROFILE_SAMPLE_RATE = 0.0  # Part des requêtes profilées par cProfile (0 : désactivé), ex. 0.01
+PROFILE_SLOW_SECONDS = 0.25  # Profil sauvegardé seulement si la requête a duré plus longtemps
+PROFILE_DIR = paths.database_path('profiles')  # Fichiers .prof (python -m pstats)
+ETL_METRICS_FILE = paths.ETL_METRICS_PATH  # Durées du dernier ETL (scripts/setup_etl.py)
 
 # Variables globales (Cache mémoire)
-df_series = None
-tfidf_matrix = None
-vectorizer = None
-cosine_sim_matrix = None
+db_pool = ConnectionPool(DB_PATH, max_idle=DB_POOL_SIZE)
+reco_cache = LRUCache(RECO_CACHE_SIZE, RECO_CACHE_TTL,
+                      shared=SharedCache(RECO_SHARED_CACHE, RECO_CACHE_TTL) if RECO_SHARED_CACHE else None)
+search_cache = LRUCache(SEARCH_CACHE_SIZE, SEARCH_CACHE_TTL)
+rating_journal = RatingJournal()  # Notes reçues pendant un rechargement, rejouées sur le nouvel instantané
+REQUEST_SECONDS = REGISTRY.histogram('seriesminer_http_request_duration_seconds', "Durée des requêtes HTTP par route.",
+                                     ('route', 'method', 'status'))
+profiler = SamplingProfiler(PROFILE_SAMPLE_RATE, PROFILE_SLOW_SECONDS, PROFILE_DIR)
+SEARCH_PREFIX = REGISTRY.counter('seriesminer_search_prefix_total', "Recherches servies à partir d'un préfixe en cache.",
+                                 ('mode',))  # reused : mêmes candidats ; seeded : seuil de départ
 
 # =============================================================================
 # FONCTIONS UTILITAIRES
 # =============================================================================
 
-def remove_accents(input_str):
-    """Normalise le texte (enlève les accents) pour la recherche."""
-    if not isinstance(input_str, str): return str(input_str)
-    nfkd_form = unicodedata.normalize('NFKD', input_str)
-    return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
-
 def get_db_connection():
-    """Connecte à SQLite."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Connexion SQLite (WAL) issue du pool : conn.close() la rend au pool."""
+    return db_pool.connect()
 
-def init_app():
-    """Charge le moteur IA au démarrage."""
-    global df_series, tfidf_matrix, vectorizer, cosine_sim_matrix
-    print("Démarrage du système...")
+def reco_key(user_id, snapshot=None):
+    """Clé de cache d'un utilisateur (liée au modèle : un nouveau modèle invalide tout)."""
+    snapshot = snapshot or reloader.current
+    return f"user:{user_id}:{snapshot.version}"
+
+def recommend_for_user(snapshot, user_id):
+    """Recommandations (content-based + collaboratif) d'un utilisateur connecté (liste vide s'il n'a rien aimé)."""
+    with stage('db_read'):
+        conn = get_db_connection()
+        liked = conn.execute('SELECT serie_id, rating FROM ratings WHERE user_id = ? AND rating >= ?',
+                             (user_id, LIKE_THRESHOLD)).fetchall()
+        conn.close()
+    if not liked:
+        return [] # Vide -> Incite à noter
+
+    # Séries aimées exclues des résultats
+    catalogue = snapshot.catalogue
+    rows, scores = snapshot.recommender.recommend([(r['serie_id'], r['rating']) for r in liked])
+    return [{'id': int(catalogue.ids[idx]), 'title': catalogue.titles[idx], 'score': float(round(score, 2))}
+            for idx, score in zip(rows, scores)]
+
+def normalize_query(query):
+    """
+    Requête passée par l'analyseur des documents (accents, ponctuation, mots vides) : mêmes
+    mots que le texte stocké par l'ETL. L'ordre des mots est gardé : il change les bigrammes
+    TF-IDF et le bonus du premier mot.
+    """
+    return get_analyzer().clean(query)
+
+def search_key(normalized, snapshot):
+    """Clé de cache d'une requête normalisée (liée au modèle : un rechargement invalide tout)."""
+    return f"search:{snapshot.version}:{normalized}"
+
+def prefix_entry(model, normalized):
+    """Résultat du plus long préfixe déjà en cache ("break" pendant la frappe de "breaking"), sinon None."""
+    for end in range(len(normalized) - 1, SEARCH_PREFIX_MIN - 1, -1):
+        entry = search_cache.peek(search_key(normalized[:end], model))
+        if entry is not None:
+            return entry
+    return None
+
+def search_results(model, normalized):
+    """Top 10 d'une requête normalisée, avec ses candidats (réutilisés par les requêtes plus longues)."""
+    try:
+        with stage('transform'):
+            query_vec = model.vectorizer.transform([normalized])
+    except: return None
+
+    # 1. Candidats : index inversé (seuls les postings des termes de la requête sont lus).
+    #    Préfixe en cache de même vecteur (dernier mot en cours de frappe, absent du vocabulaire) :
+    #    mêmes candidats. Sinon ses candidats fixent un seuil de départ (résultat identique).
+    keywords = normalized.split()
+    prefix = prefix_entry(model, normalized)
+    if prefix is not None and np.array_equal(prefix['terms'], query_vec.indices) \
+            and np.array_equal(prefix['weights'], query_vec.data):
+        SEARCH_PREFIX.inc('reused')
+        top_indices, top_scores = prefix['rows'], prefix['scores']
+    else:
+        if prefix is not None:
+            SEARCH_PREFIX.inc('seeded')
+        with stage('top_k'):  # Score des séries (postings) et sélection du top-k
+            top_indices, top_scores = model.search_index.top_k(query_vec, SEARCH_CANDIDATES,
+                                                               seed_rows=prefix['rows'] if prefix else None)
+    
+    # 2. Algorithme de pertinence (occurrences pré-calculées, mots entiers)
+    with stage('term_counts'):
+        counts = model.term_stats.counts_for(top_indices, keywords)
+    with stage('boost'):
+        results = []
+        for index, score, row_counts in zip(top_indices, top_scores, counts):
+            # Bonus si les mots exacts sont présents
+            found = int((row_counts > 0).sum())
+
+            # Boost x3 si tout est trouvé
+            boost = 3.0 if found == len(keywords) else 1.0
+            # Boost fréquentiel logarithmique
+            freq_boost = 1 + math.log(1 + row_counts[0]) if keywords else 1
+
+            final_score = score * boost * (freq_boost * 0.5)
+
+            results.append({
+                'id': int(model.catalogue.ids[index]),
+                'title': model.catalogue.titles[index],
+                'score': float(round(final_score, 4))
+            })
+
+        # Tri final
+        results = sorted(results, key=lambda x: x['score'], reverse=True)
+    return {'results': results[:10], 'rows': top_indices, 'scores': top_scores,
+            'terms': query_vec.indices, 'weights': query_vec.data}
+
+def search_many(model, queries):
+    """
+    Top 10 de plusieurs requêtes normalisées en un passage : une transformation, un produit
+    creux requêtes × séries (index inversé), puis les bonus de search_results calculés pour
+    tous les candidats à la fois. Même classement que search_results ; pas de cache (lots hors ligne).
+    """
+    unique = list(dict.fromkeys(q for q in queries if q))
+    if not unique:
+        return [[] for _ in queries]
+    with stage('transform'):
+        query_matrix = model.vectorizer.transform(unique)
+    with stage('top_k'):
+        top = model.search_index.top_k_many(query_matrix, SEARCH_CANDIDATES)
+
+    # Un élément par (candidat, mot de sa requête) ; mot absent du vocabulaire : colonne -1
+    with stage('term_counts'):
+        keywords = [q.split() for q in unique]
+        columns = [np.array([model.term_stats.column.get(w, -1) for w in words], dtype=np.int64) for words in keywords]
+        n_candidates = np.array([len(rows) for rows, _ in top])
+        pair_query = np.repeat(np.arange(len(unique)), n_candidates)
+        rows = np.concatenate([r for r, _ in top]).astype(np.int64)
+        scores = np.concatenate([sc for _, sc in top])
+        n_words = np.array([len(words) for words in keywords])[pair_query]
+        pair_start = np.cumsum(n_words) - n_words  # Premier mot de chaque candidat
+        word_of = np.arange(n_words.sum()) - np.repeat(pair_start, n_words)
+        offsets = np.cumsum([len(c) for c in columns]) - np.array([len(c) for c in columns])
+        word_cols = np.concatenate(columns)[np.repeat(offsets[pair_query], n_words) + word_of]
+        pair_rows = np.repeat(rows, n_words)
+        counts = np.zeros(len(word_cols), dtype=np.int64)
+        known = word_cols >= 0
+        if known.any():
+            counts[known] = np.asarray(model.term_stats.counts[pair_rows[known], word_cols[known]]).ravel()
+
+    with stage('boost'):
+        found = np.bincount(np.repeat(np.arange(len(rows)), n_words), weights=counts > 0, minlength=len(rows))
+        boost = np.where(found == n_words, 3.0, 1.0)  # x3 si tous les mots sont présents
+        freq_boost = 1 + np.log(1 + counts[pair_start])  # Occurrences du premier mot
+        final = np.round(scores * boost * (freq_boost * 0.5), 4)
+        results, start = {}, 0
+        for query, n in zip(unique, n_candidates):
+            order = start + np.argsort(-final[start:start + n], kind='stable')[:10]
+            results[query] = [{'id': int(model.catalogue.ids[rows[i]]), 'title': model.catalogue.titles[rows[i]],
+                               'score': float(final[i])} for i in order]
+            start += n
+    return [results.get(q, []) for q in queries]
+
+def top_rated():
+    """Séries les mieux notées (visiteurs anonymes), lues dans series_stats via son index."""
+    conn = get_db_connection()
+    top = conn.execute(TOP_RATED_SQL, (10,)).fetchall()
+    conn.close()
+    return [{'id': r['id'], 'title': r['title'], 'score': float(round(r['score'], 2))} for r in top]
+
+def model_sources():
+    """État des sources du modèle : change après un ETL ou un build_model.py."""
+    try:
+        conn = sqlite3.connect(DB_PATH)
+        state = etl_state(conn)
+        conn.close()
+    except sqlite3.Error:
+        state = None
+    manifest = read_manifest(ARTIFACT_DIR) or {}
+    return state, manifest.get('fingerprint'), manifest.get('created_at')
+
+def load_snapshot():
+    """Instantané à publier (cf. build_snapshot) ; en cas d'échec, les notes gardées par le journal sont oubliées."""
+    try:
+        return build_snapshot()
+    except BaseException:
+        rating_journal.stop()  # L'ancien instantané reste servi : il a déjà reçu ces notes
+        raise
+
+def build_snapshot():
+    """Construit un instantané complet du moteur IA (None si la base est absente)."""
+    start = time.perf_counter()
     
     if not os.path.exists(DB_PATH):
         print("❌ Erreur : Base de données absente. Lancez scripts/setup_etl.py")
-        return
+        return None
 
-    # 1. Chargement des données
+    # 1. Catalogue (ids, titres) et empreinte de la table (sans lire le texte)
     conn = sqlite3.connect(DB_PATH)
-    df_series = pd.read_sql_query("SELECT id, title, cleaned_text FROM series", conn)
-    conn.close()
-    
-    # 2. Vectorisation TF-IDF
-    vectorizer = TfidfVectorizer(max_features=15000, stop_words='english', 
-                                 ngram_range=(1, 2), sublinear_tf=True)
-    
-    df_series['cleaned_text'] = df_series['cleaned_text'].fillna('')
-    tfidf_matrix = vectorizer.fit_transform(df_series['cleaned_text'])
-    
-    # 3. Matrice de similarité (pour la recommandation)
-    cosine_sim_matrix = cosine_similarity(tfidf_matrix, tfidf_matrix)
-    
-    print(f"✅ Système prêt : {len(df_series)} séries indexées.")
+    try:
+        check_schema(conn)  # Mise à niveau faite par les scripts, jamais ici (base verrouillée pendant la migration)
+    except RuntimeError:
+        conn.close()
+        raise
+    # Même instantané de la base pour le catalogue, l'empreinte et les notes ; une note écrite
+    # après l'ouverture de la lecture est gardée par le journal et rejouée à la publication
+    with rating_journal.lock:
+        rating_journal.start()
+        conn.execute("BEGIN")
+        catalogue = Catalogue.from_connection(conn)
+    digests = stored_digests(conn)  # Empreintes écrites par l'ETL : aucun texte lu
+    state = etl_state(conn)
+    # Popularité (nombre de notes) de chaque série, pour classer les suggestions
+    rated = np.array(conn.execute("SELECT serie_id, rating_count FROM series_stats").fetchall(), dtype=np.int64).reshape(-1, 2)
+    popularity = np.zeros(len(catalogue))
+    rows = catalogue.lookup(rated[:, 0])
+    popularity[rows[rows >= 0]] = rated[rows >= 0, 1]
+    # Séries aimées par chaque utilisateur -> co-occurrences (filtrage collaboratif)
+    collaborative = CooccurrenceIndex.from_likes(
+        conn.execute("SELECT user_id, serie_id FROM ratings WHERE rating >= ?", (LIKE_THRESHOLD,)), catalogue)
+
+    # 2. Modèle pré-calculé sur disque (si la table series n'a pas changé),
+    #    sinon mis à jour à partir des séries modifiées par l'ETL incrémental
+    origin = "chargées depuis le disque"
+    model = load_artifacts(ARTIFACT_DIR, digests[0])
+    if model is not None:
+        conn.close()
+    else:
+        # Un seul worker met à jour ou ré-entraîne : les autres attendent le verrou puis chargent son modèle
+        with artifact_lock(ARTIFACT_DIR):
+            model = load_artifacts(ARTIFACT_DIR, digests[0])
+            if model is None:
+                origin = "mises à jour"
+                try:
+                    model = refresh_artifacts(ARTIFACT_DIR, conn, digests)
+                except OSError as e:
+                    print(f"⚠️ Mise à jour incrémentale impossible : {e}")
+            conn.close()
+
+            # 3. Sinon : vectorisation TF-IDF, index des voisins et statistiques de termes
+            if model is None:
+                origin = "indexées"
+                model = fit_model(digests, SeriesTexts(DB_PATH))
+                # Sauvegarde pour les prochains démarrages (et les autres workers)
+                try:
+                    save_artifacts(ARTIFACT_DIR, model, state=state)
+                except OSError as e:
+                    print(f"⚠️ Modèle non sauvegardé : {e}")
+    # Sources couvertes par cet instantané (surveillance) : état de l'ETL lu avec le
+    # catalogue, manifeste relu après une éventuelle sauvegarde
+    manifest = read_manifest(ARTIFACT_DIR) or {}
+    sources = (state, manifest.get('fingerprint'), manifest.get('created_at'))
+
+    # 4. Index inversé (recherche), suggestions, index LSH (séries similaires) et recommandation
+    recommender = Recommender(model.neighbors, catalogue, weighted=RECO_WEIGHT_BY_RATING,
+                              collaborative=collaborative, blend=RECO_CF_WEIGHT)
+    search_index = InvertedIndex(model.tfidf_matrix)
+    suggest_index = SuggestIndex(catalogue.titles, popularity, vocabulary_terms(model.vectorizer),
+                                 np.diff(search_index.indptr))  # Nombre de séries contenant chaque terme
+    similar_index = LSHIndex(model.embeddings.vectors, SIMILAR_TABLES, SIMILAR_BITS, probes=SIMILAR_PROBES)
+    snapshot = ModelSnapshot(model.fingerprint, catalogue, model.vectorizer, model.tfidf_matrix, model.neighbors,
+                             model.term_stats, search_index, suggest_index, similar_index, recommender, origin,
+                             datetime.now(timezone.utc).isoformat(timespec='seconds'), time.perf_counter() - start,
+                             sources)
+    print(f"✅ Système prêt : {len(catalogue)} séries {origin} ({snapshot.load_seconds:.2f} s).")
+    return snapshot
+
+def replay_ratings(snapshot):
+    """Notes reçues pendant la construction de `snapshot`, appliquées à son index avant publication."""
+    rating_journal.replay(snapshot.recommender.collaborative)
+
+# Modèle courant : reloader.current (remplacé d'un bloc à chaque rechargement)
+reloader = ModelReloader(load_snapshot, probe=model_sources, prepare=replay_ratings, publish_lock=rating_journal.lock)
+
+def init_app():
+    """Charge (ou recharge) le moteur IA ; les requêtes en cours gardent l'ancien instantané."""
+    print("Démarrage du système...")
+    return reloader.reload()
+
+def admin_denied():
+    """
+    Réponse d'erreur des routes d'admin, ou None si l'appel est autorisé. Sans ADMIN_TOKEN les
+    routes n'existent pas (404) : derrière un proxy local, toutes les requêtes viennent de 127.0.0.1.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({'error': 'Not found'}), 404
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+        return jsonify({'error': 'Forbidden'}), 403
+    return None
+
+# =============================================================================
+# INSTRUMENTATION (Latence par route et par étape, /metrics, profilage échantillonné)
+# =============================================================================
+
+@app.before_request
+def start_timer():
+    g.route = request.url_rule.rule if request.url_rule else 'unmatched'  # Gabarit : cardinalité bornée
+    g.started = time.perf_counter()
+    begin_request(g.route)
+    g.profile = profiler.start()
+
+@app.after_request
+def record_latency(response):
+    elapsed = time.perf_counter() - g.started
+    REQUEST_SECONDS.observe(elapsed, g.route, request.method, response.status_code)
+    return response
+
+@app.teardown_request
+def finish_profile(exc):
+    # Appelé même si une exception remonte (after_request sauté) : profileur arrêté et verrou rendu
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profiler.finish(profile, g.route, time.perf_counter() - g.started)
+
+@REGISTRY.collector
+def runtime_gauges():
+    """Jauges lues au rendu de /metrics : caches, pool SQLite, modèle servi, profilage."""
+    caches = {'recommend': reco_cache.stats(), 'search': search_cache.stats()}
+    info = reloader.info()
+    lines = []
+    for field in ('hits', 'misses', 'entries', 'evictions'):
+        lines += render_gauge(f'seriesminer_cache_{field}', f"Cache des résultats : {field}.",
+                              {name: s[field] for name, s in caches.items()}, label='cache')
+    lines += render_gauge('seriesminer_db_pool', "Pool de connexions SQLite.",
+                          db_pool.stats(), label='field')
+    lines += render_gauge('seriesminer_model_series', "Séries du modèle servi.", info.get('n_series', 0))
+    lines += render_gauge('seriesminer_model_load_seconds', "Durée du dernier chargement du modèle.",
+                          info.get('load_seconds', 0.0))
+    lines += render_gauge('seriesminer_model_reloads', "Rechargements du modèle.", info['reloads'])
+    collaborative = reloader.current.recommender.collaborative
+    lines += render_gauge('seriesminer_collaborative', "Filtrage collaboratif : notes reçues depuis le chargement, "
+                          "co-occurrences en attente de fusion.",
+                          {'updates': collaborative.updates, 'pending': collaborative.n_pending}, label='field')
+    lines += render_gauge('seriesminer_profiles', "Requêtes profilées / profils sauvegardés.",
+                          {'sampled': profiler.sampled, 'dumped': profiler.dumped}, label='state')
+    return lines
 
 # Initialisation immédiate
 init_app()
+if MODEL_WATCH_INTERVAL:
+    reloader.watch(MODEL_WATCH_INTERVAL)
 
 # =============================================================================
 # ROUTES WEB
@@ -92,86 +414,95 @@ def get_all_series():
 def search():
     """
     Recherche intelligente.
-    Applique la même normalisation (sans accents) que lors du nettoyage.
+    Applique la même normalisation (sans accents) que lors du nettoyage ;
+    les résultats sont mis en cache par requête normalisée.
     """
     query = request.args.get('q', '')
     if not query: return jsonify([])
 
-    # 1. Nettoyage de la requête (comme dans la base)
-    clean_query = remove_accents(query.lower())
-
-    try:
-        query_vec = vectorizer.transform([clean_query])
-        similarities = cosine_similarity(query_vec, tfidf_matrix).flatten()
-    except: return jsonify([])
+    normalized = normalize_query(query)
+    if not normalized: return jsonify([])
+    model = reloader.current  # Même instantané pour toute la requête
+    entry = search_cache.get_or_compute(search_key(normalized, model), lambda: search_results(model, normalized))
+    return jsonify(entry['results'] if entry else [])
 
-    # 2. Algorithme de pertinence
-    keywords = clean_query.split()
-    top_indices = similarities.argsort()[-50:][::-1]
-    
-    results = []
-    for index in top_indices:
-        score = similarities[index]
-        if score > 0.0:
-            row = df_series.iloc[index]
-            
-            # Bonus si les mots exacts sont présents
-            text = row['cleaned_text']
-            found = sum(1 for w in keywords if w in text)
-            
-            # Boost x3 si tout est trouvé
-            boost = 3.0 if found == len(keywords) else 1.0
-            # Boost fréquentiel logarithmique
-            freq_boost = 1 + math.log(1 + text.count(keywords[0])) if keywords else 1
-            
-            final_score = score * boost * (freq_boost * 0.5)
+@app.route('/api/search/batch', methods=['POST'])
+def search_batch():
+    """Plusieurs recherches en un appel ({'queries': [...]}) -> {'results': [[...], ...]}, dans l'ordre."""
+    queries = (request.get_json(silent=True) or {}).get('queries')
+    if not isinstance(queries, list) or not all(isinstance(q, str) for q in queries):
+        return jsonify({'error': "Format attendu : {'queries': [texte, ...]}"}), 400
+    if len(queries) > SEARCH_BATCH_MAX:
+        return jsonify({'error': f"Au plus {SEARCH_BATCH_MAX} requêtes par lot"}), 400
+    return jsonify({'results': search_many(reloader.current, [normalize_query(q) for q in queries])})
 
-            results.append({
-                'id': int(row['id']),
-                'title': row['title'],
-                'score': float(round(final_score, 4))
-            })
-            
-    # Tri final
-    results = sorted(results, key=lambda x: x['score'], reverse=True)
-    return jsonify(results[:10])
+@app.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Suggestions pendant la frappe (titres puis termes), sans passer par la recherche TF-IDF."""
+    prefix = request.args.get('prefix', '')
+    n = min(max(request.args.get('n', SUGGEST_LIMIT, type=int), 1), 50)
+    model = reloader.current
+    series = [{'id': int(model.catalogue.ids[row]), 'title': model.catalogue.titles[row]}
+              for row in model.suggest_index.series(prefix, n)]
+    return jsonify({'series': series, 'terms': model.suggest_index.words(prefix, n)})
 
 @app.route('/api/recommend', methods=['GET'])
 def recommend():
-    """Recommandation Hybride (Content-Based ou Popularity)."""
-    conn = get_db_connection()
-    
+    """Recommandation Hybride (Content-Based ou Popularity), servie depuis le cache."""
     # Connecté
     if 'user_id' in session:
         user_id = session['user_id']
-        liked = conn.execute('SELECT serie_id FROM ratings WHERE user_id = ? AND rating >= 3', (user_id,)).fetchall()
-        
-        if not liked:
-            conn.close()
-            return jsonify([]) # Vide -> Incite à noter
-
-        # Calcul Content-Based
-        conn.close()
-        total_scores = np.zeros(len(df_series))
-        seen_ids = [r['serie_id'] for r in liked]
-        
-        for r in liked:
-            idx = df_series.index[df_series['id'] == r['serie_id']].tolist()
-            if idx: total_scores += cosine_sim_matrix[idx[0]]
-            
-        recos = []
-        for idx in total_scores.argsort()[::-1]:
-            sid = int(df_series.iloc[idx]['id'])
-            if sid not in seen_ids:
-                recos.append({'id': sid, 'title': df_series.iloc[idx]['title'], 'score': float(round(total_scores[idx], 2))})
-                if len(recos) >= 10: break
-        return jsonify(recos)
+        model = reloader.current
+        return jsonify(reco_cache.get_or_compute(reco_key(user_id, model), lambda: recommend_for_user(model, user_id)))
 
     # Anonyme (Top Rated)
-    query = "SELECT s.id, s.title, AVG(r.rating) as avg FROM ratings r JOIN series s ON r.serie_id = s.id GROUP BY s.id ORDER BY avg DESC LIMIT 10"
-    top = conn.execute(query).fetchall()
-    conn.close()
-    return jsonify([{'id': r['id'], 'title': r['title'], 'score': float(round(r['avg'], 2))} for r in top])
+    return jsonify(reco_cache.get_or_compute(TOP_RATED_KEY, top_rated))
+
+@app.route('/api/similar/<int:serie_id>', methods=['GET'])
+def similar(serie_id):
+    """Séries proches d'une série ("plus comme ça"), par plongements LSA et index LSH."""
+    model = reloader.current
+    row = model.catalogue.row_of(serie_id)
+    if row is None: return jsonify({'error': 'Série inconnue'}), 404
+    n = min(max(request.args.get('n', 10, type=int), 1), 100)
+    rows, scores = model.similar_index.similar(row, n)
+    return jsonify([{'id': int(model.catalogue.ids[idx]), 'title': model.catalogue.titles[idx],
+                     'score': round(float(score), 4)} for idx, score in zip(rows, scores)])
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """Compteurs des caches (recommandations, recherche), du pool SQLite."""
+    return jsonify({'recommend_cache': reco_cache.stats(),
+                    'search_cache': {**search_cache.stats(), 'prefix': {mode: SEARCH_PREFIX.value(mode) for mode in ('reused', 'seeded')}},
+                    'db_pool': db_pool.stats()})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Format texte Prometheus : latences, étapes, caches ; durées du dernier ETL si disponibles."""
+    text = REGISTRY.render()
+    if os.path.exists(ETL_METRICS_FILE):
+        with open(ETL_METRICS_FILE, encoding='utf-8') as f:
+            text += f.read()
+    return Response(text, content_type=CONTENT_TYPE)
+
+@app.route('/api/model', methods=['GET'])
+def model_info():
+    """Version du modèle servi, durée du dernier chargement, rechargement en cours."""
+    return jsonify(reloader.info())
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    """Recharge le modèle en arrière-plan (?wait=1 : attend la fin du rechargement)."""
+    denied = admin_denied()
+    if denied: return denied
+    if request.args.get('wait'):
+        try:
+            reloader.reload()
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e), **reloader.info()}), 500
+        return jsonify({'success': True, **reloader.info()})
+    started = reloader.reload_async()
+    return jsonify({'success': True, 'started': started, **reloader.info()}), 202
 
 @app.route('/api/my_ratings', methods=['GET'])
 def get_user_ratings():
@@ -184,20 +515,41 @@ def get_user_ratings():
 @app.route('/api/rate', methods=['POST', 'DELETE'])
 def rate():
     if 'user_id' not in session: return jsonify({'error': 'Auth required'}), 401
-    conn = get_db_connection()
     uid = session['user_id']
-    data = request.json if request.is_json else request.args
-    sid = int(data.get('serie_id'))
-    
-    if request.method == 'DELETE':
-        conn.execute('DELETE FROM ratings WHERE user_id=? AND serie_id=?', (uid, sid))
-    else:
-        rating = int(data.get('rating'))
-        conn.execute('DELETE FROM ratings WHERE user_id=? AND serie_id=?', (uid, sid))
-        conn.execute('INSERT INTO ratings (user_id, serie_id, rating) VALUES (?, ?, ?)', (uid, sid, rating))
-    
-    conn.commit()
-    conn.close()
+    data = (request.get_json(silent=True) if request.is_json else request.args) or {}
+    # Paramètres validés avant toute écriture : aucun verrou pris pour une requête invalide
+    try:
+        sid = int(data.get('serie_id'))
+        rating = None if request.method == 'DELETE' else int(data.get('rating'))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'serie_id et rating entiers attendus'}), 400
+
+    # Écriture exclusive : ancienne note et séries aimées lues dans la même transaction ; note écrite
+    # puis appliquée au modèle servi sans qu'un rechargement ne s'ouvre ou ne publie entre les deux
+    with rating_journal.lock:
+        conn = get_db_connection()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            previous = conn.execute('SELECT rating FROM ratings WHERE user_id=? AND serie_id=?', (uid, sid)).fetchone()
+            if rating is None:
+                conn.execute('DELETE FROM ratings WHERE user_id=? AND serie_id=?', (uid, sid))
+            else:
+                conn.execute(UPSERT_RATING_SQL, (uid, sid, rating))
+            liked = [r['serie_id'] for r in conn.execute('SELECT serie_id FROM ratings WHERE user_id = ? AND rating >= ?',
+                                                         (uid, LIKE_THRESHOLD))]
+            conn.commit()
+        except BaseException:
+            conn.rollback()  # Verrou d'écriture rendu même si l'UPSERT échoue
+            raise
+        finally:
+            conn.close()
+        # Co-occurrences mises à jour sans attendre le prochain rechargement du modèle
+        was_liked = previous is not None and previous['rating'] is not None and previous['rating'] >= LIKE_THRESHOLD
+        event = (sid, liked, was_liked, rating is not None and rating >= LIKE_THRESHOLD)
+        reloader.current.recommender.collaborative.rate(*event)
+        rating_journal.record(*event)  # Rejouée sur l'instantané en construction, s'il y en a un
+    # Les recommandations de l'utilisateur et le classement des mieux notées ont changé
+    reco_cache.invalidate(reco_key(uid), TOP_RATED_KEY)
     return jsonify({'success': True})
 
 @app.route('/api/login', methods=['POST'])
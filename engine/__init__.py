@@ -0,0 +1 @@
+"""Briques du moteur SeriesMiner (index, modèles, caches) partagées par app.py et les scripts."""
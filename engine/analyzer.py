@@ -0,0 +1,97 @@
+import functools
+
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+from engine.text import remove_accents, split_words, strip_srt_lines
+
+# =============================================================================
+# ANALYSEUR DE TEXTE (Partagé par l'ETL, le vectoriseur et les requêtes)
+# =============================================================================
+# Une seule chaîne de traitement, en deux temps :
+#   tokens() : texte brut -> mots sans accents, balises ni timestamps, en minuscules, sans
+#              mots courts ni mots vides. C'est le texte nettoyé stocké par l'ETL, et la
+#              requête normalisée de la recherche (mots exacts des bonus de pertinence).
+#   terms()  : texte nettoyé -> termes du vectoriseur TF-IDF (mots vides filtrés à nouveau,
+#              racinisation optionnelle). Documents et requêtes passent par la même fonction.
+# La configuration est enregistrée dans le manifeste du modèle : la changer ré-entraîne le
+# modèle. Retirer une langue demande en plus de relancer l'ETL (mots déjà supprimés du texte).
+
+# Mots vides par langue, sans accents (le texte est comparé après remove_accents)
+STOP_WORDS_BY_LANGUAGE = {
+    'french': frozenset([
+        'le', 'la', 'les', 'de', 'des', 'du', 'un', 'une', 'et', 'en', 'il', 'elle', 'ils', 'elles',
+        'je', 'tu', 'nous', 'vous', 'ce', 'se', 'que', 'qui', 'dans', 'pour', 'sur', 'pas', 'ne',
+        'mais', 'ou', 'est', 'sont', 'cette', 'par', 'avec', 'tout', 'faire', 'plus', 'mon', 'ton', 'son',
+    ]),
+    # Liste de scikit-learn (celle de l'ancien stop_words='english' du vectoriseur)
+    'english': frozenset(ENGLISH_STOP_WORDS | {
+        'the', 'a', 'an', 'and', 'of', 'to', 'in', 'is', 'it', 'you', 'that', 'he', 'she', 'we', 'they',
+    }),
+}
+
+ANALYZER_CONFIG = {
+    'languages': ['french', 'english'],  # Listes de mots vides appliquées
+    'stemmer': None,  # Langue du stemmer Snowball de nltk (ex. 'french', 'english') ; None : mots entiers
+    'min_length': 3,  # Mots plus courts ignorés
+}
+STEM_CACHE_SIZE = 200000  # Mots distincts dont la racine est gardée en mémoire (loi de Zipf : presque tout)
+
+
+class Analyzer:
+    """Tokenisation, mots vides et racinisation (mémoïsée) selon une configuration."""
+
+    def __init__(self, languages=('french', 'english'), stemmer=None, min_length=3):
+        unknown = set(languages) - set(STOP_WORDS_BY_LANGUAGE)
+        if unknown:
+            raise ValueError(f"Langue sans liste de mots vides : {', '.join(sorted(unknown))}")
+        self.config = {'languages': list(languages), 'stemmer': stemmer, 'min_length': min_length}
+        self.stop_words = frozenset().union(*(STOP_WORDS_BY_LANGUAGE[lang] for lang in languages))
+        self.min_length = min_length
+        self.stem = None
+        if stemmer is not None:
+            try:
+                from nltk.stem.snowball import SnowballStemmer
+            except ImportError as e:
+                raise ImportError("La racinisation demande nltk (pip install nltk)") from e
+            # Une racine par mot distinct : le coût de Snowball n'est payé qu'une fois par mot
+            self.stem = functools.lru_cache(maxsize=STEM_CACHE_SIZE)(SnowballStemmer(stemmer).stem)
+
+    def tokens(self, text, srt=False, normalized=False):
+        """
+        Mots utiles d'un texte brut (sans accents, balises, timestamps ni mots vides), en minuscules.
+        srt=True ignore aussi les numéros de réplique et les lignes '-->'.
+        normalized=True : le texte est déjà passé par remove_accents.
+        """
+        if not normalized:
+            text = remove_accents(text)
+        if srt:
+            text = strip_srt_lines(text)
+        return [w for w in split_words(text) if len(w) >= self.min_length and w not in self.stop_words]
+
+    def clean(self, text, srt=False):
+        """Texte nettoyé (mots séparés par un espace) : stocké par l'ETL, clé des requêtes."""
+        return " ".join(self.tokens(text, srt))
+
+    def terms(self, text):
+        """Termes du vectoriseur pour un texte déjà nettoyé (tokenizer du TfidfVectorizer)."""
+        words = [w for w in text.split() if len(w) >= self.min_length and w not in self.stop_words]
+        if self.stem is None:
+            return words
+        stem = self.stem
+        return [stem(w) for w in words]
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_analyzer(languages, stemmer, min_length):
+    return Analyzer(languages, stemmer, min_length)
+
+
+def get_analyzer(config=None):
+    """Analyseur d'une configuration (ANALYZER_CONFIG par défaut), partagé avec son cache de racines."""
+    config = ANALYZER_CONFIG if config is None else config
+    return _shared_analyzer(tuple(config['languages']), config['stemmer'], config['min_length'])
+
+
+def clean_text(text, srt=False):
+    """Texte nettoyé selon l'analyseur configuré (mots séparés par un espace)."""
+    return get_analyzer().clean(text, srt)
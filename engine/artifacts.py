@@ -0,0 +1,319 @@
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import numpy as np
+import scipy.sparse as sp
+
+from engine.analyzer import get_analyzer
+from engine.catalogue import SeriesTexts
+from engine.embeddings import DEFAULT_DIM, SeriesEmbeddings
+from engine.model import TFIDF_MEMORY_MB, TFIDF_PARAMS, fit_tfidf_streaming, restore_vectorizer, vocabulary_terms
+from engine.neighbors import DEFAULT_K, NeighborIndex, build_neighbor_index, update_neighbor_index
+from engine.schema import SERIES_DIGESTS_SQL, decompress_text, text_digest
+from engine.term_stats import TermStats
+
+try:
+    import fcntl
+except ImportError: # Windows : pas de verrou entre processus
+    fcntl = None
+
+# =============================================================================
+# STOCKAGE DU MODÈLE SUR DISQUE (Artefacts)
+# =============================================================================
+# Un dossier par modèle :
+#   manifest.json      empreinte de la table series + configuration
+#   vocabulary.txt     un terme par ligne (ordre des colonnes)
+#   idf.npy            poids IDF
+#   ids.npy            id des séries, dans l'ordre des lignes
+#   row_hashes.npy     empreinte 64 bits de chaque série (mise à jour incrémentale)
+#   tfidf.*.npy        matrice TF-IDF (CSR : data, indices, indptr)
+#   neighbors.*.npy    index des plus proches voisins (CSR)
+#   tokens.txt         mots exacts du texte nettoyé (un par ligne)
+#   term_counts.*.npy  occurrences de chaque mot par série (CSC)
+#   svd_components.npy projection LSA (dimension × vocabulaire, float32)
+#   embeddings.npy     plongement de chaque série (float32, normalisé L2)
+# Des .npy séparés (plutôt qu'un .npz) pour pouvoir les mapper en mémoire :
+# les workers partagent alors les mêmes pages du cache disque.
+
+FORMAT_VERSION = 5
+# Au-delà de cette part de séries modifiées, on ré-entraîne tout (vocabulaire et IDF)
+REFIT_RATIO = 0.2
+
+ModelArtifacts = namedtuple('ModelArtifacts',
+                            'fingerprint ids row_hashes vectorizer tfidf_matrix neighbors term_stats embeddings')
+
+
+def model_config(k=DEFAULT_K):
+    """Configuration qui invalide le stockage si elle change."""
+    params = {key: list(v) if isinstance(v, tuple) else v for key, v in TFIDF_PARAMS.items()}
+    config = {'format': FORMAT_VERSION, 'tfidf': params, 'analyzer': get_analyzer().config, 'neighbors_k': k,
+              'embedding_dim': DEFAULT_DIM}
+    if TFIDF_MEMORY_MB is not None: # Vocabulaire approché : à ne pas confondre avec un modèle exact
+        config['tfidf_memory_mb'] = TFIDF_MEMORY_MB
+    return config
+
+
+def row_digests(rows, generation=None):
+    """
+    Une passe sur les lignes (id, title, empreinte du texte) triées par id ->
+    (empreinte SHA-256 de la table, ids, empreinte 64 bits de chaque série).
+    `generation` (reconstruction complète de l'ETL) entre dans l'empreinte de la table.
+    """
+    digest = hashlib.sha256(b"" if generation is None else f"{generation}\x1d".encode('utf-8'))
+    ids, hashes = [], []
+    for serie_id, title, text_hash in rows:
+        head = f"{serie_id}\x1f{title}\x1f{text_hash}\x1e".encode('utf-8')
+        digest.update(head)
+        ids.append(serie_id)
+        hashes.append(int.from_bytes(hashlib.blake2b(head, digest_size=8).digest(), 'little'))
+    return digest.hexdigest(), np.array(ids, dtype=np.int64), np.array(hashes, dtype=np.uint64)
+
+
+def series_digests(rows, generation=None):
+    """Empreintes (cf. row_digests) de lignes (id, title, texte nettoyé) en mémoire : textes hachés ici."""
+    return row_digests(((serie_id, title, text_digest(text)) for serie_id, title, text in rows), generation)
+
+
+def stored_digests(conn):
+    """
+    Empreintes (cf. row_digests) de la base sans lire aucun texte : titres de la table series,
+    empreintes des textes écrites par l'ETL (index couvrant de series_text), génération de l'ETL.
+    """
+    empty = text_digest('')
+    rows = conn.execute(SERIES_DIGESTS_SQL)
+    return row_digests(((serie_id, title, empty if text_hash is None else text_hash) for serie_id, title, text_hash in rows),
+                       etl_state(conn)[0])
+
+
+def series_fingerprint(rows, generation=None):
+    """Empreinte SHA-256 du contenu de la table series."""
+    return series_digests(rows, generation)[0]
+
+
+def etl_state(conn):
+    """(génération, dernière version du journal series_changes) écrites par l'ETL, ou (None, 0)."""
+    try:
+        row = conn.execute("SELECT value FROM etl_meta WHERE key = 'generation'").fetchone()
+        version = conn.execute("SELECT COALESCE(MAX(version), 0) FROM series_changes").fetchone()[0]
+    except sqlite3.OperationalError: # Base créée avant l'ETL incrémental
+        return None, 0
+    return (row[0] if row else None), version
+
+
+def fit_model(digests, texts, k=DEFAULT_K):
+    """
+    Entraîne le modèle complet (TF-IDF, voisins, statistiques de termes, plongements) sur les textes nettoyés.
+    `texts` est parcouru plusieurs fois : une liste, ou un SeriesTexts pour lire la base en continu.
+    """
+    fingerprint, ids, row_hashes = digests
+    vectorizer, tfidf_matrix = fit_tfidf_streaming(texts)
+    neighbors = build_neighbor_index(tfidf_matrix, k=k)
+    term_stats = TermStats.from_texts(texts, len(ids))
+    embeddings = SeriesEmbeddings.fit(tfidf_matrix)
+    return ModelArtifacts(fingerprint, ids, row_hashes, vectorizer, tfidf_matrix, neighbors, term_stats, embeddings)
+
+
+def _save_csr(folder, name, matrix):
+    np.save(os.path.join(folder, f'{name}.data.npy'), matrix.data)
+    np.save(os.path.join(folder, f'{name}.indices.npy'), matrix.indices)
+    np.save(os.path.join(folder, f'{name}.indptr.npy'), matrix.indptr)
+
+
+def _load_csr_arrays(folder, name, mmap_mode):
+    return [np.load(os.path.join(folder, f'{name}.{part}.npy'), mmap_mode=mmap_mode)
+            for part in ('data', 'indices', 'indptr')]
+
+
+def save_artifacts(folder, model, k=DEFAULT_K, state=(None, 0)):
+    """
+    Écrit le modèle dans un dossier temporaire puis le renomme (écriture atomique).
+    `state` est l'état du journal de l'ETL (cf. etl_state) couvert par ce modèle.
+    """
+    parent = os.path.dirname(os.path.abspath(folder))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.model-', dir=parent)
+    try:
+        with open(os.path.join(tmp, 'vocabulary.txt'), 'w', encoding='utf-8') as f:
+            f.write("\n".join(vocabulary_terms(model.vectorizer)))
+        np.save(os.path.join(tmp, 'idf.npy'), model.vectorizer.idf_)
+        np.save(os.path.join(tmp, 'ids.npy'), np.asarray(model.ids, dtype=np.int64))
+        np.save(os.path.join(tmp, 'row_hashes.npy'), np.asarray(model.row_hashes, dtype=np.uint64))
+        _save_csr(tmp, 'tfidf', sp.csr_matrix(model.tfidf_matrix))
+        np.save(os.path.join(tmp, 'neighbors.data.npy'), model.neighbors.scores)
+        np.save(os.path.join(tmp, 'neighbors.indices.npy'), model.neighbors.indices)
+        np.save(os.path.join(tmp, 'neighbors.indptr.npy'), model.neighbors.indptr)
+        with open(os.path.join(tmp, 'tokens.txt'), 'w', encoding='utf-8') as f:
+            f.write("\n".join(model.term_stats.tokens))
+        _save_csr(tmp, 'term_counts', model.term_stats.counts)
+        np.save(os.path.join(tmp, 'svd_components.npy'), model.embeddings.components)
+        np.save(os.path.join(tmp, 'embeddings.npy'), model.embeddings.vectors)
+
+        manifest = {
+            'fingerprint': model.fingerprint,
+            'config': model_config(k),
+            'n_series': int(len(model.ids)),
+            'etl_generation': state[0],
+            'changes_version': state[1],
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        with open(os.path.join(tmp, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        # Remplacement de l'ancien modèle
+        if os.path.exists(folder):
+            old = folder + '.old'
+            shutil.rmtree(old, ignore_errors=True)
+            os.replace(folder, old)
+            os.replace(tmp, folder)
+            shutil.rmtree(old, ignore_errors=True)
+        else:
+            os.replace(tmp, folder)
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+
+def read_manifest(folder):
+    """Manifeste du modèle stocké, ou None s'il n'y en a pas."""
+    try:
+        with open(os.path.join(folder, 'manifest.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+@contextmanager
+def artifact_lock(folder):
+    """
+    Verrou exclusif entre processus (fichier `<dossier>.lock`, à côté du dossier remplacé
+    par save_artifacts) : un seul worker ré-entraîne, les autres attendent puis chargent
+    son modèle depuis le disque.
+    """
+    if fcntl is None:
+        yield
+        return
+    parent = os.path.dirname(os.path.abspath(folder))
+    os.makedirs(parent, exist_ok=True)
+    with open(os.path.abspath(folder) + '.lock', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_artifacts(folder, fingerprint, k=DEFAULT_K, mmap=True):
+    """
+    Charge le modèle stocké s'il correspond à l'empreinte et à la configuration, sinon None.
+    fingerprint=None accepte n'importe quel contenu (mise à jour incrémentale).
+    """
+    manifest = read_manifest(folder)
+    if manifest is None or manifest.get('config') != model_config(k) \
+            or (fingerprint is not None and manifest.get('fingerprint') != fingerprint):
+        return None
+
+    mmap_mode = 'r' if mmap else None
+    with open(os.path.join(folder, 'vocabulary.txt'), encoding='utf-8') as f:
+        terms = [t for t in f.read().split("\n") if t]
+    vectorizer = restore_vectorizer(terms, np.load(os.path.join(folder, 'idf.npy')))
+    ids = np.load(os.path.join(folder, 'ids.npy'), mmap_mode=mmap_mode)
+    row_hashes = np.load(os.path.join(folder, 'row_hashes.npy'), mmap_mode=mmap_mode)
+
+    data, indices, indptr = _load_csr_arrays(folder, 'tfidf', mmap_mode)
+    tfidf_matrix = sp.csr_matrix((data, indices, indptr), shape=(len(ids), len(terms)), copy=False)
+    data, indices, indptr = _load_csr_arrays(folder, 'neighbors', mmap_mode)
+    neighbors = NeighborIndex(indptr, indices, data, len(ids))
+
+    with open(os.path.join(folder, 'tokens.txt'), encoding='utf-8') as f:
+        tokens = [t for t in f.read().split("\n") if t]
+    data, indices, indptr = _load_csr_arrays(folder, 'term_counts', mmap_mode)
+    term_stats = TermStats(tokens, sp.csc_matrix((data, indices, indptr), shape=(len(ids), len(tokens)), copy=False))
+    embeddings = SeriesEmbeddings(np.load(os.path.join(folder, 'svd_components.npy'), mmap_mode=mmap_mode),
+                                  np.load(os.path.join(folder, 'embeddings.npy'), mmap_mode=mmap_mode))
+
+    return ModelArtifacts(manifest['fingerprint'], ids, row_hashes, vectorizer, tfidf_matrix, neighbors, term_stats,
+                          embeddings)
+
+
+def refresh_artifacts(folder, conn, digests, k=DEFAULT_K):
+    """
+    Met à jour le modèle stocké au lieu de le ré-entraîner : seules les séries modifiées
+    (empreinte différente, ou notées dans le journal series_changes de l'ETL incrémental)
+    sont re-vectorisées, avec le vocabulaire et l'IDF existants, et l'index des voisins est
+    mis à jour. Retourne None si un ré-entraînement complet s'impose.
+    """
+    fingerprint, new_ids, new_hashes = digests
+    old = load_artifacts(folder, None, k, mmap=False)
+    if old is None:
+        return None
+
+    known = dict(zip(old.ids.tolist(), old.row_hashes.tolist()))
+    touched = {serie_id for serie_id, h in zip(new_ids.tolist(), new_hashes.tolist()) if known.get(serie_id) != h}
+    manifest = read_manifest(folder)
+    generation, version = state = etl_state(conn)
+    if generation is not None and manifest.get('etl_generation') == generation:
+        touched.update(r[0] for r in conn.execute("SELECT DISTINCT serie_id FROM series_changes WHERE version > ?",
+                                                  (manifest.get('changes_version', 0),)))
+    if len(touched) > REFIT_RATIO * max(len(new_ids), 1):
+        return None
+
+    # 1. Séries modifiées ou ajoutées : nouvelle vectorisation avec le vocabulaire existant
+    old_rows = {int(serie_id): row for row, serie_id in enumerate(old.ids)}
+    upserted = [int(i) for i in new_ids if int(i) in touched]
+    texts = {}
+    for start in range(0, len(upserted), 500):
+        chunk = upserted[start:start + 500]
+        marks = ",".join("?" * len(chunk))
+        texts.update(conn.execute(f"SELECT serie_id, text FROM series_text WHERE serie_id IN ({marks})", chunk).fetchall())
+    changed_texts = [decompress_text(texts.get(i)) for i in upserted]
+    changed_matrix = old.vectorizer.transform(changed_texts)
+
+    # 2. Nouvel ordre des lignes : anciennes lignes gardées + lignes re-vectorisées
+    upsert_pos = {serie_id: len(old.ids) + j for j, serie_id in enumerate(upserted)}
+    source, changed_rows = [], []
+    old_to_new = np.full(len(old.ids), -1, dtype=np.int64)
+    for new_row, serie_id in enumerate(new_ids.tolist()):
+        if serie_id in upsert_pos:
+            source.append(upsert_pos[serie_id])
+            changed_rows.append(new_row)
+        elif serie_id in old_rows:
+            source.append(old_rows[serie_id])
+            old_to_new[old_rows[serie_id]] = new_row
+        else: # Série absente du modèle et du journal : état incohérent
+            return None
+    tfidf_matrix = sp.vstack([old.tfidf_matrix, changed_matrix]).tocsr()[source]
+
+    # 3. Index des voisins, statistiques de termes et plongements mis à jour
+    neighbors = update_neighbor_index(old.neighbors, old_to_new, tfidf_matrix, changed_rows, k=k)
+    term_stats = old.term_stats.with_rows(source, changed_texts)
+    embeddings = old.embeddings.with_rows(source, changed_matrix)
+    model = ModelArtifacts(fingerprint, new_ids, new_hashes, old.vectorizer, tfidf_matrix, neighbors, term_stats,
+                           embeddings)
+    save_artifacts(folder, model, k=k, state=state)
+    return model
+
+
+def build_artifacts(db_path, folder, k=DEFAULT_K, incremental=True):
+    """
+    Lit la base, entraîne le modèle et l'écrit sur disque (commande de build).
+    Avec incremental=True, on part du modèle existant quand le journal de l'ETL le permet.
+    """
+    conn = sqlite3.connect(db_path)
+    digests = stored_digests(conn)
+    state = etl_state(conn)
+    with artifact_lock(folder):
+        model = load_artifacts(folder, digests[0], k)
+        if model is None and incremental:
+            model = refresh_artifacts(folder, conn, digests, k)
+        conn.close()
+        if model is None:
+            model = fit_model(digests, SeriesTexts(db_path), k=k)
+            save_artifacts(folder, model, k=k, state=state)
+    return model
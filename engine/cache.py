@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# =============================================================================
+# CACHE DES RÉSULTATS (LRU + TTL, partage optionnel entre workers)
+# =============================================================================
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_TTL = 300.0  # secondes
+
+
+class SharedCache:
+    """
+    Second niveau partagé entre processus : une table SQLite (valeurs JSON).
+    Une entrée invalidée ici peut rester servie par le cache local d'un autre
+    worker jusqu'à l'expiration de son TTL.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)")
+        conn.commit()
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value FROM cache WHERE key = ? AND expires > ?",
+                                      (key, time.time())).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def set(self, key, value):
+        conn = self._connect()
+        conn.execute("INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                     (key, json.dumps(value), time.time() + self.ttl))
+        conn.commit()
+
+    def delete(self, key):
+        conn = self._connect()
+        conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+        conn.commit()
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("DELETE FROM cache")
+        conn.commit()
+
+
+class LRUCache:
+    """
+    Cache local au processus : au plus `max_entries` entrées, chacune valable `ttl` secondes.
+    Si `shared` est donné (SharedCache), il sert de second niveau avant le calcul.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, shared=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.shared = shared
+        self.clock = clock
+        self._entries = OrderedDict()  # clé -> (expiration, valeur)
+        self._lock = threading.Lock()
+        self.hits = self.shared_hits = self.misses = self.evictions = self.invalidations = 0
+        self.computes, self.compute_seconds = 0, 0.0  # Calculs faits (misses) et leur durée totale
+
+    def _get_local(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key] # Expirée
+        return None
+
+    def _set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, key):
+        """Valeur en cache (None si absente ou expirée)."""
+        value = self._get_local(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                with self._lock:
+                    self.shared_hits += 1
+                self._set_local(key, value)
+        if value is None:
+            with self._lock:
+                self.misses += 1
+        return value
+
+    def peek(self, key):
+        """Valeur locale sans effet sur l'ordre LRU ni sur les compteurs (None si absente ou expirée)."""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry is not None and entry[0] > self.clock() else None
+
+    def set(self, key, value):
+        self._set_local(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def get_or_compute(self, key, compute):
+        """Valeur en cache, sinon compute() (mise en cache du résultat)."""
+        value = self.get(key)
+        if value is None:
+            start = time.perf_counter()
+            value = compute()
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.computes += 1
+                self.compute_seconds += elapsed
+            self.set(key, value)
+        return value
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+        if self.shared is not None:
+            for key in keys:
+                self.shared.delete(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.shared_hits + self.misses
+            compute_ms = 1000 * self.compute_seconds / self.computes if self.computes else 0.0
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'shared_hits': self.shared_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.shared_hits) / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'compute_ms': round(compute_ms, 3),  # Durée moyenne d'un calcul (miss)
+                'saved_ms': round(compute_ms * (self.hits + self.shared_hits), 1),  # Estimation du temps évité
+            }
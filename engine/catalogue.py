@@ -0,0 +1,104 @@
+import sqlite3
+import sys
+
+import numpy as np
+
+from engine.schema import decompress_text
+
+# =============================================================================
+# CATALOGUE COMPACT (ids + titres, sans le texte des sous-titres)
+# =============================================================================
+
+CHUNK_ROWS = 256  # Séries lues par paquet depuis SQLite
+
+
+def _fetch(cursor, chunk):
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            break
+        yield from rows
+
+
+def iter_series(conn, with_text=True, chunk=CHUNK_ROWS):
+    """
+    Parcourt les séries triées par id, par paquets -> (id, title, texte) ou (id, title).
+    Le texte (table series_text) est décompressé ligne par ligne, jamais pour toute la table.
+    """
+    if not with_text:
+        yield from _fetch(conn.execute("SELECT id, title FROM series ORDER BY id"), chunk)
+        return
+    cursor = conn.execute("SELECT s.id, s.title, t.text FROM series s "
+                          "LEFT JOIN series_text t ON t.serie_id = s.id ORDER BY s.id")
+    for serie_id, title, blob in _fetch(cursor, chunk):
+        yield serie_id, title, decompress_text(blob)
+
+
+def iter_texts(conn, chunk=CHUNK_ROWS):
+    """Textes nettoyés des séries, triées par id (décompressés un à un)."""
+    cursor = conn.execute("SELECT t.text FROM series s LEFT JOIN series_text t ON t.serie_id = s.id ORDER BY s.id")
+    for (blob,) in _fetch(cursor, chunk):
+        yield decompress_text(blob)
+
+
+class SeriesTexts:
+    """
+    Textes nettoyés des séries (triées par id), relus depuis la base à chaque parcours.
+    Permet plusieurs passes d'entraînement sans garder le corpus en mémoire.
+    """
+
+    def __init__(self, db_path, chunk=CHUNK_ROWS):
+        self.db_path = db_path
+        self.chunk = chunk
+
+    def __iter__(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            yield from iter_texts(conn, self.chunk)
+        finally:
+            conn.close()
+
+
+class Catalogue:
+    """Ids (ndarray) et titres (internés) des séries, dans l'ordre des lignes du modèle."""
+
+    def __init__(self, ids, titles):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.titles = [sys.intern(str(t)) for t in titles]
+        self.row = {int(serie_id): i for i, serie_id in enumerate(self.ids)}
+        # Tableau id -> ligne (-1 si absent) pour les recherches vectorisées
+        self.row_index = np.full(int(self.ids.max()) + 1 if len(self.ids) else 0, -1, dtype=np.int64)
+        self.row_index[self.ids] = np.arange(len(self.ids))
+
+    @classmethod
+    def from_connection(cls, conn):
+        ids, titles = [], []
+        for serie_id, title in iter_series(conn, with_text=False):
+            ids.append(serie_id)
+            titles.append(title)
+        return cls(ids, titles)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row_of(self, serie_id):
+        """Ligne de la série (None si inconnue)."""
+        return self.row.get(int(serie_id))
+
+    def lookup(self, serie_ids):
+        """Ligne de chaque id (-1 si inconnu), en une opération NumPy."""
+        serie_ids = np.asarray(serie_ids, dtype=np.int64).ravel()
+        rows = np.full(len(serie_ids), -1, dtype=np.int64)
+        known = (serie_ids >= 0) & (serie_ids < len(self.row_index))
+        rows[known] = self.row_index[serie_ids[known]]
+        return rows
+
+    def rows_of(self, serie_ids):
+        """Lignes des séries connues, dans l'ordre donné (les ids inconnus sont ignorés)."""
+        rows = self.lookup(serie_ids)
+        return rows[rows >= 0]
+
+    @property
+    def nbytes(self):
+        return (self.ids.nbytes + self.row_index.nbytes + sys.getsizeof(self.row)
+                + sum(sys.getsizeof(t) for t in self.titles))
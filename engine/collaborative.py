@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+import scipy.sparse as sp
+
+# =============================================================================
+# FILTRAGE COLLABORATIF ITEM-ITEM (Co-occurrences creuses, mises à jour incrémentales)
+# =============================================================================
+# Deux séries sont proches si les mêmes utilisateurs les ont aimées. Avec X la matrice
+# binaire (utilisateurs × séries) des séries aimées :
+#   co = Xᵀ X (diagonale retirée), n = nombre d'utilisateurs par série
+#   sim(i, j) = co(i, j) / sqrt(n_i * n_j)   (cosinus entre colonnes de X)
+# On garde co et n plutôt que les similarités : une note ne modifie alors qu'une ligne
+# et une colonne de co, et un seul n.
+
+LIKE_THRESHOLD = 3  # Note minimale d'une série "aimée" (comme pour la recommandation content-based)
+PENDING_MAX = 4096  # Variations de co gardées à part avant d'être fusionnées dans la matrice
+
+
+def row_positions(indptr, rows):
+    """Positions (dans indices/data d'une matrice CSR) des éléments des lignes `rows`, concaténées."""
+    lengths = indptr[rows + 1] - indptr[rows]
+    positions = np.repeat(indptr[rows] - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+    return positions, lengths
+
+
+class CooccurrenceIndex:
+    """
+    Co-occurrences (séries × séries, CSR float32) et nombre d'utilisateurs par série.
+    Les notes arrivées depuis la construction attendent dans `pending` (ligne -> {colonne: variation})
+    et sont fusionnées dans la matrice par paquets de PENDING_MAX.
+    """
+
+    def __init__(self, co, counts, catalogue):
+        self.co = sp.csr_matrix(co, dtype=np.float32)
+        self.counts = np.asarray(counts, dtype=np.float64)
+        self.catalogue = catalogue
+        self.pending = {}
+        self.n_pending = 0
+        self.updates = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_likes(cls, likes, catalogue):
+        """`likes` : paires (user_id, serie_id) des séries aimées ; ids inconnus du catalogue ignorés."""
+        pairs = np.array(list(likes), dtype=np.int64).reshape(-1, 2)
+        rows = catalogue.lookup(pairs[:, 1])
+        known = rows >= 0
+        _, owners = np.unique(pairs[known, 0], return_inverse=True)
+        liked = sp.csr_matrix((np.ones(known.sum(), dtype=np.float32), (owners, rows[known])),
+                              shape=(int(owners.max()) + 1 if len(owners) else 0, len(catalogue)))
+        liked.sum_duplicates()
+        liked.data[:] = 1
+        co = sp.csr_matrix(liked.T @ liked)
+        co = sp.csr_matrix(co - sp.diags(co.diagonal()))
+        co.eliminate_zeros()
+        return cls(co, np.asarray(liked.sum(axis=0)).ravel(), catalogue)
+
+    @property
+    def nbytes(self):
+        return self.co.data.nbytes + self.co.indices.nbytes + self.co.indptr.nbytes + self.counts.nbytes
+
+    def rate(self, serie_id, liked_ids, was_liked, is_liked):
+        """
+        Note écrite par un utilisateur : `liked_ids` = ses autres séries aimées.
+        Seul un passage aimée <-> non aimée change les co-occurrences.
+        """
+        if was_liked == is_liked:
+            return
+        row = self.catalogue.lookup([serie_id])[0]
+        if row < 0:
+            return
+        others = self.catalogue.lookup(liked_ids)
+        others = others[(others >= 0) & (others != row)]
+        delta = 1.0 if is_liked else -1.0
+        with self._lock:
+            self.counts[row] += delta
+            for other in others.tolist():
+                for i, j in ((row, other), (other, row)):
+                    cells = self.pending.setdefault(i, {})
+                    cells[j] = cells.get(j, 0.0) + delta
+                self.n_pending += 2
+            self.updates += 1
+            if self.n_pending >= PENDING_MAX:
+                self._merge()
+
+    def _merge(self):
+        """Fusionne les variations en attente dans la matrice (appelé sous le verrou)."""
+        cells = [(i, j, d) for i, row in self.pending.items() for j, d in row.items()]
+        if cells:
+            i, j, d = (np.array(c) for c in zip(*cells))
+            delta = sp.csr_matrix((d.astype(np.float32), (i.astype(np.int64), j.astype(np.int64))), shape=self.co.shape)
+            co = sp.csr_matrix(self.co + delta)
+            co.eliminate_zeros()
+            self.co = co
+        self.pending = {}
+        self.n_pending = 0
+
+    def scores(self, rows, weights):
+        """Somme pondérée des similarités avec les séries `rows` -> vecteur dense (une valeur par série)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        weights = np.asarray(weights, dtype=np.float64)
+        with self._lock:
+            norms = np.sqrt(self.counts)
+            keep = norms[rows] > 0
+            rows, weights = rows[keep], weights[keep] / norms[rows[keep]]
+            positions, lengths = row_positions(self.co.indptr, rows)
+            dense = np.bincount(self.co.indices[positions], weights=self.co.data[positions] * np.repeat(weights, lengths),
+                                minlength=len(norms)).astype(np.float64)  # (int64 si aucune co-occurrence)
+            for row, weight in zip(rows.tolist(), weights.tolist()):
+                for col, delta in self.pending.get(row, {}).items():
+                    dense[col] += weight * delta
+        return np.divide(dense, norms, out=np.zeros_like(dense), where=norms > 0)
+
+    def similarity(self):
+        """Matrice creuse des similarités cosinus (pour les calculs par lots d'utilisateurs)."""
+        with self._lock:
+            self._merge()
+            co, counts = self.co, self.counts.copy()
+        inverse = np.divide(1.0, np.sqrt(counts), out=np.zeros_like(counts), where=counts > 0)
+        scale = sp.diags(inverse.astype(np.float32))
+        return sp.csr_matrix(scale @ co @ scale)
+
+
+class RatingJournal:
+    """
+    Notes reçues pendant la construction d'un nouvel instantané : son index a été lu dans la base
+    avant elles, elles lui sont rejouées juste avant sa publication. `lock` sépare chaque note
+    (écriture + mise à jour du modèle servi) de l'ouverture de la lecture et de la publication.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._events = None  # None : aucun instantané en construction
+
+    def start(self):
+        """Début de la lecture des notes d'un instantané (sous `lock`)."""
+        self._events = []
+
+    def record(self, *event):
+        """Note appliquée au modèle servi (sous `lock`) : gardée si un instantané est en construction."""
+        if self._events is not None:
+            self._events.append(event)
+
+    def replay(self, index):
+        """Rejoue les notes gardées sur l'index du nouvel instantané (sous `lock`) -> nombre de notes."""
+        events, self._events = self._events or [], None
+        for event in events:
+            index.rate(*event)
+        return len(events)
+
+    def stop(self):
+        """Construction abandonnée : les notes gardées sont oubliées (déjà dans le modèle servi)."""
+        with self.lock:
+            self._events = None
@@ -0,0 +1,101 @@
+import os
+import queue
+import sqlite3
+import threading
+
+# =============================================================================
+# CONNEXIONS SQLITE RÉUTILISÉES (Pool, mode WAL)
+# =============================================================================
+
+# WAL : les lecteurs ne sont plus bloqués par l'écrivain (et inversement)
+PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),   # Suffisant en WAL : pas de corruption possible, seulement la dernière transaction
+    ('cache_size', -16000),      # 16 Mo de cache de pages par connexion
+    ('mmap_size', 268435456),    # Lecture de la base par mmap (256 Mo)
+    ('temp_store', 'MEMORY'),
+)
+BUSY_TIMEOUT = 5.0         # Secondes d'attente d'un verrou avant "database is locked"
+CACHED_STATEMENTS = 256    # Requêtes préparées gardées par connexion
+DEFAULT_MAX_IDLE = 16      # Connexions gardées ouvertes en attente de réutilisation
+
+
+class PooledConnection(sqlite3.Connection):
+    """Connexion dont close() la rend au pool au lieu de la fermer."""
+
+    pool = None
+    in_pool = False
+
+    def close(self):
+        if self.in_pool: # Déjà rendue (double close)
+            return
+        if self.pool is None:
+            super().close()
+        else:
+            self.in_pool = True
+            self.pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Pool de connexions vers une base SQLite, partagé par les threads d'un worker.
+    Une connexion n'est utilisée que par un thread à la fois ; après un fork,
+    les connexions héritées du parent sont abandonnées.
+    """
+
+    def __init__(self, path, max_idle=DEFAULT_MAX_IDLE, pragmas=PRAGMAS, row_factory=sqlite3.Row):
+        self.path = path
+        self.max_idle = max_idle
+        self.pragmas = pragmas
+        self.row_factory = row_factory
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self.opened = self.reused = 0
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, cached_statements=CACHED_STATEMENTS,
+                               check_same_thread=False, factory=PooledConnection)
+        conn.row_factory = self.row_factory
+        conn.pool = self
+        for name, value in self.pragmas:
+            conn.execute(f"PRAGMA {name}={value}")
+        with self._lock:
+            self.opened += 1
+        return conn
+
+    def connect(self):
+        """Connexion prête à l'emploi (conn.close() la rend au pool)."""
+        if os.getpid() != self._pid:
+            self._reset()
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.reused += 1
+        except queue.Empty:
+            conn = self._open()
+        conn.in_pool = False
+        return conn
+
+    def release(self, conn):
+        if os.getpid() != self._pid: # Connexion du processus parent : abandonnée
+            return
+        if self._idle.qsize() >= self.max_idle:
+            sqlite3.Connection.close(conn)
+            return
+        if conn.in_transaction: # Transaction oubliée par l'appelant
+            conn.rollback()
+        self._idle.put(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                sqlite3.Connection.close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def stats(self):
+        return {'opened': self.opened, 'reused': self.reused, 'idle': self._idle.qsize(), 'max_idle': self.max_idle}
@@ -0,0 +1,135 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.decomposition import TruncatedSVD
+
+# =============================================================================
+# PLONGEMENTS DENSES (LSA) ET INDEX APPROCHÉ (LSH) POUR "SÉRIES SIMILAIRES"
+# =============================================================================
+# Chaque série est résumée par un petit vecteur dense (SVD tronquée de la matrice
+# TF-IDF, float32, normalisé L2). L'index LSH (hyperplans aléatoires) ne compare
+# la série demandée qu'aux séries tombées dans les mêmes cases de hachage.
+
+DEFAULT_DIM = 128      # Dimension des plongements
+DEFAULT_TABLES = 16    # Tables de hachage (plus de tables : meilleur rappel, plus de candidats)
+DEFAULT_BITS = 12      # Bits par table (plus de bits : cases plus petites, moins de candidats)
+DEFAULT_PROBES = 2     # Cases voisines visitées en plus par table (bits les moins sûrs inversés)
+
+
+def _normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+class SeriesEmbeddings:
+    """
+    Projection LSA : components (dimension × vocabulaire) et vectors (séries × dimension),
+    tous deux en float32. Une série modifiée est projetée avec les composantes existantes
+    (comme le vocabulaire et l'IDF lors d'une mise à jour incrémentale).
+    """
+
+    def __init__(self, components, vectors):
+        self.components = np.asarray(components, dtype=np.float32)
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, tfidf_matrix, dim=DEFAULT_DIM, seed=0):
+        dim = max(0, min(dim, min(tfidf_matrix.shape) - 1))
+        if dim == 0: # Corpus trop petit pour une décomposition
+            return cls(np.zeros((0, tfidf_matrix.shape[1])), np.zeros((tfidf_matrix.shape[0], 0)))
+        svd = TruncatedSVD(n_components=dim, random_state=seed)
+        vectors = svd.fit_transform(sp.csr_matrix(tfidf_matrix, dtype=np.float32))
+        return cls(svd.components_, _normalize_rows(vectors.astype(np.float32)))
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.components.nbytes + self.vectors.nbytes
+
+    def project(self, tfidf_rows):
+        """Plongements de nouvelles lignes TF-IDF (même vocabulaire)."""
+        vectors = sp.csr_matrix(tfidf_rows, dtype=np.float32) @ self.components.T
+        return _normalize_rows(np.asarray(vectors, dtype=np.float32))
+
+    def with_rows(self, source, tfidf_rows):
+        """
+        Plongements après mise à jour incrémentale : la ligne i reprend l'ancienne ligne
+        source[i], ou la projection de tfidf_rows[source[i] - n_anciennes] au-delà.
+        """
+        return SeriesEmbeddings(self.components, np.vstack([self.vectors, self.project(tfidf_rows)])[source])
+
+
+class LSHIndex:
+    """
+    Hachage par hyperplans aléatoires (cosinus) : `n_tables` tables de `n_bits` bits.
+    Les hyperplans passent par le centre du nuage (les plongements LSA sont tous
+    orientés dans la même direction : sans centrage, presque tout tombe dans les mêmes cases).
+    Les candidats (séries de mêmes cases, plus `probes` cases voisines par table) sont
+    re-classés par cosinus exact sur les plongements. Sous `k` candidats, la recherche
+    devient exhaustive (petits catalogues).
+    """
+
+    def __init__(self, vectors, n_tables=DEFAULT_TABLES, n_bits=DEFAULT_BITS, probes=DEFAULT_PROBES, seed=0):
+        self.vectors = np.asarray(vectors, dtype=np.float32)
+        self.n_tables, self.n_bits = n_tables, n_bits
+        self.probes = min(probes, n_bits)
+        rng = np.random.default_rng(seed)
+        self.planes = rng.standard_normal((n_tables * n_bits, self.vectors.shape[1])).astype(np.float32)
+        center = self.vectors.mean(axis=0) if len(self.vectors) else np.zeros(self.vectors.shape[1], np.float32)
+        self.offsets = self.planes @ center
+        self._weights = np.left_shift(np.uint32(1), np.arange(n_bits, dtype=np.uint32))
+
+        # Une table = codes triés + ordre des séries (une case = un intervalle)
+        codes = self._codes(self.vectors @ self.planes.T)
+        self.order = np.argsort(codes, axis=0, kind='stable').T.astype(np.int32)
+        self.sorted_codes = np.take_along_axis(codes, self.order.T, axis=0).T.copy()
+
+    @property
+    def nbytes(self):
+        return self.planes.nbytes + self.offsets.nbytes + self.order.nbytes + self.sorted_codes.nbytes
+
+    def _codes(self, projections):
+        bits = (projections > self.offsets).reshape(len(projections), self.n_tables, self.n_bits)
+        return (bits * self._weights).sum(axis=2, dtype=np.uint32)
+
+    def candidates(self, vector, probes=None):
+        """Séries partageant une case (ou une case voisine) avec le vecteur, sans doublons."""
+        probes = self.probes if probes is None else min(probes, self.n_bits)
+        projections = self.planes @ vector
+        codes = self._codes(projections[None, :])[0]
+        projections = (projections - self.offsets).reshape(self.n_tables, self.n_bits)
+        # Cases voisines : on inverse les bits dont la projection est la plus proche de 0
+        unsure = np.argsort(np.abs(projections), axis=1)[:, :probes]
+        probe_codes = np.column_stack([codes[:, None], codes[:, None] ^ self._weights[unsure]])
+        found = []
+        for table in range(self.n_tables):
+            keys = self.sorted_codes[table]
+            starts = np.searchsorted(keys, probe_codes[table], side='left')
+            ends = np.searchsorted(keys, probe_codes[table], side='right')
+            found.extend(self.order[table, s:e] for s, e in zip(starts, ends) if e > s)
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int32)
+
+    def query(self, vector, k=10, exclude=None, probes=None):
+        """Top-k approché pour un vecteur (plongement) -> (lignes, scores) triés, scores > 0."""
+        vector = np.asarray(vector, dtype=np.float32)
+        rows = self.candidates(vector, probes)
+        if exclude is not None:
+            rows = rows[rows != exclude]
+        if len(rows) < k: # Trop peu de candidats : recherche exhaustive
+            rows = np.arange(len(self.vectors))
+            if exclude is not None:
+                rows = rows[rows != exclude]
+        scores = self.vectors[rows] @ vector
+        if len(rows) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        rows, scores = rows[order], scores[order]
+        keep = scores > 0
+        return rows[keep], scores[keep]
+
+    def similar(self, row, k=10, probes=None):
+        """Séries les plus proches d'une série du catalogue (elle-même exclue)."""
+        return self.query(self.vectors[row], k, exclude=row, probes=probes)
@@ -0,0 +1,132 @@
+import numpy as np
+import scipy.sparse as sp
+
+# =============================================================================
+# INDEX INVERSÉ (Terme -> séries) POUR LA RECHERCHE
+# =============================================================================
+
+
+class InvertedIndex:
+    """
+    Listes de postings de chaque terme du vocabulaire (colonnes CSC de la matrice TF-IDF).
+    Les séries étant normalisées L2, le cosinus avec la requête est la somme des
+    poids (requête × série) sur les termes communs : seuls les postings des termes
+    de la requête sont parcourus.
+    """
+
+    def __init__(self, tfidf_matrix):
+        csc = sp.csc_matrix(tfidf_matrix)
+        csc.sort_indices()
+        self.n_docs = csc.shape[0]
+        self.indptr = csc.indptr
+        self.docs = csc.indices
+        self.weights = csc.data
+        # Poids maximal de chaque terme (borne supérieure de sa contribution)
+        self.max_weight = np.zeros(csc.shape[1], dtype=self.weights.dtype)
+        lengths = np.diff(self.indptr)
+        present = np.flatnonzero(lengths)
+        if len(present):
+            self.max_weight[present] = np.maximum.reduceat(self.weights, self.indptr[present])
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.docs.nbytes + self.weights.nbytes + self.max_weight.nbytes
+
+    def postings(self, term):
+        start, end = self.indptr[term], self.indptr[term + 1]
+        return self.docs[start:end], self.weights[start:end]
+
+    def top_k(self, query_vec, k=50, seed_rows=None):
+        """
+        Top-k des séries pour un vecteur requête (1 × vocabulaire), par ordre décroissant.
+        Élagage de type MaxScore : dès que la somme des bornes des termes restants ne
+        peut plus dépasser le k-ième score, les termes restants ne font que compléter
+        le score des candidats déjà trouvés (et les candidats hors course sont écartés).
+        `seed_rows` : séries probablement pertinentes, scorées d'abord pour fixer un
+        seuil de départ (ex. résultats d'une requête préfixe) ; le résultat reste exact.
+        Retourne (lignes, scores) ; seules les séries de score > 0 sont renvoyées.
+        """
+        query_vec = sp.csr_matrix(query_vec)
+        terms, q_weights = query_vec.indices, query_vec.data
+        bounds = q_weights * self.max_weight[terms]
+        order = np.argsort(-bounds, kind='stable')
+        terms, q_weights, bounds = terms[order], q_weights[order], bounds[order]
+        # remaining[i] : contribution maximale des termes i, i+1, ...
+        remaining = np.concatenate([np.cumsum(bounds[::-1])[::-1], [0.0]])
+
+        cand_docs = np.empty(0, dtype=self.docs.dtype)
+        cand_scores = np.empty(0, dtype=np.float64)
+        threshold = 0.0
+        if seed_rows is not None and len(seed_rows):
+            threshold = self._seed_threshold(terms, q_weights, np.unique(np.asarray(seed_rows)), k)
+
+        for i, (term, q_weight) in enumerate(zip(terms, q_weights)):
+            docs, weights = self.postings(term)
+            if len(docs) == 0:
+                continue
+            contrib = q_weight * weights.astype(np.float64)
+
+            if remaining[i] >= threshold or len(cand_docs) < k:
+                # Terme essentiel : ses séries peuvent encore entrer dans le top-k
+                merged = np.concatenate([cand_docs, docs])
+                cand_docs, inverse = np.unique(merged, return_inverse=True)
+                cand_scores = np.bincount(inverse, weights=np.concatenate([cand_scores, contrib]),
+                                          minlength=len(cand_docs))
+            else:
+                # Terme non essentiel : on ne complète que les candidats existants
+                pos = np.searchsorted(docs, cand_docs)
+                pos_ok = np.minimum(pos, len(docs) - 1)
+                hit = (pos < len(docs)) & (docs[pos_ok] == cand_docs)
+                cand_scores[hit] += contrib[pos_ok[hit]]
+
+            # Seuil = k-ième meilleur score ; on écarte les candidats qui ne peuvent plus l'atteindre
+            if len(cand_docs) >= k:
+                threshold = max(threshold, np.partition(cand_scores, len(cand_scores) - k)[len(cand_scores) - k])
+                alive = cand_scores + remaining[i + 1] >= threshold
+                cand_docs, cand_scores = cand_docs[alive], cand_scores[alive]
+
+        keep = cand_scores > 0
+        cand_docs, cand_scores = cand_docs[keep], cand_scores[keep]
+        # Tri par score décroissant (à égalité : ligne la plus haute d'abord, comme argsort()[::-1])
+        order = np.lexsort((-cand_docs, -cand_scores))[:k]
+        return cand_docs[order], cand_scores[order]
+
+    def top_k_many(self, query_matrix, k=50):
+        """
+        Top-k de plusieurs requêtes (une par ligne) : un seul produit creux requêtes × séries,
+        limité aux postings des termes présents dans le lot, puis top-k de chaque ligne.
+        Même résultat que top_k ligne par ligne -> liste de (lignes, scores).
+        """
+        query_matrix = sp.csr_matrix(query_matrix, dtype=np.float64)
+        terms = np.unique(query_matrix.indices)
+        postings = sp.csr_matrix((self.weights, self.docs, self.indptr), shape=(len(self.indptr) - 1, self.n_docs))
+        scores = sp.csr_matrix(query_matrix[:, terms] @ postings[terms])
+        results = []
+        for q in range(scores.shape[0]):
+            start, end = scores.indptr[q], scores.indptr[q + 1]
+            docs, values = scores.indices[start:end], scores.data[start:end]
+            keep = values > 0
+            docs, values = docs[keep], values[keep]
+            if len(values) > k:
+                # Toutes les séries à égalité avec le k-ième score restent en lice (départage par ligne)
+                kth = np.partition(values, len(values) - k)[len(values) - k]
+                docs, values = docs[values >= kth], values[values >= kth]
+            order = np.lexsort((-docs, -values))[:k]
+            results.append((docs[order].astype(self.docs.dtype), values[order]))
+        return results
+
+    def _seed_threshold(self, terms, q_weights, seeds, k):
+        """k-ième score exact parmi les séries de départ (0 s'il y en a moins de k)."""
+        if len(seeds) < k:
+            return 0.0
+        scores = np.zeros(len(seeds), dtype=np.float64)
+        for term, q_weight in zip(terms, q_weights):
+            docs, weights = self.postings(term)
+            if len(docs) == 0:
+                continue
+            pos = np.searchsorted(docs, seeds)
+            pos_ok = np.minimum(pos, len(docs) - 1)
+            hit = (pos < len(docs)) & (docs[pos_ok] == seeds)
+            scores[hit] += q_weight * weights[pos_ok[hit]]
+        # Marge pour les arrondis : le seuil ne doit jamais dépasser le vrai k-ième score
+        return max(0.0, np.partition(scores, len(scores) - k)[len(scores) - k] * (1 - 1e-9))
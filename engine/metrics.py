@@ -0,0 +1,220 @@
+import cProfile
+import os
+import random
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+# =============================================================================
+# MÉTRIQUES (Histogrammes de latence, format texte Prometheus) ET PROFILAGE
+# =============================================================================
+# Aucune dépendance : les séries sont gardées en mémoire et rendues au format
+# d'exposition texte de Prometheus (version 0.0.4) par /metrics.
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Compteur croissant, une valeur par combinaison d'étiquettes."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, _labels(self.labels, key), value) for key, value in sorted(self._values.items())]
+
+
+class Histogram:
+    """Histogramme cumulatif (buckets 'le', somme, nombre), une série par combinaison d'étiquettes."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._series = {}  # étiquettes -> [compte par bucket (non cumulé), somme, nombre]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        slot = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][slot] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *label_values):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def count(self, *label_values):
+        series = self._series.get(label_values)
+        return series[2] if series else 0
+
+    def samples(self):
+        out = []
+        with self._lock:
+            for key, (counts, total, n) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, c in zip(self.buckets, counts):
+                    cumulative += c
+                    out.append((f"{self.name}_bucket", _labels(self.labels, key, [('le', _number(bound))]), cumulative))
+                out.append((f"{self.name}_sum", _labels(self.labels, key), total))
+                out.append((f"{self.name}_count", _labels(self.labels, key), n))
+        return out
+
+
+class Registry:
+    """Ensemble des métriques d'un processus ; les collecteurs ajoutent des jauges calculées au rendu."""
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def counter(self, name, help_text, labels=()):
+        metric = Counter(name, help_text, labels)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, help_text, labels, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def collector(self, func):
+        """`func()` -> lignes de texte (cf. render_gauge), calculées à chaque rendu."""
+        self.collectors.append(func)
+        return func
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(f"{name}{labels} {_number(value)}" for name, labels, value in metric.samples())
+        for func in self.collectors:
+            lines.extend(func())
+        return "\n".join(lines) + "\n"
+
+
+def render_gauge(name, help_text, values, label='name'):
+    """Jauge au format texte ; `values` est une valeur, ou {étiquette: valeur} (étiquette `label`)."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+    if isinstance(values, dict):
+        lines.extend(f'{name}{{{label}="{_escape(k)}"}} {_number(v)}' for k, v in values.items())
+    else:
+        lines.append(f"{name} {_number(values)}")
+    return lines
+
+
+def write_textfile(path, lines):
+    """Écrit un fichier de métriques (collecteur 'textfile' de node_exporter), de façon atomique."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.metrics-', dir=folder)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, path)
+
+
+# --- Étapes internes d'une requête ---
+REGISTRY = Registry()
+STAGE_SECONDS = REGISTRY.histogram('seriesminer_stage_seconds', "Durée des étapes internes des requêtes.",
+                                   ('route', 'stage'))
+_request = threading.local()
+
+
+def begin_request(route):
+    """Étiquette 'route' des étapes mesurées ensuite par ce thread."""
+    _request.route = route
+
+
+def stage(name):
+    """Chronomètre une étape (`with stage('transform'): ...`) de la requête en cours."""
+    return STAGE_SECONDS.time(getattr(_request, 'route', '-'), name)
+
+
+class SamplingProfiler:
+    """
+    Profilage cProfile d'une fraction `rate` des requêtes (une à la fois par processus) ;
+    le profil est écrit dans `folder` si la requête a duré plus de `slow_seconds`.
+    """
+
+    def __init__(self, rate=0.0, slow_seconds=0.25, folder=None, keep=100):
+        self.rate, self.slow_seconds, self.folder, self.keep = rate, slow_seconds, folder, keep
+        self.sampled = self.dumped = 0
+        self._busy = threading.Lock()
+
+    def start(self):
+        """Profil démarré pour la requête courante, ou None (non tirée, ou profil déjà en cours)."""
+        if self.rate <= 0 or random.random() >= self.rate or not self._busy.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError: # Autre profileur actif dans le processus
+            self._busy.release()
+            return None
+        self.sampled += 1
+        return profile
+
+    def finish(self, profile, route, elapsed):
+        """Arrête le profil ; le sauvegarde si la requête était lente -> chemin du fichier ou None."""
+        try:
+            profile.disable()
+        finally:
+            self._busy.release()
+        if elapsed < self.slow_seconds or not self.folder:
+            return None
+        os.makedirs(self.folder, exist_ok=True)
+        name = re.sub(r'\W+', '_', route).strip('_') or 'root'  # '/api/similar/<int:serie_id>' -> api_similar_int_serie_id
+        path = os.path.join(self.folder, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{int(elapsed * 1000)}ms.prof")
+        profile.dump_stats(path)
+        self.dumped += 1
+        self._prune()
+        return path
+
+    def _prune(self):
+        """Garde les `keep` profils les plus récents."""
+        files = sorted(f for f in os.listdir(self.folder) if f.endswith('.prof'))
+        for old in files[:max(0, len(files) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.folder, old))
+            except OSError:
+                pass
@@ -0,0 +1,160 @@
+import tempfile
+from collections import Counter
+from itertools import islice
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from engine.analyzer import get_analyzer
+
+# =============================================================================
+# MODÈLE TF-IDF
+# =============================================================================
+
+# Paramètres du vectoriseur (partagés par app.py et les scripts de build) ;
+# les termes (mots vides, racinisation) viennent de l'analyseur partagé, cf. vectorizer_params
+TFIDF_PARAMS = {
+    'max_features': 15000,
+    'ngram_range': (1, 2),
+    'sublinear_tf': True,
+}
+FIT_CHUNK_ROWS = 256  # Séries analysées à la fois par l'entraînement en flux
+TFIDF_MEMORY_MB = None  # Plafond (Mo) du comptage des n-grammes (étape 1 de l'entraînement) ; None : exact (= fit_tfidf)
+TERM_BYTES = 120  # Coût mémoire approximatif d'un n-gramme compté (chaîne, entier, case du dictionnaire)
+
+
+def vectorizer_params():
+    """TFIDF_PARAMS + tokenisation par l'analyseur configuré (textes et requêtes déjà nettoyés)."""
+    return dict(TFIDF_PARAMS, tokenizer=get_analyzer().terms, token_pattern=None, lowercase=False)
+
+
+def fit_tfidf(texts):
+    """Entraîne le vectoriseur sur les textes nettoyés -> (vectorizer, matrice)."""
+    vectorizer = TfidfVectorizer(**vectorizer_params())
+    matrix = vectorizer.fit_transform(texts)
+    return vectorizer, matrix
+
+
+def _chunks(texts, size):
+    iterator = iter(texts)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _prune_counts(totals, keep):
+    """Garde environ les `keep` n-grammes les plus fréquents (plafond mémoire du comptage)."""
+    counts = np.fromiter(totals.values(), dtype=np.int64, count=len(totals))
+    threshold = np.partition(counts, len(counts) - keep)[len(counts) - keep]
+    return Counter({term: c for term, c in totals.items() if c > threshold})
+
+
+def fit_tfidf_streaming(texts, chunk_rows=FIT_CHUNK_ROWS, memory_mb=TFIDF_MEMORY_MB, on_weighting=None):
+    """
+    Entraînement en flux, sans la matrice de comptage de tous les n-grammes que construit
+    fit_transform (plusieurs fois la taille du corpus avec les bigrammes) :
+      1. occurrences totales de chaque n-gramme, par paquets de `chunk_rows` textes, puis choix
+         des max_features plus fréquents exactement comme TfidfVectorizer (mêmes égalités) ;
+      2. comptage restreint au vocabulaire par paquets (fréquences documentaires -> IDF), les
+         comptages de chaque paquet attendant l'IDF dans un fichier temporaire, puis relecture
+         paquet par paquet : pondération et recopie dans la matrice CSR pré-allouée.
+    `texts` est parcouru deux fois (liste ou SeriesTexts). Avec memory_mb=None, même vocabulaire,
+    même IDF et même matrice que fit_tfidf. Sinon, le comptage de l'étape 1 est plafonné :
+    les n-grammes les plus rares sont oubliés au-delà (vocabulaire approché près du seuil).
+    Le plafond ne porte que sur l'étape 1 : l'étape 2 garde en mémoire la matrice résultat
+    (12 octets par valeur non nulle) et un seul paquet. `on_weighting`, appelé au début de
+    l'étape 2, sert aux bancs d'essai (pic de mémoire de chaque étape).
+    """
+    params = vectorizer_params()
+    max_features = params.pop('max_features')
+    params.pop('sublinear_tf')
+    analyze = CountVectorizer(**params).build_analyzer()
+    max_terms = None
+    if memory_mb is not None:
+        max_terms = max(int(memory_mb * 1e6 / TERM_BYTES), 4 * max_features)
+
+    # 1. Occurrences totales -> vocabulaire (tri alphabétique puis argsort, comme _limit_features)
+    totals = Counter()
+    for chunk in _chunks(texts, chunk_rows):
+        for text in chunk:
+            totals.update(analyze(text))
+        if max_terms is not None and len(totals) > max_terms:
+            totals = _prune_counts(totals, max_terms // 2)
+    if not totals:
+        raise ValueError("empty vocabulary; perhaps the documents only contain stop words")
+    terms = sorted(totals)
+    if len(terms) > max_features:
+        tfs = np.fromiter((totals[t] for t in terms), dtype=np.int64, count=len(terms))
+        kept = np.zeros(len(terms), dtype=bool)
+        kept[(-tfs).argsort()[:max_features]] = True
+        terms = [t for t, keep in zip(terms, kept) if keep]
+    vocabulary = {term: i for i, term in enumerate(terms)}
+    # Ordre de première apparition dans le corpus : ordre des colonnes dans chaque ligne de
+    # fit_transform (la somme des carrés de la norme L2 suit cet ordre, au bit près)
+    first_seen = np.empty(len(terms), dtype=np.int64)
+    first_seen[[vocabulary[t] for t in totals if t in vocabulary]] = np.arange(len(terms))
+    del totals
+
+    # 2. Comptages restreints au vocabulaire -> fréquences documentaires ; en attendant l'IDF,
+    #    les comptages de chaque paquet sont écrits sur disque (int32 : colonnes puis valeurs)
+    if on_weighting is not None:
+        on_weighting()
+    counter = CountVectorizer(vocabulary=vocabulary, **params)
+    df, row_lengths = np.zeros(len(terms), dtype=np.int64), []
+    with tempfile.TemporaryFile(prefix='seriesminer-tfidf-') as spill:
+        for chunk in _chunks(texts, chunk_rows):
+            counts = counter.transform(chunk)
+            df += np.bincount(counts.indices, minlength=len(terms))
+            row_lengths.append(np.diff(counts.indptr))
+            spill.write(counts.indices.astype(np.int32).tobytes())
+            spill.write(counts.data.astype(np.int32).tobytes())
+            del counts
+        n_docs = sum(len(lengths) for lengths in row_lengths)
+        idf = np.full(len(terms), n_docs + 1, dtype=np.float64)  # IDF lissé, calculé comme TfidfTransformer
+        idf /= df.astype(np.float64) + 1.0
+        np.log(idf, out=idf)
+        idf += 1.0
+
+        indptr = np.zeros(n_docs + 1, dtype=np.int64)
+        if n_docs:
+            np.cumsum(np.concatenate(row_lengths), out=indptr[1:])
+        data, indices = np.empty(indptr[-1], dtype=np.float64), np.empty(indptr[-1], dtype=np.int32)
+        spill.seek(0)
+        row = 0
+        for lengths in row_lengths:
+            start, stop = indptr[row], indptr[row + len(lengths)]
+            chunk_indices = np.frombuffer(spill.read(4 * (stop - start)), dtype=np.int32)
+            chunk_counts = np.frombuffer(spill.read(4 * (stop - start)), dtype=np.int32)
+            rows = np.repeat(np.arange(len(lengths)), lengths)
+            order = np.lexsort((first_seen[chunk_indices], rows))
+            chunk_indptr = indptr[row:row + len(lengths) + 1] - start
+            weights = sp.csr_matrix((chunk_counts[order].astype(np.float64), chunk_indices[order], chunk_indptr),
+                                    shape=(len(lengths), len(terms)))
+            np.log(weights.data, weights.data)  # sublinear_tf
+            weights.data += 1.0
+            weights.data *= idf[weights.indices]
+            weights = normalize(weights, copy=False)
+            data[start:stop], indices[start:stop] = weights.data, weights.indices
+            row += len(lengths)
+    matrix = sp.csr_matrix((data, indices, indptr), shape=(n_docs, len(terms)))
+    return restore_vectorizer(terms, idf), matrix
+
+
+def restore_vectorizer(terms, idf):
+    """Reconstruit un vectoriseur prêt à transformer, sans ré-entraînement."""
+    vectorizer = TfidfVectorizer(**vectorizer_params())
+    vectorizer.vocabulary_ = {term: i for i, term in enumerate(terms)}
+    vectorizer.idf_ = np.asarray(idf, dtype=np.float64)
+    return vectorizer
+
+
+def vocabulary_terms(vectorizer):
+    """Termes du vocabulaire rangés par indice de colonne."""
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, i in vectorizer.vocabulary_.items():
+        terms[i] = term
+    return terms
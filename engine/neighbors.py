@@ -0,0 +1,173 @@
+import numpy as np
+import scipy.sparse as sp
+
+# =============================================================================
+# INDEX DES PLUS PROCHES VOISINS (Top-k par série)
+# =============================================================================
+
+DEFAULT_K = 50
+DEFAULT_BLOCK_BYTES = 64 * 1024 * 1024  # Mémoire max d'un bloc de similarités
+# Coût par cellule d'un bloc : similarités float32 (x2 avec la copie) + argpartition int64
+_BYTES_PER_CELL = 16
+
+
+class NeighborIndex:
+    """
+    Garde seulement les k séries les plus similaires de chaque série.
+    Stockage CSR : indptr (int64), indices (int32), scores (float32).
+    """
+
+    def __init__(self, indptr, indices, scores, n_rows):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int32)
+        self.scores = np.asarray(scores, dtype=np.float32)
+        self.n_rows = int(n_rows)
+        self.matrix = sp.csr_matrix((self.scores, self.indices, self.indptr),
+                                    shape=(self.n_rows, self.n_rows))
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.indices.nbytes + self.scores.nbytes
+
+    def neighbors(self, row):
+        """Voisins d'une ligne, triés du plus au moins similaire."""
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return self.indices[start:end], self.scores[start:end]
+
+    def aggregate(self, rows, weights=None):
+        """Somme (pondérée) des lignes de voisins -> vecteur dense de scores."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if weights is None:
+            weights = np.ones(len(rows), dtype=np.float32)
+        if len(rows) == 0:
+            return np.zeros(self.n_rows, dtype=np.float32)
+        return np.asarray(self.matrix[rows].T @ np.asarray(weights, dtype=np.float32)).ravel()
+
+
+def _block_rows(n_rows, n_cols, max_block_bytes):
+    """Nombre de lignes par bloc pour rester sous la limite mémoire."""
+    per_row = n_rows * _BYTES_PER_CELL + n_cols * 8  # + la tranche densifiée du bloc (et sa copie)
+    return max(1, int(max_block_bytes // max(1, per_row)))
+
+
+def _select_top_k(vals, k, cols=None):
+    """
+    Top-k (scores > 0, triés) de chaque ligne d'un bloc dense de candidats.
+    `cols` donne la série de chaque candidat (par défaut : le numéro de colonne).
+    Retourne (indices, scores, nombre gardé par ligne).
+    """
+    n_cand = vals.shape[1]
+    k = min(k, n_cand)
+    if k <= 0:
+        return np.empty(0, np.int32), np.empty(0, np.float32), np.zeros(len(vals), np.int64)
+
+    top = np.argpartition(vals, n_cand - k, axis=1)[:, n_cand - k:]
+    top_scores = np.take_along_axis(vals, top, axis=1)
+    if cols is not None:
+        top = np.take_along_axis(cols, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind='stable')
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+    # On ne garde que les similarités strictement positives
+    keep = top_scores > 0
+    return top[keep], top_scores[keep], keep.sum(axis=1)
+
+
+def _top_k_rows(matrix, rows, k, max_block_bytes):
+    """Top-k exact de certaines lignes contre toutes les séries, calculé par blocs."""
+    n_rows = matrix.shape[0]
+    block = _block_rows(n_rows, matrix.shape[1], max_block_bytes)
+    for start in range(0, len(rows), block):
+        chunk = rows[start:start + block]
+        # Creux × dense : pas de matrice creuse intermédiaire à dimensionner
+        sims = np.ascontiguousarray((matrix @ matrix[chunk].toarray().T).T)
+        # La série elle-même n'est pas son propre voisin
+        sims[np.arange(len(chunk)), chunk] = -np.inf
+        yield chunk, _select_top_k(sims, k)
+
+
+def _assemble(n_rows, groups):
+    """Range en CSR des listes de voisins calculées par groupes de lignes [(rows, (indices, scores, counts))]."""
+    counts = np.zeros(n_rows, dtype=np.int64)
+    for rows, (_, _, row_counts) in groups:
+        counts[rows] = row_counts
+    indptr = np.concatenate([[0], np.cumsum(counts)])
+    indices = np.empty(indptr[-1], dtype=np.int32)
+    scores = np.empty(indptr[-1], dtype=np.float32)
+
+    for rows, (row_indices, row_scores, row_counts) in groups:
+        # Position de chaque voisin : début de sa ligne + rang dans la ligne
+        firsts = np.cumsum(row_counts) - row_counts
+        offsets = np.arange(len(row_indices)) - np.repeat(firsts, row_counts)
+        dest = np.repeat(indptr[rows], row_counts) + offsets
+        indices[dest] = row_indices
+        scores[dest] = row_scores
+    return NeighborIndex(indptr, indices, scores, n_rows)
+
+
+def build_neighbor_index(matrix, k=DEFAULT_K, max_block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Construit l'index top-k par blocs de lignes (pic mémoire borné).
+    `matrix` doit être normalisée L2 (cas de TfidfVectorizer) : produit scalaire = cosinus.
+    """
+    matrix = sp.csr_matrix(matrix, dtype=np.float32)
+    rows = np.arange(matrix.shape[0])
+    return _assemble(matrix.shape[0], list(_top_k_rows(matrix, rows, k, max_block_bytes)))
+
+
+def update_neighbor_index(index, old_to_new, matrix, changed_rows, k=DEFAULT_K,
+                          max_block_bytes=DEFAULT_BLOCK_BYTES):
+    """
+    Met à jour l'index après l'ajout, la modification ou la suppression de quelques séries.
+    - old_to_new : nouvelle ligne de chaque ancienne ligne (-1 si supprimée ou modifiée)
+    - changed_rows : nouvelles lignes des séries ajoutées ou modifiées
+    Le résultat est exact : les listes qui citaient une série modifiée/supprimée sont
+    recalculées, les autres sont fusionnées avec les similarités des séries modifiées.
+    """
+    matrix = sp.csr_matrix(matrix, dtype=np.float32)
+    n_rows = matrix.shape[0]
+    old_to_new = np.asarray(old_to_new, dtype=np.int64)
+    changed_rows = np.unique(np.asarray(changed_rows, dtype=np.int64))
+
+    # 1. Listes à recalculer entièrement
+    entry_targets = old_to_new[index.indices]
+    entry_rows = np.repeat(np.arange(index.n_rows), np.diff(index.indptr))
+    stale = old_to_new[np.unique(entry_rows[entry_targets < 0])]
+    recompute = np.zeros(n_rows, dtype=bool)
+    recompute[changed_rows] = True
+    recompute[stale[stale >= 0]] = True
+
+    groups = list(_top_k_rows(matrix, np.flatnonzero(recompute), k, max_block_bytes))
+
+    # 2. Listes conservées : anciens voisins + séries modifiées
+    old_of_new = np.full(n_rows, -1, dtype=np.int64)
+    moved = np.flatnonzero(old_to_new >= 0)
+    old_of_new[old_to_new[moved]] = moved
+    keep_rows = np.flatnonzero(~recompute)
+    if np.any(old_of_new[keep_rows] < 0):
+        raise ValueError("Ligne sans ancienne liste de voisins ni marquée comme modifiée.")
+
+    changed_t = matrix[changed_rows].T.tocsc() if len(changed_rows) else None
+    width = max(1, k + len(changed_rows))
+    block = max(1, int(max_block_bytes // (width * _BYTES_PER_CELL)))
+    for start in range(0, len(keep_rows), block):
+        chunk = keep_rows[start:start + block]
+        old_rows = old_of_new[chunk]
+        begins = index.indptr[old_rows]
+        lengths = index.indptr[old_rows + 1] - begins
+
+        # Anciennes listes complétées à k colonnes (-inf = case vide)
+        slots = np.arange(k)
+        filled = slots[None, :] < lengths[:, None]
+        positions = np.where(filled, begins[:, None] + slots[None, :], 0)
+        cols = np.where(filled, entry_targets[positions] if len(entry_targets) else -1, -1)
+        vals = np.where(filled, index.scores[positions] if len(index.scores) else 0, -np.inf)
+
+        if changed_t is not None:
+            sims = (matrix[chunk] @ changed_t).toarray()
+            cols = np.hstack([cols, np.broadcast_to(changed_rows, sims.shape)])
+            vals = np.hstack([vals, sims])
+        groups.append((chunk, _select_top_k(vals.astype(np.float32), k, cols=cols)))
+
+    return _assemble(n_rows, groups)
@@ -0,0 +1,22 @@
+import os
+
+# =============================================================================
+# DOSSIERS DU PROJET (Partagés par app.py et les scripts)
+# =============================================================================
+# Variables d'environnement lues à l'import (bancs d'essai, base temporaire) :
+#   SERIESMINER_DATABASE_DIR  base SQLite, modèle pré-calculé, métriques de l'ETL, profils
+#   SERIESMINER_DATA_DIR      sous-titres sources lus par l'ETL
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_DIR = os.environ.get('SERIESMINER_DATABASE_DIR', os.path.join(BASE_DIR, 'database'))
+DATA_DIR = os.environ.get('SERIESMINER_DATA_DIR', os.path.join(BASE_DIR, 'data'))
+
+
+def database_path(*parts):
+    """Chemin dans le dossier de la base (SERIESMINER_DATABASE_DIR s'il est défini)."""
+    return os.path.join(DATABASE_DIR, *parts)
+
+
+DB_PATH = database_path('series.db')
+ARTIFACT_DIR = database_path('model')  # Modèle pré-calculé (scripts/build_model.py)
+ETL_METRICS_PATH = database_path('etl_metrics.prom')  # Durées du dernier ETL (lu par /metrics)
@@ -0,0 +1,115 @@
+import numpy as np
+import scipy.sparse as sp
+
+from engine.collaborative import row_positions
+from engine.metrics import stage
+
+# =============================================================================
+# RECOMMANDATION CONTENT-BASED + COLLABORATIVE (Vectorisée, par lots d'utilisateurs)
+# =============================================================================
+
+DEFAULT_TOP_N = 10
+BATCH_USERS = 1024  # Utilisateurs traités par produit creux (borne la mémoire)
+
+
+def _top_n(rows, scores, n):
+    """Les n meilleurs scores (> 0) d'un utilisateur, triés (à égalité : ligne croissante)."""
+    keep = scores > 0
+    rows, scores = rows[keep], scores[keep]
+    if len(scores) > n:
+        part = np.argpartition(-scores, n - 1)[:n]
+        rows, scores = rows[part], scores[part]
+    order = np.lexsort((rows, -scores))
+    return rows[order].astype(np.int64), scores[order]
+
+
+class Recommender:
+    """
+    Score d'une série = somme des similarités avec les séries aimées (index des voisins),
+    éventuellement pondérée par la note. Un seul produit creux (utilisateurs × séries)
+    par lot d'utilisateurs, les séries déjà vues sont masquées sans boucle Python.
+    Avec un index de co-occurrences et blend > 0 :
+        score = (1 - blend) * score content-based + blend * score collaboratif
+    les deux étant des sommes de similarités cosinus avec les mêmes séries aimées.
+    """
+
+    def __init__(self, neighbors, catalogue, weighted=False, collaborative=None, blend=0.0):
+        self.neighbors = neighbors
+        self.catalogue = catalogue
+        self.weighted = weighted
+        self.collaborative = collaborative
+        self.blend = blend if collaborative is not None else 0.0
+
+    def _user_matrix(self, users, with_weights):
+        """Matrice creuse (utilisateurs × séries) à partir de listes de (serie_id, note)."""
+        owners, ids, weights = [], [], []
+        for u, ratings in enumerate(users):
+            for serie_id, rating in ratings:
+                owners.append(u)
+                ids.append(serie_id)
+                weights.append(rating if with_weights else 1.0)
+        rows = self.catalogue.lookup(ids)
+        known = rows >= 0
+        return sp.csr_matrix((np.asarray(weights, dtype=np.float32)[known],
+                              (np.asarray(owners, dtype=np.int64)[known], rows[known])),
+                             shape=(len(users), len(self.catalogue)))
+
+    def recommend_many(self, users, n=DEFAULT_TOP_N, exclude=None):
+        """
+        `users` : pour chaque utilisateur, ses notes (serie_id, note) à prendre en compte.
+        `exclude` : ids à ne pas recommander par utilisateur (par défaut : les séries notées).
+        Retourne, pour chaque utilisateur, (lignes, scores) triés par score décroissant.
+        """
+        users = [list(ratings) for ratings in users]
+        if exclude is None:
+            exclude = [[(serie_id, 1) for serie_id, _ in ratings] for ratings in users]
+        else:
+            exclude = [[(serie_id, 1) for serie_id in ids] for ids in exclude]
+
+        results = []
+        for start in range(0, len(users), BATCH_USERS):
+            with stage('aggregation'):
+                liked = self._user_matrix(users[start:start + BATCH_USERS], self.weighted)
+                seen = self._user_matrix(exclude[start:start + BATCH_USERS], False)
+                seen.data[:] = 1
+                scores = sp.csr_matrix(liked @ self.neighbors.matrix)
+            if self.blend > 0:
+                with stage('collaborative'):
+                    scores = sp.csr_matrix((1 - self.blend) * scores
+                                           + self.blend * (liked @ self.collaborative.similarity()))
+            with stage('ranking'):
+                scores = sp.csr_matrix(scores - scores.multiply(seen))
+                scores.eliminate_zeros()
+                for u in range(scores.shape[0]):
+                    begin, end = scores.indptr[u], scores.indptr[u + 1]
+                    results.append(_top_n(scores.indices[begin:end], scores.data[begin:end], n))
+        return results
+
+    def recommend(self, ratings, n=DEFAULT_TOP_N, exclude=None):
+        """
+        Recommandations d'un seul utilisateur -> (lignes, scores).
+        Même résultat que recommend_many, sans construire de matrice creuse :
+        on concatène directement les listes de voisins des séries aimées.
+        """
+        ratings = list(ratings)
+        with stage('aggregation'):
+            rows = self.catalogue.lookup([serie_id for serie_id, _ in ratings])
+            weights = np.array([rating if self.weighted else 1.0 for _, rating in ratings], dtype=np.float32)
+            weights, rows = weights[rows >= 0], rows[rows >= 0]
+
+            positions, lengths = row_positions(self.neighbors.indptr, rows)
+            candidates, inverse = np.unique(self.neighbors.indices[positions], return_inverse=True)
+            scores = np.bincount(inverse, weights=self.neighbors.scores[positions] * np.repeat(weights, lengths),
+                                 minlength=len(candidates)).astype(np.float32)
+
+        if self.blend > 0:
+            with stage('collaborative'):
+                dense = self.blend * self.collaborative.scores(rows, weights)
+                dense[candidates] += (1 - self.blend) * scores
+                candidates = np.flatnonzero(dense)
+                scores = dense[candidates].astype(np.float32)
+
+        with stage('ranking'):
+            seen = [serie_id for serie_id, _ in ratings] if exclude is None else list(exclude)
+            scores[np.isin(candidates, self.catalogue.lookup(seen))] = 0
+            return _top_n(candidates.astype(np.int64), scores, n)
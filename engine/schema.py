@@ -0,0 +1,246 @@
+import hashlib
+import sqlite3
+import zlib
+
+# =============================================================================
+# UNE NOTE PAR (UTILISATEUR, SÉRIE)
+# =============================================================================
+# Index unique : /api/rate écrit la note en un seul UPSERT atomique.
+
+RATINGS_UNIQUE_SQL = "CREATE UNIQUE INDEX IF NOT EXISTS idx_ratings_user_serie ON ratings(user_id, serie_id)"
+
+UPSERT_RATING_SQL = """
+    INSERT INTO ratings (user_id, serie_id, rating) VALUES (?, ?, ?)
+    ON CONFLICT(user_id, serie_id) DO UPDATE SET rating = excluded.rating
+"""
+
+
+def create_ratings_unique(conn):
+    """Crée l'index unique ; les doublons d'une base existante sont supprimés (on garde la dernière note)."""
+    conn.execute("""
+        DELETE FROM ratings WHERE id NOT IN (SELECT MAX(id) FROM ratings GROUP BY user_id, serie_id)
+    """)
+    conn.execute(RATINGS_UNIQUE_SQL)
+
+
+# =============================================================================
+# AGRÉGATS DES NOTES (Table series_stats, tenue à jour par triggers)
+# =============================================================================
+# Une ligne par série notée : nombre de notes, somme, et moyenne bayésienne
+#   score = (somme + PRIOR_WEIGHT * PRIOR_MEAN) / (nombre + PRIOR_WEIGHT)
+# Une seule note de 5/5 ne suffit plus à passer devant une série notée 4.5 par 100 personnes.
+# L'index sur score permet de lire le top-N directement, sans GROUP BY sur ratings.
+
+PRIOR_MEAN = 3.0  # Note moyenne supposée a priori
+PRIOR_WEIGHT = 5  # Poids de l'a priori (en nombre de notes fictives)
+
+
+def _score(total, count):
+    return f"(({total}) + {PRIOR_WEIGHT * PRIOR_MEAN!r}) / (({count}) + {PRIOR_WEIGHT})"
+
+
+_ADD_RATING = f"""
+    INSERT INTO series_stats (serie_id, rating_count, rating_sum, score)
+    VALUES (NEW.serie_id, 1, NEW.rating, {_score('NEW.rating', '1')})
+    ON CONFLICT(serie_id) DO UPDATE SET
+        rating_count = rating_count + 1,
+        rating_sum = rating_sum + NEW.rating,
+        score = {_score('rating_sum + NEW.rating', 'rating_count + 1')};
+"""
+
+_REMOVE_RATING = f"""
+    UPDATE series_stats SET
+        rating_count = rating_count - 1,
+        rating_sum = rating_sum - OLD.rating,
+        score = {_score('rating_sum - OLD.rating', 'rating_count - 1')}
+    WHERE serie_id = OLD.serie_id;
+    DELETE FROM series_stats WHERE serie_id = OLD.serie_id AND rating_count <= 0;
+"""
+
+SERIES_STATS_SQL = [
+    """
+    CREATE TABLE IF NOT EXISTS series_stats (
+        serie_id INTEGER PRIMARY KEY,
+        rating_count INTEGER NOT NULL,
+        rating_sum INTEGER NOT NULL,
+        score REAL NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_series_stats_score ON series_stats(score DESC, serie_id)",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_insert AFTER INSERT ON ratings
+    WHEN NEW.rating IS NOT NULL BEGIN {_ADD_RATING} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_delete AFTER DELETE ON ratings
+    WHEN OLD.rating IS NOT NULL BEGIN {_REMOVE_RATING} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_update_old AFTER UPDATE OF serie_id, rating ON ratings
+    WHEN OLD.rating IS NOT NULL BEGIN {_REMOVE_RATING} END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS trg_ratings_update_new AFTER UPDATE OF serie_id, rating ON ratings
+    WHEN NEW.rating IS NOT NULL BEGIN {_ADD_RATING} END
+    """,
+]
+
+TOP_RATED_SQL = """
+    SELECT s.id, s.title, st.score FROM series_stats st
+    JOIN series s ON s.id = st.serie_id
+    ORDER BY st.score DESC, st.serie_id LIMIT ?
+"""
+
+
+def create_series_stats(conn):
+    """Crée la table, l'index et les triggers (si absents). Retourne True si la table vient d'être créée."""
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'series_stats'").fetchone()
+    for statement in SERIES_STATS_SQL:
+        conn.execute(statement)
+    return exists is None
+
+
+def rebuild_series_stats(conn):
+    """Recalcule tous les agrégats depuis la table ratings -> nombre de séries notées."""
+    conn.execute("DELETE FROM series_stats")
+    conn.execute(f"""
+        INSERT INTO series_stats (serie_id, rating_count, rating_sum, score)
+        SELECT serie_id, COUNT(rating), SUM(rating), {_score('SUM(rating)', 'COUNT(rating)')}
+        FROM ratings WHERE rating IS NOT NULL GROUP BY serie_id
+    """)
+    return conn.execute("SELECT COUNT(*) FROM series_stats").fetchone()[0]
+
+
+# =============================================================================
+# TEXTE NETTOYÉ DES SÉRIES (Table series_text, compressé zlib)
+# =============================================================================
+# La table series ne garde que le catalogue (id, titre indexé) : /api/series et le
+# catalogue ne lisent que des pages étroites. Le texte, plusieurs Mo par série, est
+# rangé à part et compressé (zlib, bibliothèque standard) ; il est décompressé une
+# ligne à la fois pendant le parcours du curseur, jamais pour toute la table.
+# Chaque ligne garde aussi l'empreinte 64 bits de son texte, calculée à l'écriture :
+# l'empreinte du modèle se lit dans l'index couvrant, sans lire ni décompresser le texte.
+
+TEXT_LEVEL = 3  # Niveau zlib : 30 % de la taille, 3x plus rapide à écrire que le niveau 6
+
+SERIES_TEXT_SQL = [
+    "CREATE TABLE IF NOT EXISTS series_text (serie_id INTEGER PRIMARY KEY, digest INTEGER NOT NULL, text BLOB NOT NULL)",
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_series_delete AFTER DELETE ON series
+    BEGIN DELETE FROM series_text WHERE serie_id = OLD.id; END
+    """,
+]
+TEXT_DIGEST_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_series_text_digest ON series_text(serie_id, digest)"
+
+# Index imposé : pour une recherche par id, SQLite préfère sinon la clé primaire (pages du texte)
+SERIES_DIGESTS_SQL = """
+    SELECT s.id, s.title, t.digest FROM series s
+    LEFT JOIN series_text t INDEXED BY idx_series_text_digest ON t.serie_id = s.id ORDER BY s.id
+"""
+
+
+def _digest(body):
+    return int.from_bytes(hashlib.blake2b(body, digest_size=8).digest(), 'little', signed=True)  # INTEGER SQLite
+
+
+def text_digest(text):
+    """Empreinte 64 bits (entier signé) d'un texte nettoyé, telle que stockée dans series_text."""
+    return _digest((text or '').encode('utf-8'))
+
+
+def compress_text(text):
+    return zlib.compress((text or '').encode('utf-8'), TEXT_LEVEL)
+
+
+def decompress_text(blob):
+    """Texte d'une ligne de series_text ('' si la série n'a pas de texte)."""
+    return zlib.decompress(blob).decode('utf-8') if blob is not None else ''
+
+
+def write_series_text(conn, rows):
+    """Écrit (ou remplace) le texte de séries et son empreinte : rows = [(serie_id, texte), ...]."""
+    encoded = [(serie_id, (text or '').encode('utf-8')) for serie_id, text in rows]
+    conn.executemany("INSERT OR REPLACE INTO series_text (serie_id, digest, text) VALUES (?, ?, ?)",
+                     [(serie_id, _digest(body), zlib.compress(body, TEXT_LEVEL)) for serie_id, body in encoded])
+
+
+def add_text_digests(conn, chunk=256):
+    """Table series_text d'une version précédente : ajoute la colonne digest et la calcule (texte relu une fois)."""
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(series_text)")]
+    if 'digest' in columns:
+        return False
+    conn.execute("ALTER TABLE series_text ADD COLUMN digest INTEGER NOT NULL DEFAULT 0")
+    cursor = conn.execute("SELECT serie_id, text FROM series_text ORDER BY serie_id")
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            break
+        conn.executemany("UPDATE series_text SET digest = ? WHERE serie_id = ?",
+                         [(text_digest(decompress_text(blob)), serie_id) for serie_id, blob in rows])
+    return True
+
+
+def create_series_text(conn, chunk=256):
+    """
+    Crée la table, son trigger et l'index des empreintes ; déplace (en compressant) la colonne series.cleaned_text
+    d'une base créée par une version précédente. Retourne True si des textes ont été déplacés.
+    """
+    for statement in SERIES_TEXT_SQL:
+        conn.execute(statement)
+    add_text_digests(conn)
+    conn.execute(TEXT_DIGEST_INDEX_SQL)
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(series)")]
+    if 'cleaned_text' not in columns:
+        return False
+    moved = False
+    cursor = conn.execute("SELECT id, cleaned_text FROM series WHERE cleaned_text IS NOT NULL ORDER BY id")
+    while True:
+        rows = cursor.fetchmany(chunk)
+        if not rows:
+            break
+        write_series_text(conn, rows)
+        moved = True
+    try:
+        conn.execute("ALTER TABLE series DROP COLUMN cleaned_text")
+        return True
+    except sqlite3.OperationalError: # SQLite < 3.35 : colonne vidée seulement
+        conn.execute("UPDATE series SET cleaned_text = NULL")
+        return moved
+
+
+# =============================================================================
+# VERSION DU SCHÉMA (PRAGMA user_version)
+# =============================================================================
+# La mise à niveau (textes recompressés, colonne supprimée, VACUUM) peut durer longtemps
+# et verrouille la base : elle est faite par les scripts (setup_etl.py, build_model.py),
+# jamais par les workers web, qui vérifient seulement la version.
+
+SCHEMA_VERSION = 1  # series_stats, note unique par (utilisateur, série), series_text avec empreintes
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def check_schema(conn):
+    """Lève RuntimeError si la base n'est pas au schéma attendu (lecture de la version seule)."""
+    version = schema_version(conn)
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(f"Schéma de la base v{version}, v{SCHEMA_VERSION} attendu : "
+                           f"lancez python scripts/setup_etl.py --migrate avant de démarrer l'application")
+
+
+def ensure_schema(conn):
+    """Met à niveau une base créée par une version précédente de setup_etl.py -> True si elle a changé."""
+    if schema_version(conn) == SCHEMA_VERSION:
+        return False
+    if create_series_stats(conn):
+        rebuild_series_stats(conn)
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'idx_ratings_user_serie'").fetchone():
+        create_ratings_unique(conn)
+    moved = create_series_text(conn)
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    if moved:
+        conn.execute("VACUUM")  # Une seule fois : rend au disque les pages de l'ancienne colonne
+    return True
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+
+# =============================================================================
+# INSTANTANÉ DU MODÈLE (Remplacé d'un bloc, rechargement à chaud)
+# =============================================================================
+# Une requête lit `reloader.current` une seule fois puis n'utilise que cet
+# instantané : un rechargement concurrent ne peut pas lui donner un mélange
+# d'ancien et de nouveau modèle.
+
+ModelSnapshot = namedtuple('ModelSnapshot', 'version catalogue vectorizer tfidf_matrix neighbors term_stats '
+                                            'search_index suggest_index similar_index recommender origin loaded_at load_seconds '
+                                            'sources')
+
+DEFAULT_WATCH_INTERVAL = 30.0  # Secondes entre deux vérifications des sources
+
+
+class ModelReloader:
+    """
+    Construit les instantanés avec `loader()` et les publie par une seule affectation.
+    `probe()` résume l'état des sources (journal de l'ETL, modèle sur disque) :
+    la surveillance recharge en arrière-plan dès que ce résumé change.
+    L'état de référence est celui que couvre l'instantané (champ `sources`), sinon la sonde
+    relevée après le chargement : un modèle écrit par ce chargement ne déclenche pas le suivant.
+    `prepare(snapshot)` est appelé juste avant la publication, sous `publish_lock` (mises à jour
+    arrivées pendant la construction).
+    """
+
+    def __init__(self, loader, probe=None, prepare=None, publish_lock=None):
+        self.loader = loader
+        self.probe = probe
+        self.prepare = prepare
+        self.publish_lock = publish_lock
+        self.current = None
+        self.reloads = 0
+        self.last_error = None
+        self._state = None
+        self._lock = threading.Lock()
+        self._watcher = None
+
+    @property
+    def reloading(self):
+        return self._lock.locked()
+
+    def reload(self):
+        """Recharge maintenant (attend un rechargement déjà en cours) -> nouvel instantané."""
+        with self._lock:
+            try:
+                snapshot = self.loader()
+            except Exception as e: # L'ancien instantané reste en service
+                self.last_error = f"{type(e).__name__}: {e}"
+                raise
+            sources = getattr(snapshot, 'sources', None)
+            self._state = sources if sources is not None else (self.probe() if self.probe else None)
+            self.last_error = None
+            if snapshot is not None:
+                with self.publish_lock or nullcontext():
+                    if self.prepare is not None:
+                        self.prepare(snapshot)
+                    self.current = snapshot
+                self.reloads += 1
+            return self.current
+
+    def reload_async(self):
+        """Recharge dans un thread -> False si un rechargement est déjà en cours."""
+        if self.reloading:
+            return False
+        threading.Thread(target=self._reload_quietly, name='model-reload', daemon=True).start()
+        return True
+
+    def _reload_quietly(self):
+        try:
+            self.reload()
+        except Exception as e:
+            print(f"⚠️ Rechargement du modèle impossible : {e}")
+
+    def changed(self):
+        return self.probe is not None and self.probe() != self._state
+
+    def watch(self, interval=DEFAULT_WATCH_INTERVAL):
+        """Démarre la surveillance des sources (thread démon, une seule fois)."""
+        if self._watcher is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.changed():
+                        self._reload_quietly()
+                except Exception as e:
+                    print(f"⚠️ Surveillance du modèle : {e}")
+
+        self._watcher = threading.Thread(target=loop, name='model-watch', daemon=True)
+        self._watcher.start()
+
+    def info(self):
+        snapshot = self.current
+        info = {'reloading': self.reloading, 'reloads': self.reloads, 'last_error': self.last_error,
+                'watching': self._watcher is not None}
+        if snapshot is not None:
+            info.update({
+                'version': snapshot.version,
+                'origin': snapshot.origin,
+                'n_series': len(snapshot.catalogue),
+                'loaded_at': snapshot.loaded_at,
+                'load_seconds': round(snapshot.load_seconds, 3),
+            })
+        return info
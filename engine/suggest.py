@@ -0,0 +1,109 @@
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+from engine.text import remove_accents
+
+# =============================================================================
+# SUGGESTIONS PENDANT LA FRAPPE (Index de préfixes : tableau trié + bisect)
+# =============================================================================
+# Deux tableaux triés de clés normalisées (minuscules, sans accents ni ponctuation) :
+#   - titres des séries, indexés à chaque début de mot ("bad" trouve "Breaking Bad"),
+#     classés par popularité (nombre de notes) ;
+#   - termes du vocabulaire TF-IDF (mots et bigrammes), classés par nombre de séries.
+# Un préfixe correspond à un intervalle [bisect_left(p), bisect_left(p + '\uffff')[ de chaque tableau.
+
+DEFAULT_LIMIT = 8
+_END = '\uffff'  # Plus grand que tout caractère d'une clé normalisée
+_SEPARATORS = re.compile(r'[\W_]+')  # Ponctuation : séparateur de mots, comme pour le vectoriseur
+
+
+def normalize_key(text):
+    """Clé de comparaison : minuscules, sans accents, mots séparés par un espace ("L'Île" -> "l ile")."""
+    return " ".join(_SEPARATORS.sub(' ', remove_accents(str(text).lower())).split())
+
+
+class _SortedKeys:
+    """Clés triées, avec pour chacune une valeur (ligne, terme...) et un poids de classement."""
+
+    def __init__(self, keys, values, weights):
+        order = np.array(sorted(range(len(keys)), key=keys.__getitem__), dtype=np.intp)
+        self.keys = [keys[i] for i in order]
+        self.values = np.asarray(values)[order]
+        self.weights = np.asarray(weights, dtype=np.float64)[order]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def span(self, prefix):
+        return bisect_left(self.keys, prefix), bisect_left(self.keys, prefix + _END)
+
+    def best(self, prefix, limit):
+        """Positions des meilleures clés commençant par `prefix`, par poids décroissant (puis ordre alphabétique)."""
+        start, end = self.span(prefix)
+        if end - start > limit:
+            weights = self.weights[start:end]
+            top = np.argpartition(-weights, limit - 1)[:limit]
+            top = top[np.lexsort((top, -weights[top]))]
+            return start + top
+        positions = np.arange(start, end)
+        return positions[np.argsort(-self.weights[start:end], kind='stable')]
+
+
+class SuggestIndex:
+    """Index de préfixes des titres et du vocabulaire, construit avec chaque instantané du modèle."""
+
+    def __init__(self, titles, popularity, terms, doc_freq):
+        keys, rows, weights = [], [], []
+        popularity = np.asarray(popularity, dtype=np.float64).tolist()
+        for row, title in enumerate(titles):
+            words = normalize_key(title).split()
+            for start in range(len(words)):
+                keys.append(" ".join(words[start:]))
+                rows.append(row)
+                # Début du titre devant un mot du milieu, à popularité égale
+                weights.append(popularity[row] + (0.5 if start == 0 else 0.0))
+        self.titles = _SortedKeys(keys, np.asarray(rows, dtype=np.int64), weights)
+        self.terms = _SortedKeys(list(terms), np.arange(len(terms)), doc_freq)
+        self.term_list = list(terms)
+
+    @property
+    def nbytes(self):
+        return (sum(len(k) for k in self.titles.keys) + self.titles.values.nbytes + self.titles.weights.nbytes
+                + sum(len(k) for k in self.terms.keys) + self.terms.values.nbytes + self.terms.weights.nbytes)
+
+    def series(self, prefix, limit=DEFAULT_LIMIT):
+        """Lignes des séries dont un mot du titre commence par le préfixe (sans doublon)."""
+        prefix = normalize_key(prefix)
+        if not prefix:
+            return []
+        rows = []
+        # Plusieurs clés par série : on en demande plus que `limit` pour compenser les doublons
+        for position in self.titles.best(prefix, limit * 4):
+            row = int(self.titles.values[position])
+            if row not in rows:
+                rows.append(row)
+                if len(rows) == limit:
+                    break
+        return rows
+
+    def words(self, prefix, limit=DEFAULT_LIMIT):
+        """
+        Termes du vocabulaire qui complètent la saisie. Avec plusieurs mots, les bigrammes
+        commençant par la saisie d'abord, puis le dernier mot complété par un mot seul.
+        """
+        prefix = normalize_key(prefix)
+        if not prefix:
+            return []
+        found = [self.term_list[self.terms.values[p]] for p in self.terms.best(prefix, limit)]
+        head, _, last = prefix.rpartition(" ")
+        if head and len(found) < limit and last:
+            for p in self.terms.best(last, limit * 4):
+                term = self.term_list[self.terms.values[p]]
+                completion = f"{head} {term}"
+                if " " not in term and completion not in found:
+                    found.append(completion)
+                    if len(found) == limit:
+                        break
+        return found
@@ -0,0 +1,84 @@
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import CountVectorizer
+
+# =============================================================================
+# STATISTIQUES DE TERMES PAR SÉRIE (Bonus de la recherche)
+# =============================================================================
+
+
+def _count_texts(texts, n_rows):
+    """Compte les mots (séparés par des espaces, comme le texte nettoyé) -> (mots, matrice CSR)."""
+    counter = CountVectorizer(tokenizer=str.split, token_pattern=None, lowercase=False, dtype=np.int32)
+    try:
+        counts = counter.fit_transform(texts)
+    except ValueError: # Aucun mot dans les textes
+        return [], sp.csr_matrix((n_rows, 0), dtype=np.int32)
+    return counter.get_feature_names_out().tolist(), counts
+
+
+class TermStats:
+    """
+    Nombre d'occurrences de chaque mot exact dans chaque série (CSC : mot -> séries).
+    Contrairement au vocabulaire TF-IDF (limité à 15000 termes, sans mots vides),
+    tous les mots du texte nettoyé sont comptés : les bonus de la recherche
+    deviennent des recherches dichotomiques au lieu de parcours du texte complet.
+    """
+
+    def __init__(self, tokens, counts):
+        self.tokens = list(tokens)
+        self.column = {token: i for i, token in enumerate(self.tokens)}
+        self.counts = sp.csc_matrix(counts, dtype=np.int32)
+        self.counts.sort_indices()
+
+    @classmethod
+    def from_texts(cls, texts, n_rows=None):
+        """`texts` peut être un itérable (lu une seule fois) si n_rows est donné."""
+        if n_rows is None:
+            texts = list(texts)
+            n_rows = len(texts)
+        tokens, counts = _count_texts(texts, n_rows)
+        return cls(tokens, counts)
+
+    @property
+    def nbytes(self):
+        return self.counts.data.nbytes + self.counts.indices.nbytes + self.counts.indptr.nbytes
+
+    def counts_for(self, rows, tokens):
+        """Occurrences (mot entier) de chaque mot dans chaque ligne -> tableau (lignes × mots)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.zeros((len(rows), len(tokens)), dtype=np.int64)
+        for j, token in enumerate(tokens):
+            col = self.column.get(token)
+            if col is None:
+                continue
+            start, end = self.counts.indptr[col], self.counts.indptr[col + 1]
+            docs = self.counts.indices[start:end]
+            if len(docs) == 0:
+                continue
+            pos = np.searchsorted(docs, rows)
+            pos_ok = np.minimum(pos, len(docs) - 1)
+            hit = (pos < len(docs)) & (docs[pos_ok] == rows)
+            out[hit, j] = self.counts.data[start:end][pos_ok[hit]]
+        return out
+
+    def with_rows(self, source, texts):
+        """
+        Nouvelles statistiques après mise à jour incrémentale : la ligne i reprend
+        l'ancienne ligne source[i], ou le texte texts[source[i] - n_anciennes] au-delà.
+        """
+        new_tokens, new_counts = _count_texts(texts, len(texts))
+        tokens, column = list(self.tokens), dict(self.column)
+        remap = np.empty(len(new_tokens), dtype=np.int64)
+        for i, token in enumerate(new_tokens):
+            if token not in column:
+                column[token] = len(tokens)
+                tokens.append(token)
+            remap[i] = column[token]
+
+        new_counts = sp.csr_matrix(new_counts)
+        new_counts = sp.csr_matrix((new_counts.data, remap[new_counts.indices], new_counts.indptr),
+                                   shape=(new_counts.shape[0], len(tokens)))
+        old_counts = self.counts.tocsr()
+        old_counts.resize(old_counts.shape[0], len(tokens))
+        return TermStats(tokens, sp.vstack([old_counts, new_counts]).tocsr()[source])
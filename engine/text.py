@@ -0,0 +1,41 @@
+import re
+import unicodedata
+
+# =============================================================================
+# NETTOYAGE DU TEXTE (Briques de l'analyseur partagé, cf. engine/analyzer.py)
+# =============================================================================
+
+# Une seule passe pour les trois remplacements de l'ancien nettoyage (timestamp SRT, balise
+# HTML, caractère non alphanumérique) : mêmes mots qu'en trois passes, car un timestamp ne
+# contient ni '<' ni '>' et les branches commencent par des caractères différents.
+# La ponctuation est remplacée par séquences entières ; un '<' sans '>' est un caractère comme un autre.
+_NOISE = re.compile(r'[^a-zA-Z0-9\s<]+|\d{2}:\d{2}:\d{2}[,.]\d{3}|<[^>]+>|<')
+# Lignes de structure SRT : numéro de réplique et ligne "00:00:01,000 --> 00:00:02,000"
+_SRT_LINES = re.compile(r'^[ \t]*\d+[ \t]*\r?$|^.*-->.*$', re.MULTILINE)
+
+
+def remove_accents(input_str):
+    """
+    Transforme les caractères accentués en caractères normaux.
+    Exemple: 'Île' -> 'Ile', 'été' -> 'ete', 'çà' -> 'ca'
+    """
+    if not isinstance(input_str, str): return str(input_str)
+    if input_str.isascii(): # Rien à décomposer
+        return input_str
+    # Normalisation NFKD (décompose les caractères : é devient e + ')
+    nfkd_form = unicodedata.normalize('NFKD', input_str)
+    # Retrait des combinants : un str.replace par caractère distinct (quelques-uns par texte)
+    for c in set(nfkd_form):
+        if unicodedata.combining(c):
+            nfkd_form = nfkd_form.replace(c, '')
+    return nfkd_form
+
+
+def strip_srt_lines(text):
+    """Remplace par un espace les numéros de réplique et les lignes '-->' (fins de ligne gardées)."""
+    return _SRT_LINES.sub(' ', text)
+
+
+def split_words(text):
+    """Mots en minuscules, sans balises, timestamps ni ponctuation (texte déjà sans accents)."""
+    return _NOISE.sub(' ', text).lower().split()
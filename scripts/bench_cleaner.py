@@ -0,0 +1,109 @@
+import argparse
+import os
+import re
+import sys
+import time
+import unicodedata
+import zipfile
+
+# Ajout de la racine du projet au path (package engine)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.analyzer import Analyzer, clean_text, get_analyzer
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+
+def legacy_remove_accents(input_str):
+    nfkd_form = unicodedata.normalize('NFKD', input_str)
+    return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
+
+
+def legacy_clean(text):
+    """Ancien nettoyage : quatre passes (accents, timestamps, balises, ponctuation)."""
+    text = legacy_remove_accents(text)
+    text = re.sub(r'\d{2}:\d{2}:\d{2}[,.]\d{3}.*?', ' ', text)
+    text = re.sub(r'<[^>]+>', ' ', text)
+    text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
+    words = text.lower().strip().split()
+    stop_words = get_analyzer().stop_words
+    return " ".join(w for w in words if w not in stop_words and len(w) > 2)
+
+
+def decode(raw):
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        return raw.decode('latin-1')
+
+
+def load_subtitles(folder):
+    """Textes des fichiers .srt/.txt du dossier, y compris ceux rangés dans des archives."""
+    texts = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            if name.endswith(('.srt', '.txt')):
+                with open(path, 'rb') as f:
+                    texts.append(decode(f.read()))
+            elif name.endswith('.zip'):
+                with zipfile.ZipFile(path) as z:
+                    texts.extend(decode(z.read(m)) for m in z.namelist() if m.endswith(('.srt', '.txt')))
+    return texts
+
+
+def throughput(clean, texts, repeat, reset=None):
+    """Meilleur débit sur `repeat` passes, en Mo/s de texte source (`reset()` avant chaque passe)."""
+    size = sum(len(t.encode('utf-8')) for t in texts) / 1e6
+    best = float('inf')
+    for _ in range(repeat):
+        if reset is not None:
+            reset()
+        start = time.perf_counter()
+        outputs = [clean(t) for t in texts]
+        best = min(best, time.perf_counter() - start)
+    return size / best, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Débit du nettoyage des sous-titres : quatre passes vs passe unique.")
+    parser.add_argument('--data', default=DATA_DIR, help="dossier des sous-titres (data/ par défaut)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--stemmer', default='french', help="langue du stemmer Snowball comparé")
+    args = parser.parse_args()
+
+    texts = load_subtitles(args.data)
+    if not texts:
+        print(f"❌ Erreur : aucun sous-titre dans {args.data}")
+        sys.exit(1)
+    print(f"{len(texts)} fichiers, {sum(len(t.encode('utf-8')) for t in texts) / 1e6:.1f} Mo")
+
+    legacy_rate, expected = throughput(legacy_clean, texts, args.repeat)
+    fused_rate, outputs = throughput(clean_text, texts, args.repeat)
+    srt_rate, _ = throughput(lambda t: clean_text(t, srt=True), texts, args.repeat)
+
+    print(f"{'méthode':<16} | {'Mo/s':>8} | {'identique':>9}")
+    print("-" * 40)
+    print(f"{'4 passes':<16} | {legacy_rate:>8.1f} | {'-':>9}")
+    print(f"{'passe unique':<16} | {fused_rate:>8.1f} | {str(outputs == expected):>9}")
+    print(f"{'+ lignes SRT':<16} | {srt_rate:>8.1f} | {'-':>9}")
+
+    # Termes du vectoriseur (sur le texte nettoyé), avec ou sans racinisation, en Mo/s de texte
+    # source comme ci-dessus. Cache des racines vidé avant chaque passe : coût d'un premier entraînement
+    print(f"\n{'termes':<28} | {'Mo/s':>8}")
+    print("-" * 40)
+    stemmed = Analyzer(stemmer=args.stemmer)
+    uncached = Analyzer(stemmer=args.stemmer)
+    uncached.stem = uncached.stem.__wrapped__
+    size = sum(len(t.encode('utf-8')) for t in texts) / 1e6
+    for name, analyzer in (('mots entiers', get_analyzer()), ('racines mémoïsées', stemmed),
+                           ('racines sans cache', uncached)):
+        reset = analyzer.stem.cache_clear if hasattr(analyzer.stem, 'cache_clear') else None
+        rate, _ = throughput(analyzer.terms, outputs, args.repeat, reset)
+        # throughput compte la taille du texte nettoyé : ramenée au texte source
+        clean_mb = sum(len(t.encode('utf-8')) for t in outputs) / 1e6
+        print(f"{name:<28} | {rate * size / clean_mb:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
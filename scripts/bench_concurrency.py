@@ -0,0 +1,103 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import numpy as np
+
+# Ajout de la racine du projet au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+from engine.db import ConnectionPool
+
+
+def client_loop(series_ids, requests, seed, results):
+    """Un client : inscription, puis alternance de notes et de recommandations."""
+    rng = np.random.default_rng(seed)
+    client = app_module.app.test_client()
+    client.post('/api/register', json={'username': f"bench_{uuid.uuid4().hex}", 'password': 'x'})
+    ok = errors = 0
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        if rng.random() < 0.5:
+            response = client.post('/api/rate', json={'serie_id': int(rng.choice(series_ids)),
+                                                      'rating': int(rng.integers(1, 6))})
+        else:
+            response = client.get('/api/recommend')
+        latencies.append(time.perf_counter() - start)
+        if response.status_code == 200:
+            ok += 1
+        else: # "database is locked" -> erreur 500
+            errors += 1
+    results.append((ok, errors, latencies))
+
+
+def run(mode, db_path, threads, requests):
+    if mode == 'legacy':
+        # Avant : journal de rollback, une nouvelle connexion par requête
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+        app_module.db_pool = ConnectionPool(db_path, max_idle=0, pragmas=())
+    else:
+        app_module.db_pool = ConnectionPool(db_path)
+    app_module.reco_cache.clear()
+
+    series_ids = [int(i) for i in app_module.reloader.current.catalogue.ids]
+    results, workers = [], []
+    start = time.perf_counter()
+    for t in range(threads):
+        worker = threading.Thread(target=client_loop, args=(series_ids, requests, t, results))
+        worker.start()
+        workers.append(worker)
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+    app_module.db_pool.close_all()
+
+    ok = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    latencies = np.concatenate([r[2] for r in results]) * 1000
+    return ok / elapsed, errors, np.percentile(latencies, 50), np.percentile(latencies, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Charge concurrente sur /api/rate et /api/recommend.")
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--requests', type=int, default=200, help="requêtes par thread")
+    args = parser.parse_args()
+
+    if app_module.reloader.current is None:
+        print("❌ Erreur : Base de données absente. Lancez scripts/setup_etl.py")
+        sys.exit(1)
+
+    tmp = tempfile.mkdtemp(prefix='seriesminer-load-')
+    try:
+        print(f"{'threads':>7} | {'mode':<7} | {'req/s':>8} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'erreurs':>7}")
+        print("-" * 62)
+        for threads in args.threads:
+            for mode in ('legacy', 'pool'):
+                # Copie fraîche de la base pour chaque mesure (la vraie base n'est pas modifiée)
+                db_path = os.path.join(tmp, f'{mode}-{threads}.db')
+                source = sqlite3.connect(app_module.DB_PATH)
+                target = sqlite3.connect(db_path)
+                source.backup(target)
+                source.close()
+                target.close()
+                app_module.DB_PATH = db_path
+
+                throughput, errors, p50, p99 = run(mode, db_path, threads, args.requests)
+                print(f"{threads:>7} | {mode:<7} | {throughput:>8.0f} | {p50:>9.2f} | {p99:>9.2f} | {errors:>7}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Ajout de la racine du projet au path
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from bench_memory import rss_mb, synthetic_database
+from engine.catalogue import SeriesTexts
+from engine.model import fit_tfidf, fit_tfidf_streaming, vocabulary_terms
+
+
+def reset_peak_rss():
+    """Remet le pic de RSS (VmHWM) au RSS courant (Linux >= 4.0) ; False si impossible."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def run_mode(mode, db_path, out_prefix):
+    """Entraînement TF-IDF seul dans ce processus ; vocabulaire et matrice écrits pour comparaison."""
+    texts = SeriesTexts(db_path)
+    stages = {}
+
+    def on_weighting():
+        # Fin de l'étape 1 : son pic est relevé, puis remis à zéro pour mesurer celui de l'étape 2
+        stages['vocabulaire'] = rss_mb()[1]
+        stages['reset'] = reset_peak_rss()
+
+    start = time.perf_counter()
+    if mode == 'fit_transform':
+        vectorizer, matrix = fit_tfidf(texts)
+    elif mode == 'flux':
+        vectorizer, matrix = fit_tfidf_streaming(texts, memory_mb=None, on_weighting=on_weighting)
+    else: # flux-<Mo>
+        vectorizer, matrix = fit_tfidf_streaming(texts, memory_mb=float(mode.split('-')[1]),
+                                                 on_weighting=on_weighting)
+    elapsed = time.perf_counter() - start
+    _, peak = rss_mb()
+    stage1 = stages.get('vocabulaire', float('nan'))
+    stage2 = peak if stages.get('reset') else float('nan')
+    peak = max(peak, stage1) if stages else peak
+    with open(out_prefix + '.txt', 'w', encoding='utf-8') as f:
+        f.write("\n".join(vocabulary_terms(vectorizer)))
+    np.save(out_prefix + '.npy', matrix.data)
+    print(f"{peak:.1f}\t{elapsed:.2f}\t{matrix.nnz}\t{stage1:.1f}\t{stage2:.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entraînement TF-IDF : fit_transform vs flux (exact, plafonné).")
+    parser.add_argument('--series', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=5000, help="mots par série")
+    parser.add_argument('--caps', type=int, nargs='*', default=[50, 20], help="plafonds mémoire (Mo) du mode flux")
+    parser.add_argument('--db', help="base existante (sinon : base synthétique)")
+    parser.add_argument('--child', nargs=3, metavar=('MODE', 'DB', 'OUT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_mode(*args.child)
+        return
+
+    tmp = tempfile.mkdtemp(prefix='seriesminer-fit-')
+    try:
+        db_path = args.db
+        if db_path is None:
+            db_path = os.path.join(tmp, 'series.db')
+            print(f"Génération de {args.series} séries x {args.words} mots...")
+            synthetic_database(db_path, args.series, args.words)
+
+        print("\n--- Entraînement TF-IDF (processus séparés) ---")
+        # Pic RSS : tout l'entraînement ; Étape 1 / Étape 2 : pic du comptage des n-grammes (seul
+        # plafonné par memory_mb) puis de la pondération (matrice résultat + un paquet)
+        print(f"{'Mode':<15}{'Pic RSS':>12}{'Étape 1':>12}{'Étape 2':>12}{'Temps':>10}{'Vocabulaire':>14}{'Matrice':>12}")
+        reference = None
+        for mode in ['fit_transform', 'flux'] + [f"flux-{cap}" for cap in args.caps]:
+            out_prefix = os.path.join(tmp, mode)
+            out = subprocess.run([sys.executable, __file__, '--child', mode, db_path, out_prefix],
+                                 capture_output=True, text=True, check=True).stdout
+            peak, elapsed, _, stage1, stage2 = out.strip().splitlines()[-1].split('\t')
+            with open(out_prefix + '.txt', encoding='utf-8') as f:
+                vocab = f.read().split("\n")
+            data = np.load(out_prefix + '.npy')
+            if reference is None:
+                reference = (vocab, data)
+            common = len(set(vocab) & set(reference[0])) / len(reference[0])
+            same = vocab == reference[0] and np.array_equal(data, reference[1])
+            stages = ''.join(f"{float(v):>9.1f} Mo" if v != 'nan' else f"{'-':>12}" for v in (stage1, stage2))
+            print(f"{mode:<15}{float(peak):>9.1f} Mo{stages}{float(elapsed):>8.2f} s{common:>13.1%} "
+                  f"{'identique' if same else 'différente':>12}")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+import argparse
+import ctypes
+import gc
+import os
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Ajout de la racine du projet au path
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from engine.artifacts import fit_model, series_digests, stored_digests
+from engine.catalogue import Catalogue, SeriesTexts
+from engine.schema import create_series_text, decompress_text, write_series_text
+
+
+def rss_mb():
+    """(RSS courant, pic de RSS) du processus en Mo, lus dans /proc (Linux)."""
+    values = {}
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith(('VmRSS:', 'VmHWM:')):
+                key, value = line.split(':')
+                values[key] = int(value.split()[0]) / 1024
+    return values.get('VmRSS', 0.0), values.get('VmHWM', 0.0)
+
+
+def release_free_memory():
+    """Rend au système la mémoire libérée par Python (sinon le RSS garde le pic de l'entraînement)."""
+    gc.collect()
+    try:
+        ctypes.CDLL('libc.so.6').malloc_trim(0)
+    except (OSError, AttributeError): # Pas de glibc
+        pass
+
+
+def synthetic_database(path, n_series, words_per_serie, vocab_size=20000, seed=0):
+    """Base series factice : mots tirés selon une loi de Zipf, comme un vrai corpus."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"mot{i}" for i in range(vocab_size)])
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE series (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT UNIQUE)")
+    create_series_text(conn)
+    for i in range(n_series):
+        words = vocab[np.minimum(rng.zipf(1.3, size=words_per_serie), vocab_size) - 1]
+        serie_id = conn.execute("INSERT INTO series (title) VALUES (?)", (f"serie_{i}",)).lastrowid
+        write_series_text(conn, [(serie_id, " ".join(words))])
+    conn.commit()
+    conn.close()
+
+
+def run_mode(mode, db_path):
+    """Démarrage tel que fait par init_app, avant (DataFrame) ou après (catalogue) la modification."""
+    base_rss, _ = rss_mb()
+    start = time.perf_counter()
+    conn = sqlite3.connect(db_path)
+    if mode == 'dataframe':
+        import pandas as pd
+        resident = pd.read_sql_query("SELECT s.id, s.title, t.text FROM series s "
+                                     "LEFT JOIN series_text t ON t.serie_id = s.id ORDER BY s.id", conn)
+        resident['cleaned_text'] = resident.pop('text').map(decompress_text)
+        digests = series_digests(resident[['id', 'title', 'cleaned_text']].itertuples(index=False))
+        model = fit_model(digests, list(resident['cleaned_text']))
+        data_mb = resident.memory_usage(deep=True).sum() / 1e6
+    else:
+        resident = Catalogue.from_connection(conn)
+        digests = stored_digests(conn)
+        model = fit_model(digests, SeriesTexts(db_path))
+        data_mb = resident.nbytes / 1e6
+    conn.close()
+    elapsed = time.perf_counter() - start
+    release_free_memory()
+    rss, peak = rss_mb()
+    print(f"{mode}\t{data_mb:.1f}\t{rss - base_rss:.1f}\t{peak:.1f}\t{elapsed:.2f}\t{len(model.ids)}")
+
+
+def main():
+    """Mesure la mémoire résidente du démarrage, avec et sans le texte complet en RAM."""
+    parser = argparse.ArgumentParser(description="Empreinte mémoire de init_app (RSS)")
+    parser.add_argument('--series', type=int, default=2000)
+    parser.add_argument('--words', type=int, default=5000, help="mots par série")
+    parser.add_argument('--child', nargs=2, metavar=('MODE', 'DB'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        run_mode(*args.child)
+        return
+
+    tmp = tempfile.mkdtemp(prefix='seriesminer-mem-')
+    try:
+        db_path = os.path.join(tmp, 'series.db')
+        print(f"Génération de {args.series} séries x {args.words} mots...")
+        synthetic_database(db_path, args.series, args.words)
+        print(f"   Base : {os.path.getsize(db_path) / 1e6:.0f} Mo")
+
+        print("\n--- Mémoire après démarrage (processus séparés) ---")
+        print(f"{'Mode':<12}{'Catalogue':>12}{'RSS résident':>15}{'Pic RSS':>12}{'Temps':>10}")
+        for mode in ('dataframe', 'catalogue'):
+            out = subprocess.run([sys.executable, __file__, '--child', mode, db_path],
+                                 capture_output=True, text=True, check=True).stdout
+            _, data, resident, peak, elapsed, _ = out.strip().splitlines()[-1].split('\t')
+            print(f"{mode:<12}{float(data):>9.1f} Mo{float(resident):>12.1f} Mo"
+                  f"{float(peak):>9.1f} Mo{float(elapsed):>8.2f} s")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+# Ajout de la racine du projet au path (package engine)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.neighbors import build_neighbor_index
+
+# Au-delà, la matrice dense N×N n'est plus raisonnable à construire
+DENSE_LIMIT_BYTES = 2 * 1024 ** 3
+
+
+def synthetic_tfidf(n_docs, n_terms=15000, terms_per_doc=300, seed=0):
+    """Matrice TF-IDF aléatoire (creuse, normalisée L2) imitant le corpus."""
+    rng = np.random.default_rng(seed)
+    # Distribution de Zipf pour les termes, comme dans un vrai vocabulaire
+    ranks = np.arange(1, n_terms + 1)
+    probs = (1.0 / ranks) / (1.0 / ranks).sum()
+    rows = np.repeat(np.arange(n_docs), terms_per_doc)
+    cols = rng.choice(n_terms, size=n_docs * terms_per_doc, p=probs)
+    vals = rng.random(n_docs * terms_per_doc).astype(np.float32)
+    matrix = sp.csr_matrix((vals, (rows, cols)), shape=(n_docs, n_terms))
+    matrix.sum_duplicates()
+    return normalize(matrix)
+
+
+def measure(func):
+    """Durée (s) et pic mémoire Python (octets) d'un appel."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Matrice dense vs index top-k.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 5000, 10000])
+    parser.add_argument('--k', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'N':>8} | {'méthode':<8} | {'build (s)':>9} | {'stockage (Mo)':>13} | {'pic (Mo)':>9} | {'reco (ms)':>9}")
+    print("-" * 72)
+    for n in args.sizes:
+        matrix = synthetic_tfidf(n)
+        liked = np.arange(0, n, max(1, n // 10))[:10]
+
+        if n * n * 8 <= DENSE_LIMIT_BYTES:
+            dense, t_build, peak = measure(lambda: cosine_similarity(matrix, matrix))
+            start = time.perf_counter()
+            dense[liked].sum(axis=0).argsort()
+            t_reco = (time.perf_counter() - start) * 1000
+            print(f"{n:>8} | {'dense':<8} | {t_build:>9.2f} | {dense.nbytes / 1e6:>13.1f} | {peak / 1e6:>9.1f} | {t_reco:>9.2f}")
+            del dense
+        else:
+            print(f"{n:>8} | {'dense':<8} | {'ignoré (mémoire > %.0f Go)' % (DENSE_LIMIT_BYTES / 1024 ** 3):>45}")
+
+        index, t_build, peak = measure(lambda: build_neighbor_index(matrix, k=args.k))
+        start = time.perf_counter()
+        index.aggregate(liked).argsort()
+        t_reco = (time.perf_counter() - start) * 1000
+        print(f"{n:>8} | {'top-k':<8} | {t_build:>9.2f} | {index.nbytes / 1e6:>13.1f} | {peak / 1e6:>9.1f} | {t_reco:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
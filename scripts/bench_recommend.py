@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ajout de la racine du projet au path (package engine)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.catalogue import Catalogue
+from engine.neighbors import build_neighbor_index
+from engine.recommender import Recommender
+from bench_neighbors import synthetic_tfidf
+
+
+def legacy_recommend(neighbors, ids, ratings, n=10):
+    """Ancienne méthode : recherche linéaire de chaque id, argsort complet, boucle Python."""
+    seen_ids = [serie_id for serie_id, _ in ratings]
+    liked_rows = []
+    for serie_id in seen_ids:
+        idx = np.flatnonzero(ids == serie_id).tolist()
+        if idx: liked_rows.append(idx[0])
+    total_scores = neighbors.aggregate(liked_rows)
+    recos = []
+    for idx in total_scores.argsort()[::-1]:
+        if int(ids[idx]) not in seen_ids:
+            recos.append(idx)
+            if len(recos) >= n: break
+    return recos
+
+
+def synthetic_users(ids, n_users, max_liked, seed=1):
+    rng = np.random.default_rng(seed)
+    return [[(int(s), int(rng.integers(3, 6))) for s in rng.choice(ids, size=rng.integers(1, max_liked + 1), replace=False)]
+            for _ in range(n_users)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de /api/recommend : boucle par note vs moteur vectorisé.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000])
+    parser.add_argument('--users', type=int, default=500)
+    parser.add_argument('--max-liked', type=int, default=30)
+    args = parser.parse_args()
+
+    print(f"{'N':>8} | {'méthode':<14} | {'par utilisateur (ms)':>20}")
+    print("-" * 50)
+    for n in args.sizes:
+        neighbors = build_neighbor_index(synthetic_tfidf(n, terms_per_doc=100))
+        ids = np.arange(1, n + 1, dtype=np.int64)
+        recommender = Recommender(neighbors, Catalogue(ids, [f"serie_{i}" for i in ids]))
+        users = synthetic_users(ids, args.users, args.max_liked)
+
+        start = time.perf_counter()
+        for ratings in users:
+            legacy_recommend(neighbors, ids, ratings)
+        legacy = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for ratings in users:
+            recommender.recommend(ratings)
+        single = time.perf_counter() - start
+
+        start = time.perf_counter()
+        recommender.recommend_many(users)
+        batch = time.perf_counter() - start
+
+        for name, total in (('boucle', legacy), ('vectorisé', single), ('par lots', batch)):
+            print(f"{n:>8} | {name:<14} | {total / len(users) * 1000:>20.3f}")
+
+
+if __name__ == '__main__':
+    main()
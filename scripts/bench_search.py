@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.metrics.pairwise import cosine_similarity
+from sklearn.preprocessing import normalize
+
+# Ajout de la racine du projet au path (package engine)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.inverted_index import InvertedIndex
+from bench_neighbors import synthetic_tfidf
+
+
+def brute_force(query_vec, matrix, k):
+    """Ancienne méthode : cosinus contre toute la matrice puis argsort complet."""
+    similarities = cosine_similarity(query_vec, matrix).flatten()
+    top = similarities.argsort()[-k:][::-1]
+    return top[similarities[top] > 0]
+
+
+def synthetic_queries(n_terms, n_queries, seed=1):
+    """Requêtes de 1 à 3 termes, tirés selon la même loi de Zipf que le corpus."""
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, n_terms + 1)
+    probs = (1.0 / ranks) / (1.0 / ranks).sum()
+    queries = []
+    for _ in range(n_queries):
+        terms = np.unique(rng.choice(n_terms, size=rng.integers(1, 4), p=probs))
+        vec = np.zeros((1, n_terms))
+        vec[0, terms] = rng.random(len(terms)) + 0.1
+        queries.append(normalize(vec))
+    return queries
+
+
+def percentiles(times):
+    ms = np.array(times) * 1000
+    return np.percentile(ms, 50), np.percentile(ms, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latence de /api/search : matrice complète vs index inversé.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--terms-per-doc', type=int, default=100)
+    args = parser.parse_args()
+
+    n_terms = 15000
+    queries = synthetic_queries(n_terms, args.queries)
+    print(f"{'N':>8} | {'méthode':<10} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'identiques':>10}")
+    print("-" * 58)
+    for n in args.sizes:
+        matrix = synthetic_tfidf(n, n_terms=n_terms, terms_per_doc=args.terms_per_doc)
+        index = InvertedIndex(matrix)
+        queries_sparse = [sp.csr_matrix(q) for q in queries]
+
+        brute_times, index_times, same = [], [], 0
+        for q in queries_sparse:
+            start = time.perf_counter()
+            expected = brute_force(q, matrix, args.k)
+            brute_times.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            rows, _ = index.top_k(q, args.k)
+            index_times.append(time.perf_counter() - start)
+            same += set(rows.tolist()) == set(expected.tolist())
+
+        for name, times in (('matrice', brute_times), ('index', index_times)):
+            p50, p99 = percentiles(times)
+            print(f"{n:>8} | {name:<10} | {p50:>9.3f} | {p99:>9.3f} | {f'{same}/{len(queries)}' if name == 'index' else '':>10}")
+
+
+if __name__ == '__main__':
+    main()
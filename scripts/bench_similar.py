@@ -0,0 +1,94 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.preprocessing import normalize
+
+# Ajout de la racine du projet au path (package engine)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine.embeddings import DEFAULT_DIM, LSHIndex, SeriesEmbeddings
+
+# (tables, bits, cases voisines) comparés
+CONFIGS = [(8, 12, 0), (8, 12, 2), (16, 12, 2), (16, 12, 4), (32, 12, 2)]
+
+
+def topical_tfidf(n_docs, n_terms=15000, n_topics=200, terms_per_doc=300, seed=0):
+    """
+    Matrice TF-IDF aléatoire avec des "genres" : chaque série tire la plupart de ses
+    termes dans le vocabulaire de son genre, le reste dans un fond commun (loi de Zipf).
+    """
+    rng = np.random.default_rng(seed)
+    ranks = np.arange(1, n_terms + 1)
+    background = (1.0 / ranks) / (1.0 / ranks).sum()
+    topic_terms = rng.choice(n_terms, size=(n_topics, 200))
+    topics = rng.integers(0, n_topics, size=n_docs)
+
+    n_topical = int(terms_per_doc * 0.6)
+    rows = np.repeat(np.arange(n_docs), terms_per_doc)
+    cols = np.empty((n_docs, terms_per_doc), dtype=np.int64)
+    cols[:, :n_topical] = topic_terms[topics[:, None], rng.integers(0, 200, size=(n_docs, n_topical))]
+    cols[:, n_topical:] = rng.choice(n_terms, size=(n_docs, terms_per_doc - n_topical), p=background)
+    vals = rng.random(n_docs * terms_per_doc).astype(np.float32)
+    matrix = sp.csr_matrix((vals, (rows, cols.ravel())), shape=(n_docs, n_terms))
+    matrix.sum_duplicates()
+    return normalize(matrix)
+
+
+def exact_top(matrix, row, k):
+    """Vérité terrain : cosinus exact sur les vecteurs TF-IDF (la série elle-même exclue)."""
+    sims = np.asarray((matrix @ matrix[row].T).todense()).ravel()
+    sims[row] = -np.inf
+    top = np.argpartition(-sims, k)[:k]
+    return top[np.argsort(-sims[top])]
+
+
+def run(name, func, queries, truth, flat_truth, k):
+    """Rappel contre le TF-IDF exact et contre la recherche exhaustive sur les plongements (perte du LSH seul)."""
+    times, hits, flat_hits = [], 0, 0
+    for row, expected, flat_expected in zip(queries, truth, flat_truth):
+        start = time.perf_counter()
+        found = func(row)
+        times.append(time.perf_counter() - start)
+        hits += len(np.intersect1d(found[:k], expected))
+        flat_hits += len(np.intersect1d(found[:k], flat_expected))
+    ms = np.array(times) * 1000
+    recall, flat_recall = hits / (k * len(queries)), flat_hits / (k * len(queries))
+    print(f"{name:<22} | {recall:>9.3f} | {flat_recall:>9.3f} | "
+          f"{np.percentile(ms, 50):>8.3f} | {np.percentile(ms, 99):>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/api/similar : rappel@10 et latence de l'index LSH vs cosinus exact.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 50000])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--dim', type=int, default=DEFAULT_DIM)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    for n in args.sizes:
+        matrix = topical_tfidf(n).astype(np.float32).tocsr()
+        start = time.perf_counter()
+        embeddings = SeriesEmbeddings.fit(matrix, dim=args.dim)
+        fit_seconds = time.perf_counter() - start
+        queries = np.random.default_rng(1).choice(n, size=args.queries, replace=False)
+        truth = [exact_top(matrix, row, args.k) for row in queries]
+        print(f"\nN = {n} séries, plongements {embeddings.dim} dimensions "
+              f"({embeddings.vectors.nbytes / 1e6:.1f} Mo, SVD {fit_seconds:.1f} s)")
+        print(f"{'méthode':<22} | {'vs TF-IDF':>9} | {'vs plong.':>9} | {'p50 (ms)':>8} | {'p99 (ms)':>8}")
+        print("-" * 66)
+        run("TF-IDF exact", lambda row: exact_top(matrix, row, args.k), queries, truth, truth, args.k)
+        flat = LSHIndex(embeddings.vectors, n_tables=0, n_bits=1, probes=0)  # Aucun candidat : exhaustif
+        flat_truth = [flat.similar(row, args.k)[0] for row in queries]
+        run("plongements exhaustif", lambda row: flat.similar(row, args.k)[0], queries, truth, flat_truth, args.k)
+        for tables, bits, probes in CONFIGS:
+            index = LSHIndex(embeddings.vectors, tables, bits, probes=probes)
+            run(f"LSH {tables}x{bits} +{probes}", lambda row: index.similar(row, args.k)[0],
+                queries, truth, flat_truth, args.k)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Ajout de la racine du projet au path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+
+def timed_init():
+    start = time.perf_counter()
+    app_module.init_app()
+    return time.perf_counter() - start
+
+
+def main():
+    """Compare le démarrage à froid (ré-entraînement) et à chaud (modèle sur disque)."""
+    tmp = tempfile.mkdtemp(prefix='seriesminer-bench-')
+    app_module.ARTIFACT_DIR = os.path.join(tmp, 'model')
+    try:
+        cold = timed_init()  # Aucun modèle : entraînement + sauvegarde
+        warm = timed_init()  # Modèle chargé depuis le disque
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    print("\n--- Démarrage de init_app() ---")
+    print(f"À froid (entraînement) : {cold:.3f} s")
+    print(f"À chaud (disque)       : {warm:.3f} s")
+    if warm > 0:
+        print(f"Gain                   : x{cold / warm:.1f}")
+
+
+if __name__ == '__main__':
+    main()
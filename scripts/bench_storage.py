@@ -0,0 +1,143 @@
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# Ajout de la racine du projet au path
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from bench_suite import N_GENRES, episode_srt, make_vocabulary
+from engine.catalogue import Catalogue, iter_series, iter_texts
+from engine.schema import create_series_text, decompress_text, write_series_text
+from engine.analyzer import clean_text
+
+
+def synthetic_rows(n_series, n_episodes, words, seed=0, vocab_size=20000):
+    """(id, titre, texte nettoyé) : sous-titres du corpus de bench_suite passés par le nettoyage de l'ETL."""
+    vocab = make_vocabulary(vocab_size, seed)
+    rng = np.random.default_rng(seed + 1)
+    genres = [rng.choice(vocab_size, size=300, replace=False) for _ in range(N_GENRES)]
+    for s in range(n_series):
+        genre = genres[int(rng.integers(0, N_GENRES))]
+        text = " ".join(clean_text(episode_srt(rng, vocab, genre, words), srt=True) for _ in range(n_episodes))
+        yield s + 1, f"Série {s:04d} {vocab[genre[0]].capitalize()}", text
+
+
+def build_legacy(path, rows):
+    """Ancien schéma : texte en clair dans la table series."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE series (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, cleaned_text TEXT)")
+    conn.executemany("INSERT INTO series VALUES (?, ?, ?)", rows)
+    conn.execute("CREATE INDEX idx_series_title ON series(title)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def build_compressed(path, rows):
+    """Schéma actuel : table series étroite, texte compressé dans series_text."""
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE series (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL)")
+    create_series_text(conn)
+    conn.executemany("INSERT INTO series VALUES (?, ?)", [(i, t) for i, t, _ in rows])
+    write_series_text(conn, [(i, x) for i, _, x in rows])
+    conn.execute("CREATE INDEX idx_series_title ON series(title)")
+    conn.commit()
+    conn.execute("VACUUM")
+    conn.close()
+
+
+def drop_page_cache(path):
+    """Retire le fichier du cache du système (Linux) : lecture à froid, comme au démarrage."""
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def best_time(path, func, repeats, cold=False):
+    """Meilleur temps sur `repeats` essais, connexion neuve à chaque fois (cache SQLite vide)."""
+    times = []
+    for _ in range(repeats):
+        if cold:
+            drop_page_cache(path)
+        conn = sqlite3.connect(path)
+        start = time.perf_counter()
+        func(conn)
+        times.append(time.perf_counter() - start)
+        conn.close()
+    return min(times) * 1000
+
+
+LEGACY = {
+    'api_series': lambda conn: conn.execute("SELECT id, title FROM series ORDER BY title").fetchall(),
+    'catalogue': lambda conn: conn.execute("SELECT id, title FROM series ORDER BY id").fetchall(),
+    'textes': lambda conn: sum(len(t or '') for (t,) in conn.execute("SELECT cleaned_text FROM series ORDER BY id")),
+    'dataframe': lambda conn: pd.read_sql_query("SELECT id, title, cleaned_text FROM series", conn),
+}
+COMPRESSED = {
+    'api_series': LEGACY['api_series'],
+    'catalogue': Catalogue.from_connection,
+    'textes': lambda conn: sum(len(t) for t in iter_texts(conn)),
+    'dataframe': lambda conn: pd.read_sql_query("SELECT s.id, s.title, t.text FROM series s "
+                                                "LEFT JOIN series_text t ON t.serie_id = s.id", conn)['text'].map(decompress_text),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stockage du texte nettoyé : colonne TEXT vs table series_text compressée.")
+    parser.add_argument('--series', type=int, default=200)
+    parser.add_argument('--episodes', type=int, default=20)
+    parser.add_argument('--words', type=int, default=1500, help="mots par épisode")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--db', help="base existante (sinon : corpus synthétique)")
+    args = parser.parse_args()
+
+    if args.db:
+        conn = sqlite3.connect(args.db)
+        rows = list(iter_series(conn))
+        conn.close()
+    else:
+        print(f"Génération de {args.series} séries x {args.episodes} épisodes x {args.words} mots...")
+        rows = list(synthetic_rows(args.series, args.episodes, args.words))
+    raw_mb = sum(len(x.encode('utf-8')) for _, _, x in rows) / 1e6
+    print(f"{len(rows)} séries, {raw_mb:.1f} Mo de texte nettoyé.")
+
+    tmp = tempfile.mkdtemp(prefix='seriesminer-storage-')
+    try:
+        paths = {'TEXT': os.path.join(tmp, 'legacy.db'), 'zlib': os.path.join(tmp, 'compressed.db')}
+        start = time.perf_counter()
+        build_legacy(paths['TEXT'], rows)
+        build_times = {'TEXT': time.perf_counter() - start}
+        start = time.perf_counter()
+        build_compressed(paths['zlib'], rows)
+        build_times['zlib'] = time.perf_counter() - start
+        del rows
+
+        for cold in (True, False):
+            print(f"\n--- Taille et temps de lecture, cache {'froid' if cold else 'chaud'} "
+                  f"(meilleur de {args.repeats} essais) ---")
+            print(f"{'Schéma':<8}{'Fichier':>11}{'Écriture':>11}{'/api/series':>13}{'Catalogue':>12}{'Textes':>11}"
+                  f"{'DataFrame':>12}")
+            for name, queries in (('TEXT', LEGACY), ('zlib', COMPRESSED)):
+                size = os.path.getsize(paths[name]) / 1e6
+                times = [best_time(paths[name], queries[q], args.repeats, cold)
+                         for q in ('api_series', 'catalogue', 'textes', 'dataframe')]
+                print(f"{name:<8}{size:>8.1f} Mo{build_times[name]:>9.2f} s"
+                      f"{times[0]:>10.2f} ms{times[1]:>9.2f} ms{times[2]:>8.0f} ms{times[3]:>9.0f} ms")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
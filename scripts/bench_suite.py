@@ -0,0 +1,367 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import zipfile
+from urllib.parse import quote
+
+import numpy as np
+
+# Ajout de la racine du projet au path (package engine, scripts)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(BASE_DIR, 'scripts')
+sys.path.insert(0, BASE_DIR)
+sys.path.insert(0, SCRIPTS_DIR)
+
+# =============================================================================
+# BANC D'ESSAI COMPLET (Corpus synthétique reproductible, base temporaire)
+# =============================================================================
+# Chaque étape tourne dans son propre processus (pic de RSS propre à l'étape),
+# sur un corpus et une base créés dans un dossier temporaire : la vraie base
+# et le vrai dossier data ne sont jamais lus ni modifiés. Aucun accès réseau.
+#   python scripts/bench_suite.py --series 200 --episodes 20 --depth 2
+#   python scripts/bench_suite.py --compare avant.json apres.json
+
+RESULT_FORMAT = 1
+RESULT_MARK = "BENCH_RESULT "  # Préfixe de la ligne JSON renvoyée par un processus d'étape
+RESULTS_DIR = os.path.join(BASE_DIR, 'database', 'bench')
+ZIP_DATE = (2020, 1, 1, 0, 0, 0)  # Date fixe des membres : archives identiques d'un run à l'autre
+EPISODES_PER_SEASON = 10
+N_GENRES = 12
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'dra', 'pel', 'mon', 'tri', 'gal', 'bor',
+             'fé', 'lè', 'çi', 'ré', 'où']
+SRT_TAGS = ['<i>{}</i>', '<b>{}</b>', '<font color="#ffff00">{}</font>', '{}', '{}', '{}']
+
+
+# --- Corpus synthétique ---
+
+def make_vocabulary(size, seed):
+    """Mots factices (2 à 4 syllabes, certains accentués), toujours les mêmes pour une graine."""
+    rng = np.random.default_rng(seed)
+    words, seen = [], set()
+    while len(words) < size:
+        word = "".join(SYLLABLES[i] for i in rng.integers(0, len(SYLLABLES), size=rng.integers(2, 5)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def episode_srt(rng, vocab, genre_words, n_words):
+    """Sous-titre SRT : numéros, timestamps, balises ; 60 % des mots pris dans le genre de la série."""
+    ranks = np.arange(1, len(vocab) + 1)
+    background = (1.0 / ranks) / (1.0 / ranks).sum()
+    topical = rng.random(n_words) < 0.6
+    picks = np.where(topical, rng.choice(genre_words, size=n_words), rng.choice(len(vocab), size=n_words, p=background))
+    blocks, position, t = [], 0, 0
+    while position < n_words:
+        length = int(rng.integers(4, 12))
+        line = " ".join(vocab[i] for i in picks[position:position + length])
+        tag = SRT_TAGS[int(rng.integers(0, len(SRT_TAGS)))]
+        start, end = t, t + int(rng.integers(800, 4000))
+        blocks.append(f"{len(blocks) + 1}\n{srt_time(start)} --> {srt_time(end)}\n{tag.format(line)}\n")
+        position, t = position + length, end + int(rng.integers(50, 500))
+    return "\n".join(blocks)
+
+
+def srt_time(ms):
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d},{ms % 1000:03d}"
+
+
+def zip_bytes(members, stored=False):
+    """Archive en mémoire ; membres (nom, octets) datés de ZIP_DATE pour des octets reproductibles."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        for name, data in members:
+            info = zipfile.ZipInfo(name, date_time=ZIP_DATE)
+            info.compress_type = zipfile.ZIP_STORED if stored else zipfile.ZIP_DEFLATED
+            z.writestr(info, data)
+    return buffer.getvalue()
+
+
+def generate_corpus(folder, n_series, n_episodes, depth, words, seed=0, vocab_size=20000):
+    """
+    Dossier data factice : une série par dossier, `n_episodes` sous-titres par série.
+    depth = 0 : fichiers .srt seuls ; depth >= 1 : une archive par saison, imbriquée
+    `depth` fois (zip dans zip, alternativement compressé et stocké).
+    Un épisode sur cinq est encodé en Latin-1 (repli du décodage de l'ETL).
+    """
+    vocab = make_vocabulary(vocab_size, seed)
+    rng = np.random.default_rng(seed + 1)
+    genres = [rng.choice(vocab_size, size=300, replace=False) for _ in range(N_GENRES)]
+    titles, digest, n_files, n_bytes = [], hashlib.sha1(), 0, 0
+    for s in range(n_series):
+        genre = int(rng.integers(0, N_GENRES))
+        title = f"Série {s:04d} {vocab[genres[genre][0]].capitalize()} {vocab[int(rng.integers(0, vocab_size))]}"
+        titles.append(title)
+        serie_dir = os.path.join(folder, title)
+        os.makedirs(serie_dir, exist_ok=True)
+        episodes = []
+        for e in range(n_episodes):
+            text = episode_srt(rng, vocab, genres[genre], words)
+            data = text.encode('latin-1', errors='replace') if e % 5 == 4 else text.encode('utf-8')
+            episodes.append((f"S{e // EPISODES_PER_SEASON + 1:02d}E{e % EPISODES_PER_SEASON + 1:02d}.srt", data))
+
+        files = []
+        if depth == 0:
+            files = episodes
+        else:
+            for season in range(0, n_episodes, EPISODES_PER_SEASON):
+                name = f"Saison_{season // EPISODES_PER_SEASON + 1:02d}"
+                data = zip_bytes(episodes[season:season + EPISODES_PER_SEASON])
+                for level in range(1, depth):
+                    data = zip_bytes([(f"{name}_{level}.zip", data)], stored=level % 2 == 1)
+                files.append((f"{name}.zip", data))
+        for name, data in files:
+            with open(os.path.join(serie_dir, name), 'wb') as f:
+                f.write(data)
+            digest.update(f"{title}/{name}".encode('utf-8'))
+            digest.update(data)
+            n_files += 1
+            n_bytes += len(data)
+    return {'series': n_series, 'episodes': n_episodes, 'depth': depth, 'words': words, 'seed': seed,
+            'files': n_files, 'bytes': n_bytes, 'sha1': digest.hexdigest()}, titles, vocab, genres
+
+
+def make_queries(vocab, genres, n_queries, seed):
+    """Requêtes de 1 à 3 mots d'un même genre (comme un utilisateur qui cherche un thème)."""
+    rng = np.random.default_rng(seed + 2)
+    queries = []
+    for _ in range(n_queries):
+        genre = genres[int(rng.integers(0, len(genres)))]
+        queries.append(" ".join(vocab[i] for i in rng.choice(genre[:60], size=int(rng.integers(1, 4)), replace=False)))
+    return queries
+
+
+# --- Mesures (dans le processus d'une étape) ---
+
+def peak_rss_mb():
+    """Pic de mémoire résidente du processus en Mo (None si indisponible)."""
+    try:
+        import resource
+    except ImportError: # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def latency_stats(times):
+    ms = np.array(times) * 1000
+    return {'n': len(times), 'mean_ms': round(float(ms.mean()), 3), 'p50_ms': round(float(np.percentile(ms, 50)), 3),
+            'p95_ms': round(float(np.percentile(ms, 95)), 3), 'p99_ms': round(float(np.percentile(ms, 99)), 3)}
+
+
+def phase_etl(workdir, params):
+    import setup_etl  # Chemins du dossier temporaire (variables d'environnement de run_phase)
+    with contextlib.redirect_stdout(io.StringIO()):
+        conn = setup_etl.init_database(reset=True)
+        progress = setup_etl.process_etl(conn, workers=params['workers'])
+        conn.close()
+    elapsed = time.perf_counter() - progress.start
+    return {'seconds': round(elapsed, 3), 'files': progress.files, 'mb': round(progress.bytes / 1e6, 2),
+            'files_per_s': round(progress.files / elapsed, 1), 'mb_per_s': round(progress.bytes / 1e6 / elapsed, 2),
+            'workers': params['workers'], 'stages': {k: round(v, 3) for k, v in progress.stages.items()}}
+
+
+def import_app():
+    """Import de app.py sur la base temporaire (init_app est appelé à l'import) -> (module, durée)."""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        import app as app_module
+    return app_module, time.perf_counter() - start
+
+
+def phase_start(workdir, params):
+    app_module, seconds = import_app()
+    info = app_module.reloader.info()
+    return {'import_seconds': round(seconds, 3), 'load_seconds': info.get('load_seconds'),
+            'origin': info.get('origin'), 'n_series': info.get('n_series')}
+
+
+def phase_serve(workdir, params):
+    app_module, _ = import_app()
+    with open(os.path.join(workdir, 'queries.json'), encoding='utf-8') as f:
+        queries = json.load(f)
+    rng = np.random.default_rng(params['seed'] + 3)
+    series_ids = [int(i) for i in app_module.reloader.current.catalogue.ids]
+
+    # Utilisateurs et notes (par l'API, comme en production)
+    clients = []
+    for u in range(params['users']):
+        client = app_module.app.test_client()
+        client.post('/api/register', json={'username': f"bench_{u}", 'password': 'x'})
+        for serie_id in rng.choice(series_ids, size=min(params['ratings'], len(series_ids)), replace=False):
+            client.post('/api/rate', json={'serie_id': int(serie_id), 'rating': int(rng.integers(3, 6))})
+        clients.append(client)
+
+    def timed(client, url):
+        start = time.perf_counter()
+        response = client.get(url)
+        elapsed = time.perf_counter() - start
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} -> {response.status_code}")
+        return elapsed
+
+    anonymous = app_module.app.test_client()
+    app_module.search_cache.clear()
+    search_miss = [timed(anonymous, f"/api/search?q={quote(q)}") for q in dict.fromkeys(queries)]
+    search_hit = [timed(anonymous, f"/api/search?q={quote(q)}") for q in queries]
+    start = time.perf_counter()
+    response = anonymous.post('/api/search/batch', json={'queries': queries})
+    batch_seconds = time.perf_counter() - start
+    if response.status_code != 200:
+        raise RuntimeError(f"/api/search/batch -> {response.status_code}")
+
+    app_module.reco_cache.clear()
+    reco_miss = [timed(client, '/api/recommend') for client in clients]
+    reco_hit = [timed(client, '/api/recommend') for client in clients]
+    return {'search_miss': latency_stats(search_miss), 'search_hit': latency_stats(search_hit),
+            'search_batch': {'n': len(queries), 'seconds': round(batch_seconds, 4),
+                             'per_query_ms': round(1000 * batch_seconds / len(queries), 3)},
+            'recommend_miss': latency_stats(reco_miss), 'recommend_hit': latency_stats(reco_hit),
+            'users': params['users'], 'ratings_per_user': params['ratings']}
+
+
+PHASES = {'etl': phase_etl, 'cold_start': phase_start, 'warm_start': phase_start, 'serve': phase_serve}
+
+
+def run_phase(name, workdir, params):
+    """Lance une étape dans un nouveau processus -> son résultat (dict), avec son pic de RSS."""
+    env = dict(os.environ, SERIESMINER_DATABASE_DIR=os.path.join(workdir, 'database'),
+               SERIESMINER_DATA_DIR=os.path.join(workdir, 'data'))
+    out = subprocess.run([sys.executable, os.path.abspath(__file__), '--phase', name, '--workdir', workdir,
+                          '--params', json.dumps(params)], env=env, capture_output=True, text=True, cwd=SCRIPTS_DIR)
+    for line in out.stdout.splitlines():
+        if line.startswith(RESULT_MARK):
+            return json.loads(line[len(RESULT_MARK):])
+    raise RuntimeError(f"Étape {name} en échec :\n{out.stderr[-2000:]}")
+
+
+# --- Rapport ---
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BASE_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results, prefix=""):
+    """{'etl': {'seconds': 1.0}} -> {'etl.seconds': 1.0} (valeurs numériques seulement)."""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def print_summary(results):
+    etl, cold, warm, serve = (results['phases'][k] for k in ('etl', 'cold_start', 'warm_start', 'serve'))
+    corpus = results['corpus']
+    print(f"\n--- Corpus : {corpus['series']} séries x {corpus['episodes']} épisodes, profondeur {corpus['depth']}, "
+          f"{corpus['files']} fichiers, {corpus['bytes'] / 1e6:.1f} Mo (sha1 {corpus['sha1'][:12]}) ---")
+    print(f"ETL            : {etl['seconds']:.2f} s, {etl['mb_per_s']:.2f} Mo/s, {etl['files_per_s']:.1f} fichiers/s "
+          f"({etl['workers']} worker(s), pic RSS {etl['peak_rss_mb']} Mo)")
+    print(f"Démarrage froid: {cold['load_seconds']:.2f} s (import {cold['import_seconds']:.2f} s, "
+          f"pic RSS {cold['peak_rss_mb']} Mo)")
+    print(f"Démarrage chaud: {warm['load_seconds']:.2f} s (import {warm['import_seconds']:.2f} s, "
+          f"pic RSS {warm['peak_rss_mb']} Mo)")
+    for key in ('search_miss', 'search_hit', 'recommend_miss', 'recommend_hit'):
+        s = serve[key]
+        print(f"{key:<15}: p50 {s['p50_ms']:.2f} ms, p95 {s['p95_ms']:.2f} ms, p99 {s['p99_ms']:.2f} ms (n={s['n']})")
+    print(f"search_batch   : {serve['search_batch']['per_query_ms']:.3f} ms par requête "
+          f"({serve['search_batch']['n']} requêtes, un appel)")
+    print(f"Pic RSS (service) : {serve['peak_rss_mb']} Mo")
+
+
+def compare(before_path, after_path):
+    """Écart relatif de chaque mesure entre deux fichiers de résultats."""
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)
+    if before['corpus'].get('sha1') != after['corpus'].get('sha1'):
+        print("⚠️ Corpus différents : les mesures ne sont pas directement comparables.")
+    old, new = flatten(before['phases']), flatten(after['phases'])
+    print(f"{'mesure':<36} | {before.get('commit') or 'avant':>10} | {after.get('commit') or 'après':>10} | écart")
+    print("-" * 72)
+    for key in sorted(old.keys() & new.keys()):
+        delta = f"{(new[key] - old[key]) / old[key]:+.1%}" if old[key] else "-"
+        print(f"{key:<36} | {old[key]:>10g} | {new[key]:>10g} | {delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai complet sur un corpus synthétique (ETL, démarrage, "
+                                                 "recherche, recommandation, mémoire) -> JSON.")
+    parser.add_argument('--series', type=int, default=200)
+    parser.add_argument('--episodes', type=int, default=20, help="épisodes par série")
+    parser.add_argument('--depth', type=int, default=2, help="imbrication des zips de saison (0 : .srt seuls)")
+    parser.add_argument('--words', type=int, default=1500, help="mots par épisode")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help="processus de l'ETL")
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--ratings', type=int, default=10, help="notes par utilisateur")
+    parser.add_argument('--output', help=f"fichier JSON (défaut : {RESULTS_DIR}/<date>-<commit>.json)")
+    parser.add_argument('--keep', action='store_true', help="garde le dossier temporaire (corpus, base)")
+    parser.add_argument('--compare', nargs=2, metavar=('AVANT', 'APRES'), help="compare deux fichiers de résultats")
+    parser.add_argument('--phase', choices=sorted(PHASES), help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    parser.add_argument('--params', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+    if args.phase: # Processus d'une étape
+        result = PHASES[args.phase](args.workdir, json.loads(args.params))
+        result['peak_rss_mb'] = peak_rss_mb()
+        print(RESULT_MARK + json.dumps(result))
+        return
+
+    params = {'workers': max(1, args.workers), 'seed': args.seed, 'users': args.users, 'ratings': args.ratings}
+    workdir = tempfile.mkdtemp(prefix='seriesminer-suite-')
+    try:
+        print(f"Génération du corpus dans {workdir}...")
+        start = time.perf_counter()
+        corpus, _, vocab, genres = generate_corpus(os.path.join(workdir, 'data'), args.series, args.episodes,
+                                                   args.depth, args.words, args.seed)
+        corpus['generate_seconds'] = round(time.perf_counter() - start, 2)
+        with open(os.path.join(workdir, 'queries.json'), 'w', encoding='utf-8') as f:
+            json.dump(make_queries(vocab, genres, args.queries, args.seed), f)
+
+        phases = {}
+        for name in ('etl', 'cold_start', 'warm_start', 'serve'):
+            print(f"   {name}...")
+            phases[name] = run_phase(name, workdir, params)
+    finally:
+        if args.keep:
+            print(f"Dossier gardé : {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results = {'format': RESULT_FORMAT, 'commit': git_commit(), 'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+               'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+               'params': params, 'corpus': corpus, 'phases': phases}
+    print_summary(results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{results['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n✅ Résultats : {output}")
+
+
+if __name__ == '__main__':
+    main()
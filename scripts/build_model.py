@@ -0,0 +1,35 @@
+import os
+import sqlite3
+import sys
+import time
+
+# Ajout de la racine du projet au path (package engine)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from engine.artifacts import build_artifacts
+from engine.paths import ARTIFACT_DIR, DB_PATH  # SERIESMINER_DATABASE_DIR s'il est défini
+from engine.schema import SCHEMA_VERSION, ensure_schema
+
+
+def build_model(db_path=DB_PATH, folder=ARTIFACT_DIR):
+    """Met la base à niveau si besoin, entraîne le modèle TF-IDF et l'écrit sur disque pour app.py."""
+    conn = sqlite3.connect(db_path)
+    try:
+        if ensure_schema(conn):
+            print(f"   Base mise à niveau (schéma v{SCHEMA_VERSION}).")
+    finally:
+        conn.close()
+    print("Construction du modèle (TF-IDF + voisins + statistiques de termes + plongements)...")
+    start = time.perf_counter()
+    model = build_artifacts(db_path, folder)
+    print(f"   ✅ {len(model.ids)} séries, {len(model.vectorizer.vocabulary_)} termes "
+          f"-> {folder} ({time.perf_counter() - start:.2f} s)")
+    return model
+
+
+if __name__ == '__main__':
+    if not os.path.exists(DB_PATH):
+        print("❌ Erreur : Base de données absente. Lancez scripts/setup_etl.py")
+        sys.exit(1)
+    build_model()
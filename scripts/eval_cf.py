@@ -0,0 +1,138 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+import numpy as np
+
+# Ajout de la racine du projet au path
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
+
+from bench_suite import N_GENRES, episode_srt, latency_stats, make_vocabulary
+from engine.artifacts import fit_model, load_artifacts, series_digests, stored_digests
+from engine.catalogue import Catalogue, SeriesTexts
+from engine.collaborative import LIKE_THRESHOLD, CooccurrenceIndex
+from engine.recommender import Recommender
+from engine.analyzer import clean_text
+
+N_AUDIENCES = 8  # Publics cachés : goûts partagés par des utilisateurs, absents du texte des séries
+LATENCY_USERS = 300  # Utilisateurs chronométrés un par un (chemin de /api/recommend)
+
+
+def synthetic_model(n_series, words, seed):
+    """Séries synthétiques : le genre se lit dans le texte, le public et la qualité non."""
+    rng = np.random.default_rng(seed)
+    vocab = make_vocabulary(20000, seed)
+    genre_words = [rng.choice(len(vocab), size=300, replace=False) for _ in range(N_GENRES)]
+    genres = rng.integers(0, N_GENRES, size=n_series)
+    rows = [(i + 1, f"serie_{i}", clean_text(episode_srt(rng, vocab, genre_words[g], words), srt=True))
+            for i, g in enumerate(genres)]
+    model = fit_model(series_digests(rows), [text for _, _, text in rows])
+    catalogue = Catalogue([r[0] for r in rows], [r[1] for r in rows])
+    return model, catalogue, genres, rng.integers(0, N_AUDIENCES, size=n_series), rng.normal(size=n_series)
+
+
+def synthetic_likes(catalogue, genres, audiences, quality, n_users, likes, seed):
+    """
+    Chaque utilisateur aime un ou deux genres et un public ; il aime les `m` séries de plus
+    grande utilité (bruit de Gumbel : tirage sans remise proportionnel à exp(utilité)).
+    """
+    rng = np.random.default_rng(seed + 1)
+    pairs = []
+    for user in range(n_users):
+        favorite = rng.choice(N_GENRES, size=rng.integers(1, 3), replace=False)
+        utility = (2.5 * np.isin(genres, favorite) + 2.5 * (audiences == rng.integers(0, N_AUDIENCES))
+                   + 0.5 * quality + rng.gumbel(size=len(genres)))
+        m = min(len(genres), 3 + rng.poisson(likes))
+        pairs += [(user, int(catalogue.ids[row])) for row in np.argpartition(-utility, m - 1)[:m]]
+    return pairs
+
+
+def database_model(db_path):
+    """Modèle (depuis database/model si à jour) et séries aimées de la table ratings."""
+    conn = sqlite3.connect(db_path)
+    catalogue = Catalogue.from_connection(conn)
+    digests = stored_digests(conn)
+    pairs = conn.execute("SELECT user_id, serie_id FROM ratings WHERE rating >= ?", (LIKE_THRESHOLD,)).fetchall()
+    conn.close()
+    model = load_artifacts(os.path.join(os.path.dirname(os.path.abspath(db_path)), 'model'), digests[0])
+    if model is None:
+        model = fit_model(digests, SeriesTexts(db_path))
+    return model, catalogue, pairs
+
+
+def split(pairs, holdout, min_likes, seed):
+    """Par utilisateur (au moins `min_likes` séries aimées), une part `holdout` cachée -> (entraînement, test)."""
+    rng = np.random.default_rng(seed + 2)
+    by_user = {}
+    for user, serie_id in pairs:
+        by_user.setdefault(user, []).append(serie_id)
+    train, test = [], {}
+    for user, ids in by_user.items():
+        ids = list(rng.permutation(ids))
+        n_test = int(round(len(ids) * holdout)) if len(ids) >= min_likes else 0
+        if n_test:
+            test[user] = set(ids[:n_test])
+        train += [(user, serie_id) for serie_id in ids[n_test:]]
+    return train, test
+
+
+def evaluate(model, catalogue, train, test, weights, n=10):
+    """precision@n et rappel@n des séries cachées, latence d'un appel de recommend() par poids."""
+    collaborative = CooccurrenceIndex.from_likes(train, catalogue)
+    liked = {}
+    for user, serie_id in train:
+        liked.setdefault(user, []).append((serie_id, 4))
+    users = [user for user in test if user in liked]
+    results = []
+    for weight in weights:
+        recommender = Recommender(model.neighbors, catalogue, collaborative=collaborative, blend=weight)
+        hits = [len(test[user] & set(catalogue.ids[rows].tolist()))
+                for user, (rows, _) in zip(users, recommender.recommend_many([liked[u] for u in users], n=n))]
+        times = []
+        for user in users[:LATENCY_USERS]:
+            start = time.perf_counter()
+            recommender.recommend(liked[user], n=n)
+            times.append(time.perf_counter() - start)
+        results.append({'weight': weight, 'precision': float(np.mean(hits)) / n,
+                        'recall': float(np.mean([h / len(test[u]) for h, u in zip(hits, users)])),
+                        'latency': latency_stats(times)})
+    return results, len(users)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="precision@10 hors ligne : content-based, collaboratif, mélange.")
+    parser.add_argument('--db', help="base réelle (table ratings) ; sinon séries et utilisateurs synthétiques")
+    parser.add_argument('--series', type=int, default=600)
+    parser.add_argument('--words', type=int, default=800, help="mots par série (corpus synthétique)")
+    parser.add_argument('--users', type=int, default=3000)
+    parser.add_argument('--likes', type=int, default=12, help="séries aimées par utilisateur (moyenne)")
+    parser.add_argument('--holdout', type=float, default=0.2, help="part des séries aimées cachée")
+    parser.add_argument('--min-likes', type=int, default=5, help="utilisateurs évalués : au moins ce nombre")
+    parser.add_argument('--weights', type=float, nargs='*', default=[0.0, 0.25, 0.5, 0.75, 1.0])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.db:
+        model, catalogue, pairs = database_model(args.db)
+    else:
+        print(f"Génération de {args.series} séries et {args.users} utilisateurs...")
+        model, catalogue, genres, audiences, quality = synthetic_model(args.series, args.words, args.seed)
+        pairs = synthetic_likes(catalogue, genres, audiences, quality, args.users, args.likes, args.seed)
+    train, test = split(pairs, args.holdout, args.min_likes, args.seed)
+    if not test:
+        print("❌ Aucun utilisateur évaluable (pas assez de séries aimées).")
+        return
+    results, n_users = evaluate(model, catalogue, train, test, args.weights)
+
+    print(f"\n--- {n_users} utilisateurs, {len(catalogue)} séries, {len(train)} notes d'entraînement ---")
+    print(f"{'Poids CF':<10}{'P@10':>8}{'R@10':>8}{'p50':>10}{'p95':>10}")
+    for r in results:
+        print(f"{r['weight']:<10.2f}{r['precision']:>8.3f}{r['recall']:>8.3f}"
+              f"{r['latency']['p50_ms']:>7.2f} ms{r['latency']['p95_ms']:>7.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,8 +7,48 @@ import sys
 # Ajout du dossier courant au path
 sys.path.append(os.getcwd())
 
-from setup_etl import remove_accents as remove_accents_etl, clean_text_content
-from app import app, get_db_connection, init_app 
+from setup_etl import remove_accents as remove_accents_etl, clean_text_content, TextCleaner, read_file_content, init_database, process_etl
+from bench_suite import generate_corpus
+from app import app, get_db_connection, init_app, DB_PATH, normalize_query, profiler as app_profiler, search_cache, search_many, search_results
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+from engine.neighbors import build_neighbor_index, update_neighbor_index
+from engine.inverted_index import InvertedIndex
+from engine.term_stats import TermStats
+from engine.catalogue import Catalogue, SeriesTexts
+from engine.collaborative import CooccurrenceIndex
+from engine.recommender import Recommender
+from engine.cache import LRUCache, SharedCache
+from engine.schema import PRIOR_MEAN, PRIOR_WEIGHT, RATINGS_UNIQUE_SQL, SERIES_DIGESTS_SQL, UPSERT_RATING_SQL, check_schema, create_series_stats, create_series_text, decompress_text, ensure_schema, rebuild_series_stats, write_series_text
+from engine.db import ConnectionPool
+from engine.embeddings import LSHIndex
+from engine.metrics import Registry, SamplingProfiler
+from engine.suggest import SuggestIndex
+from engine.snapshot import ModelReloader
+from engine.artifacts import artifact_lock, fit_model, load_artifacts, model_config, save_artifacts, series_digests, series_fingerprint, stored_digests
+from engine.model import fit_tfidf, fit_tfidf_streaming, vocabulary_terms
+from engine.analyzer import ANALYZER_CONFIG, Analyzer, clean_text, get_analyzer
+import tempfile
+import zipfile
+import threading
+import shutil
+import re
+import io
+import contextlib
+
+# Mini-corpus pour les tests unitaires du moteur
+SAMPLE_CORPUS = [
+    "avion crash ile survie avion",
+    "avion pilote aeroport crash",
+    "ile plage survie naufrage",
+    "police enquete meurtre detective",
+    "detective meurtre avocat proces",
+    "vampire nuit chateau sorciere",
+    "dragon chateau roi reine epee",
+    "hopital docteur urgence amour",
+]
 
 class Colors:
     HEADER = '\033[95m'
@@ -36,7 +76,8 @@ class TestSeriesMiner(unittest.TestCase):
         # Injection de données de test
         conn = get_db_connection()
         conn.execute("DELETE FROM users WHERE username = ?", (cls.test_user,))
-        conn.execute("INSERT OR REPLACE INTO series (id, title, cleaned_text) VALUES (1, 'Serie Test Integration', 'banana avion aircraft crash test')")
+        conn.execute("INSERT OR REPLACE INTO series (id, title) VALUES (1, 'Serie Test Integration')")
+        write_series_text(conn, [(1, 'banana avion aircraft crash test')])
         conn.commit()
         conn.close()
         
@@ -184,6 +225,1031 @@ class TestSeriesMiner(unittest.TestCase):
         else:
             self.log_fail("Aucune recommandation générée.")
 
+    # --- TESTS MOTEUR ---
+
+    def test_09_neighbor_index(self):
+        self.print_section("Index des plus proches voisins (Top-k)")
+        matrix = TfidfVectorizer().fit_transform(SAMPLE_CORPUS)
+        k = 3
+        self.log_step(f"Construction par petits blocs (k={k}) sur {matrix.shape[0]} séries...")
+        index = build_neighbor_index(matrix, k=k, max_block_bytes=1)
+        dense = cosine_similarity(matrix, matrix)
+        np.fill_diagonal(dense, -1)
+
+        for row in range(matrix.shape[0]):
+            cols, scores = index.neighbors(row)
+            expected = np.sort(dense[row])[::-1][:k]
+            expected = expected[expected > 0]
+            if not np.allclose(scores, expected, atol=1e-5):
+                self.log_fail(f"Voisins incorrects pour la ligne {row}")
+                self.fail()
+        self.log_success(f"Top-{k} identique à la matrice dense ({index.nbytes} octets au lieu de {dense.nbytes}).")
+
+    def test_10_artifact_store(self):
+        self.print_section("Stockage du modèle sur disque (Artefacts)")
+        rows = [(i + 1, f"Serie {i}", text) for i, text in enumerate(SAMPLE_CORPUS)]
+        digests = series_digests(rows)
+        fingerprint = digests[0]
+        model = fit_model(digests, SAMPLE_CORPUS)
+        vectorizer, matrix = model.vectorizer, model.tfidf_matrix
+
+        tmp = tempfile.mkdtemp()
+        try:
+            folder = os.path.join(tmp, 'model')
+            save_artifacts(folder, model)
+            self.log_step("Modèle écrit, rechargement en mémoire mappée...")
+            model = load_artifacts(folder, fingerprint)
+            query = ["avion crash", "meurtre detective"]
+            if model is None or abs(model.vectorizer.transform(query) - vectorizer.transform(query)).max() > 1e-12 \
+                    or abs(model.tfidf_matrix - matrix).max() > 1e-12:
+                self.log_fail("Le modèle rechargé diffère du modèle entraîné.")
+                self.fail()
+
+            self.log_step("Modification du contenu -> l'empreinte doit invalider le stockage...")
+            rows[0] = (1, "Serie 0", "texte modifie")
+            if load_artifacts(folder, series_fingerprint(rows)) is not None:
+                self.log_fail("Le stockage n'a pas été invalidé.")
+                self.fail()
+            self.log_success("Rechargement identique et invalidation par empreinte OK.")
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    def test_11_incremental_neighbors(self):
+        self.print_section("Mise à jour incrémentale de l'index des voisins")
+        vectorizer, matrix = fit_tfidf(SAMPLE_CORPUS)
+        index = build_neighbor_index(matrix, k=3)
+
+        # Série 2 supprimée, série 4 modifiée, une série ajoutée à la fin
+        kept = [0, 1, 3, 4, 5, 6, 7]
+        texts = [SAMPLE_CORPUS[i] for i in kept]
+        texts[3] = "dragon vampire chateau nuit"
+        texts.append("avion ile naufrage survie")
+        new_matrix = vectorizer.transform(texts)
+        old_to_new = np.array([0, 1, -1, 2, -1, 4, 5, 6])
+        self.log_step("1 suppression, 1 modification, 1 ajout...")
+
+        updated = update_neighbor_index(index, old_to_new, new_matrix, [3, 7], k=3)
+        expected = build_neighbor_index(new_matrix, k=3)
+        if np.array_equal(updated.indptr, expected.indptr) and np.array_equal(updated.indices, expected.indices) \
+                and np.allclose(updated.scores, expected.scores):
+            self.log_success("Index mis à jour identique à une reconstruction complète.")
+        else:
+            self.log_fail("L'index mis à jour diffère de la reconstruction.")
+            self.fail()
+
+    def test_12_inverted_index(self):
+        self.print_section("Index inversé avec élagage (Top-k)")
+        rng = np.random.default_rng(0)
+        vocab = sorted({w for text in SAMPLE_CORPUS for w in text.split()})
+        corpus = [" ".join(rng.choice(vocab, size=6)) for _ in range(300)]
+        vectorizer, matrix = fit_tfidf(corpus)
+        index = InvertedIndex(matrix)
+
+        k = 5
+        self.log_step(f"Comparaison avec le cosinus complet sur {len(corpus)} séries (k={k})...")
+        for query in ["avion crash", "detective meurtre proces", "dragon", "ile plage naufrage survie"]:
+            query_vec = vectorizer.transform([query])
+            expected = cosine_similarity(query_vec, matrix).ravel()
+            for seeds in (None, np.arange(20)):
+                rows, scores = index.top_k(query_vec, k, seed_rows=seeds)
+                if not np.allclose(scores, np.sort(expected)[::-1][:k]) or not np.allclose(expected[rows], scores):
+                    self.log_fail(f"Top-{k} incorrect pour '{query}'")
+                    self.fail()
+        self.log_success("Top-k identique au calcul complet (avec et sans séries de départ).")
+
+    def test_13_term_stats(self):
+        self.print_section("Statistiques de termes (Bonus de recherche)")
+        stats = TermStats.from_texts(SAMPLE_CORPUS)
+        keywords = ["avion", "crash", "avio", "inconnu"]
+        counts = stats.counts_for(range(len(SAMPLE_CORPUS)), keywords)
+        expected = [[text.split().count(w) for w in keywords] for text in SAMPLE_CORPUS]
+        if counts.tolist() != expected:
+            self.log_fail("Occurrences différentes du comptage des mots entiers")
+            self.fail()
+        self.log_step("Comptage exact (mots entiers, préfixes ignorés). Mise à jour incrémentale...")
+
+        texts = ["dragon inconnu inconnu", "avion"]
+        updated = stats.with_rows([0, len(SAMPLE_CORPUS), 2, len(SAMPLE_CORPUS) + 1], texts)
+        rebuilt = TermStats.from_texts([SAMPLE_CORPUS[0], texts[0], SAMPLE_CORPUS[2], texts[1]])
+        if not np.array_equal(updated.counts_for(range(4), keywords), rebuilt.counts_for(range(4), keywords)):
+            self.log_fail("Mise à jour incrémentale incorrecte")
+            self.fail()
+        self.log_success("Statistiques mises à jour identiques à un recalcul complet.")
+
+    def test_14_catalogue(self):
+        self.print_section("Catalogue compact (sans texte en mémoire)")
+        conn = get_db_connection()
+        rows = conn.execute("SELECT s.id, s.title, t.text FROM series s "
+                            "LEFT JOIN series_text t ON t.serie_id = s.id ORDER BY s.id").fetchall()
+        catalogue = Catalogue.from_connection(conn)
+        conn.close()
+
+        if catalogue.ids.tolist() != [r['id'] for r in rows] or catalogue.titles != [r['title'] for r in rows]:
+            self.log_fail("Ids ou titres différents de la table series")
+            self.fail()
+        if list(SeriesTexts(DB_PATH, chunk=7)) != [decompress_text(r['text']) for r in rows]:
+            self.log_fail("Textes relus par paquets différents de la table series")
+            self.fail()
+        self.log_step(f"{len(catalogue)} séries, {catalogue.nbytes / 1024:.0f} Ko en mémoire.")
+
+        last = len(catalogue) - 1
+        if catalogue.row_of(rows[last]['id']) != last or catalogue.row_of(-1) is not None:
+            self.log_fail("Mauvaise ligne pour un id")
+            self.fail()
+        if catalogue.rows_of([rows[last]['id'], -1, rows[0]['id']]).tolist() != [last, 0]:
+            self.log_fail("rows_of n'ignore pas les ids inconnus")
+            self.fail()
+        self.log_success("Correspondance id -> ligne correcte.")
+
+    def test_15_recommender(self):
+        self.print_section("Recommandation vectorisée (par lots)")
+        rng = np.random.default_rng(0)
+        vocab = sorted({w for text in SAMPLE_CORPUS for w in text.split()})
+        corpus = [" ".join(rng.choice(vocab, size=5)) for _ in range(200)]
+        _, matrix = fit_tfidf(corpus)
+        neighbors = build_neighbor_index(matrix, k=10)
+        catalogue = Catalogue(np.arange(len(corpus)) * 3 + 7, [f"serie_{i}" for i in range(len(corpus))])
+
+        users = []
+        for _ in range(30):
+            rows = rng.choice(len(corpus), size=rng.integers(1, 8), replace=False)
+            users.append([(int(catalogue.ids[r]), int(rng.integers(3, 6))) for r in rows] + [(-5, 4)])
+
+        self.log_step(f"Comparaison avec la somme dense de {len(users)} utilisateurs (seul, par lots, pondéré ou non)...")
+        for weighted in (False, True):
+            recommender = Recommender(neighbors, catalogue, weighted=weighted)
+            results = recommender.recommend_many(users, n=10) + [recommender.recommend(r, n=10) for r in users]
+            for ratings, (rows, scores) in zip(users + users, results):
+                liked = catalogue.lookup([serie_id for serie_id, _ in ratings])
+                weights = [rating if weighted else 1 for _, rating in ratings]
+                expected = neighbors.aggregate(liked[liked >= 0], np.array(weights)[liked >= 0])
+                expected[liked[liked >= 0]] = 0
+                order = np.lexsort((np.arange(len(expected)), -expected))[:10]
+                order = order[expected[order] > 0]
+                if rows.tolist() != order.tolist() or not np.allclose(scores, expected[order]):
+                    self.log_fail("Recommandations différentes du calcul dense")
+                    self.fail()
+        self.log_success("Top-10 identique au calcul dense, séries notées exclues.")
+
+    def test_16_reco_cache(self):
+        self.print_section("Cache des recommandations", "GET /api/recommend + /api/stats")
+        now = [0.0]
+        cache = LRUCache(max_entries=2, ttl=10.0, clock=lambda: now[0])
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)  # 'b' est le moins récemment utilisé
+        now[0] = 5.0
+        if cache.get('b') is not None or cache.get('a') != 1:
+            self.log_fail("Éviction LRU incorrecte")
+            self.fail()
+        now[0] = 20.0
+        if cache.get('c') is not None:
+            self.log_fail("Entrée expirée encore servie")
+            self.fail()
+        self.log_step(f"LRU + TTL corrects : {cache.stats()}")
+
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'cache.db')
+            worker_a, worker_b = LRUCache(shared=SharedCache(path)), LRUCache(shared=SharedCache(path))
+            worker_a.set('user:1', [{'id': 1}])
+            if worker_b.get('user:1') != [{'id': 1}] or worker_b.stats()['shared_hits'] != 1:
+                self.log_fail("Entrée non partagée entre workers")
+                self.fail()
+            worker_a.invalidate('user:1')
+            if SharedCache(path).get('user:1') is not None:
+                self.log_fail("Invalidation non propagée au cache partagé")
+                self.fail()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        self.log_step("Cache SQLite partagé entre workers correct.")
+
+        self.client.post('/api/login', json={'username': self.test_user, 'password': self.test_pass})
+        first = json.loads(self.client.get('/api/recommend').data)
+        before = json.loads(self.client.get('/api/stats').data)['recommend_cache']
+        second = json.loads(self.client.get('/api/recommend').data)
+        after = json.loads(self.client.get('/api/stats').data)['recommend_cache']
+        if first != second or after['hits'] != before['hits'] + 1:
+            self.log_fail("Deuxième appel non servi par le cache")
+            self.fail()
+        if first:
+            self.client.post('/api/rate', json={'serie_id': first[0]['id'], 'rating': 4})
+            third = json.loads(self.client.get('/api/recommend').data)
+            self.client.delete('/api/rate', json={'serie_id': first[0]['id']})
+            if any(r['id'] == first[0]['id'] for r in third):
+                self.log_fail("Recommandations non invalidées après /api/rate")
+                self.fail()
+        self.log_success(f"Cache utilisé et invalidé par /api/rate ({after['hits']} hits, {after['misses']} misses).")
+
+    def test_17_series_stats(self):
+        self.print_section("Agrégats des notes (series_stats)")
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE ratings (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, serie_id INTEGER, rating INTEGER)")
+        create_series_stats(conn)
+        rng = np.random.default_rng(0)
+        for _ in range(500):
+            op = rng.random()
+            if op < 0.6:
+                conn.execute("INSERT INTO ratings (user_id, serie_id, rating) VALUES (?, ?, ?)",
+                             (int(rng.integers(1, 20)), int(rng.integers(1, 10)), int(rng.integers(1, 6))))
+            elif op < 0.8:
+                conn.execute("DELETE FROM ratings WHERE id = (SELECT id FROM ratings ORDER BY random() LIMIT 1)")
+            else:
+                conn.execute("UPDATE ratings SET rating = ?, serie_id = ? WHERE id = (SELECT id FROM ratings ORDER BY random() LIMIT 1)",
+                             (int(rng.integers(1, 6)), int(rng.integers(1, 10))))
+        self.log_step("500 insertions / suppressions / modifications de notes, comparaison avec un GROUP BY...")
+
+        triggered = conn.execute("SELECT serie_id, rating_count, rating_sum, score FROM series_stats ORDER BY serie_id").fetchall()
+        expected = conn.execute("SELECT serie_id, COUNT(*), SUM(rating), (SUM(rating) + ? * ?) / (COUNT(*) + ?) FROM ratings GROUP BY serie_id ORDER BY serie_id",
+                                (PRIOR_WEIGHT, PRIOR_MEAN, PRIOR_WEIGHT)).fetchall()
+        rebuild_series_stats(conn)
+        rebuilt = conn.execute("SELECT serie_id, rating_count, rating_sum, score FROM series_stats ORDER BY serie_id").fetchall()
+        conn.close()
+        if triggered != rebuilt or [r[:3] for r in triggered] != [r[:3] for r in expected] \
+                or not np.allclose([r[3] for r in triggered], [r[3] for r in expected]):
+            self.log_fail("Agrégats des triggers différents du recalcul complet")
+            self.fail()
+        self.log_success(f"Agrégats exacts pour {len(triggered)} séries (triggers = recalcul = GROUP BY).")
+
+    def test_18_db_pool(self):
+        self.print_section("Pool de connexions SQLite (WAL) et UPSERT des notes")
+        folder = tempfile.mkdtemp()
+        try:
+            pool = ConnectionPool(os.path.join(folder, 'pool.db'), max_idle=2)
+            conn = pool.connect()
+            conn.execute("CREATE TABLE ratings (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, serie_id INTEGER, rating INTEGER)")
+            conn.execute(RATINGS_UNIQUE_SQL)
+            create_series_stats(conn)
+            conn.commit()
+            mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            conn.close()
+            conn.close()  # Double close sans effet
+            reused = pool.connect()
+            if mode != 'wal' or reused is not conn or pool.stats()['opened'] != 1:
+                self.log_fail("Connexion non réutilisée ou mode WAL absent")
+                self.fail()
+            self.log_step(f"Connexion réutilisée, journal_mode={mode} : {pool.stats()}")
+
+            for rating in (2, 5, 4):
+                reused.execute(UPSERT_RATING_SQL, (1, 10, rating))
+            reused.commit()
+            rows = reused.execute("SELECT rating FROM ratings").fetchall()
+            stats = reused.execute("SELECT rating_count, rating_sum FROM series_stats").fetchall()
+            reused.close()
+            pool.close_all()
+            if [tuple(r) for r in rows] != [(4,)] or [tuple(r) for r in stats] != [(1, 4)]:
+                self.log_fail(f"UPSERT incorrect : {[tuple(r) for r in rows]} / {[tuple(r) for r in stats]}")
+                self.fail()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        self.log_success("Une seule note par (utilisateur, série), agrégats à jour.")
+
+    def test_19_hot_reload(self):
+        self.print_section("Rechargement à chaud du modèle", "POST /api/admin/reload + GET /api/model")
+        versions = iter(['v1', 'v2'])
+        def loader():
+            version = next(versions, None)
+            if version is None:
+                raise RuntimeError("source indisponible")
+            return version
+        reloader = ModelReloader(loader)
+        reloader.reload()
+        reloader.reload()
+        try:
+            reloader.reload()
+        except RuntimeError:
+            pass
+        if reloader.current != 'v2' or reloader.reloads != 2 or not reloader.last_error:
+            self.log_fail("L'échec d'un rechargement doit garder l'instantané précédent")
+            self.fail()
+        self.log_step("Un rechargement en échec garde l'ancien instantané.")
+
+        sources = {'manifest': 1}
+        def saving_loader():
+            sources['manifest'] += 1  # Le chargement ré-entraîne et réécrit le modèle sur disque
+            return 'v3'
+        reloader = ModelReloader(saving_loader, probe=lambda: dict(sources))
+        reloader.reload()
+        if reloader.changed():
+            self.log_fail("Le modèle écrit par le chargement déclenche un nouveau rechargement")
+            self.fail()
+        sources['etl'] = 2
+        if not reloader.changed():
+            self.log_fail("Changement des sources non détecté")
+            self.fail()
+        self.log_step("Sonde relevée après le chargement : pas de rechargement en boucle.")
+
+        rows = [(i + 1, f"Serie {i}", text) for i, text in enumerate(SAMPLE_CORPUS)]
+        digests = series_digests(rows)
+        tmp = tempfile.mkdtemp()
+        folder, fits = os.path.join(tmp, 'model'), []
+        def worker_start():
+            if load_artifacts(folder, digests[0]) is None:
+                with artifact_lock(folder):
+                    if load_artifacts(folder, digests[0]) is None:
+                        fits.append(1)
+                        save_artifacts(folder, fit_model(digests, SAMPLE_CORPUS))
+        try:
+            starts = [threading.Thread(target=worker_start) for _ in range(4)]
+            for thread in starts:
+                thread.start()
+            for thread in starts:
+                thread.join()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        if len(fits) != 1:
+            self.log_fail(f"{len(fits)} entraînements pour 4 démarrages simultanés")
+            self.fail()
+        self.log_step("4 démarrages simultanés : un seul entraînement, les autres chargent le disque.")
+
+        import app as app_module
+        previous_token = app_module.ADMIN_TOKEN
+        app_module.ADMIN_TOKEN = None
+        hidden = self.client.post('/api/admin/reload?wait=1', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+        app_module.ADMIN_TOKEN = 'jeton-de-test'
+        forbidden = self.client.post('/api/admin/reload?wait=1', headers={'X-Admin-Token': 'mauvais'})
+        if hidden.status_code != 404 or forbidden.status_code != 403:
+            app_module.ADMIN_TOKEN = previous_token
+            self.log_fail(f"Route d'admin accessible : HTTP {hidden.status_code} sans jeton configuré, "
+                          f"{forbidden.status_code} avec un mauvais jeton")
+            self.fail()
+        self.log_step("Admin : 404 sans jeton configuré (même en local), 403 avec un mauvais jeton.")
+
+        errors = []
+        def hammer():
+            client = app.test_client()
+            for _ in range(30):
+                response = client.get('/api/search?q=avion')
+                if response.status_code != 200 or not json.loads(response.data):
+                    errors.append(response.status_code)
+        workers = [threading.Thread(target=hammer) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        try:
+            response = self.client.post('/api/admin/reload?wait=1', headers={'X-Admin-Token': 'jeton-de-test'})
+        finally:
+            app_module.ADMIN_TOKEN = previous_token
+            for worker in workers:
+                worker.join()
+        info = json.loads(self.client.get('/api/model').data)
+        if response.status_code != 200 or errors or not info.get('version'):
+            self.log_fail(f"Rechargement pendant le trafic : HTTP {response.status_code}, erreurs {errors}")
+            self.fail()
+        self.log_success(f"Modèle {info['version'][:12]} rechargé en {info['load_seconds']} s sans erreur de requête.")
+
+    def test_20_streaming_reader(self):
+        self.print_section("Lecture en flux des sous-titres (ETL)")
+        rng = np.random.default_rng(0)
+        pieces = ["1\n", "00:00:20,000 --> 00:00:22,500\n", "<i>", "</i>", "<font color=red>", "<3 ", "> ",
+                  "L'été ", "à ", "Hôpital ", "crash avion ", "\n\n", "ﬁn ", "naïve ", "survie\n"]
+        self.log_step("Nettoyage par morceaux de taille aléatoire comparé au nettoyage complet...")
+        for _ in range(200):
+            text = "".join(rng.choice(pieces, size=rng.integers(1, 60)))
+            cleaner = TextCleaner()
+            cuts = np.sort(rng.integers(0, len(text) + 1, size=rng.integers(0, 8)))
+            for start, end in zip(np.r_[0, cuts], np.r_[cuts, len(text)]):
+                cleaner.feed(text[start:end])
+            if cleaner.result() != clean_text_content(text):
+                self.log_fail(f"Nettoyage en flux différent pour {text!r}")
+                self.fail()
+
+        folder = tempfile.mkdtemp()
+        try:
+            # UTF-8 valide sur tout le préfixe, octet invalide bien plus loin -> Latin-1 pour tout le membre
+            late_latin = ("Éléphant volant\n" * 8000).encode('utf-8') + "café\n".encode('latin-1')
+            members = {'a.srt': "00:00:01,000 --> 00:00:02,000\n<i>Crash d'avion</i>\n".encode('utf-8'),
+                       'b.srt': "Île déserte, été\n".encode('latin-1'), 'c.txt': late_latin}
+            nested = os.path.join(folder, 'inner.zip')
+            with zipfile.ZipFile(nested, 'w', zipfile.ZIP_DEFLATED) as z:
+                for name, data in members.items():
+                    z.writestr(name, data)
+            archive = os.path.join(folder, 'outer.zip')
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as z:
+                z.writestr('intro.srt', "Bienvenue à bord\n".encode('utf-8'))
+                z.write(nested, 'saison1/inner.zip')
+                z.writestr('broken.zip', b"pas un zip")
+
+            def decode(data):
+                try:
+                    return data.decode('utf-8')
+                except UnicodeDecodeError:
+                    return data.decode('latin-1')
+            raw = " " + decode("Bienvenue à bord\n".encode('utf-8')) + " " + " ".join(decode(d) for d in members.values())
+            entries = []
+            if read_file_content(archive, entries) != clean_text_content(raw) or len(entries) != 4:
+                self.log_fail("Archive imbriquée lue différemment du décodage complet")
+                self.fail()
+
+            self.log_step("Zip imbriqué corrompu après un premier membre lu -> ni texte ni membres gardés...")
+            half = os.path.join(folder, 'half.zip')
+            with zipfile.ZipFile(half, 'w', zipfile.ZIP_STORED) as z:
+                z.writestr('ok.srt', "Sous-marin nucleaire\n")
+                z.writestr('bad.srt', "Tempete en mer\n")
+            with open(half, 'rb') as f:
+                data = f.read()
+            data = data.replace(b"Tempete", b"Tempeta")  # CRC faux : erreur à la fin de la lecture du membre
+            archive = os.path.join(folder, 'partial.zip')
+            with zipfile.ZipFile(archive, 'w', zipfile.ZIP_STORED) as z:
+                z.writestr('intro.srt', "Bienvenue à bord\n")
+                z.writestr('half.zip', data)
+            entries = []
+            if (read_file_content(archive, entries) != clean_text_content("Bienvenue à bord")
+                    or [e[0] for e in entries] != ['intro.srt']):
+                self.log_fail(f"Membres du zip illisible gardés au manifeste : {entries}")
+                self.fail()
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        self.log_success("Texte identique au nettoyage complet (zips imbriqués, encodages, balises coupées, zip corrompu).")
+
+    def test_21_fused_cleaner(self):
+        self.print_section("Nettoyage du texte en une passe")
+        def three_passes(text):
+            text = remove_accents_etl(text)
+            text = re.sub(r'\d{2}:\d{2}:\d{2}[,.]\d{3}.*?', ' ', text)
+            text = re.sub(r'<[^>]+>', ' ', text)
+            text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
+            return " ".join(w for w in text.lower().split() if w not in get_analyzer().stop_words and len(w) > 2)
+
+        rng = np.random.default_rng(1)
+        pieces = ["12\n", "00:00:20,000 --> 00:00:22,500\n", "<i>", "</i>", "<3 ", ">", "1", "2:34:56.789",
+                  "L'été ", "Hôpital ", "crash avion ", "ﬁn ", "İ", "ß ", "١٢:٣٤:٥٦,٧٨٩ ", "!!", "\r\n"]
+        self.log_step("Comparaison avec l'ancien nettoyage en trois passes...")
+        for _ in range(300):
+            text = "".join(rng.choice(pieces, size=rng.integers(1, 40)))
+            if clean_text(text) != three_passes(text):
+                self.log_fail(f"Nettoyage différent pour {text!r}")
+                self.fail()
+
+        self.log_step("Mode SRT (numéros de réplique et lignes '-->' ignorés), complet et en flux...")
+        srt = "1\n00:00:01,000 --> 00:00:02,000\n<i>Crash</i> de l'avion\n\n2\n00:00:03,000 --> 00:00:04,000\nVol 815\n"
+        cleaner = TextCleaner(srt=True)
+        for start in range(0, len(srt), 7):
+            cleaner.feed(srt[start:start + 7])
+        if clean_text(srt, srt=True) != "crash avion vol 815" or cleaner.result() != "crash avion vol 815":
+            self.log_fail(f"Mode SRT incorrect : {clean_text(srt, srt=True)!r}")
+            self.fail()
+        self.log_success("Mêmes mots qu'en trois passes ; mode SRT identique en flux.")
+
+    def test_22_similar(self):
+        self.print_section("Séries similaires (plongements + index LSH)", "GET /api/similar/<id>")
+        rng = np.random.default_rng(0)
+        centers = rng.standard_normal((20, 32))
+        vectors = centers[rng.integers(0, 20, size=2000)] + 0.3 * rng.standard_normal((2000, 32))
+        vectors = (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+        index = LSHIndex(vectors)
+        self.log_step("Rappel@10 de l'index LSH contre la recherche exhaustive...")
+        hits = 0
+        for row in range(0, 2000, 40):
+            exact = np.argsort(-(vectors @ vectors[row]))[1:11]
+            found, _ = index.similar(row, 10)
+            if row in found:
+                self.log_fail("La série demandée figure dans ses propres similaires.")
+                self.fail()
+            hits += len(np.intersect1d(found, exact))
+        recall = hits / (10 * 50)
+        if recall < 0.8:
+            self.log_fail(f"Rappel@10 trop faible : {recall:.2f}")
+            self.fail()
+
+        self.log_step("Appel de l'API sur la série de test, puis sur un id inconnu...")
+        response = self.client.get('/api/similar/1?n=5')
+        data = json.loads(response.data)
+        if response.status_code != 200 or len(data) > 5 or any(d['id'] == 1 for d in data):
+            self.log_fail(f"Réponse incorrecte : {response.status_code} {data}")
+            self.fail()
+        if self.client.get('/api/similar/999999').status_code != 404:
+            self.log_fail("Id inconnu : 404 attendu")
+            self.fail()
+        self.log_success(f"Rappel@10 = {recall:.2f}, {len(data)} séries similaires renvoyées par l'API.")
+
+    def test_23_search_cache(self):
+        self.print_section("Cache des recherches (requêtes normalisées, préfixes)", "GET /api/search")
+        import app as app_module
+        search_cache.clear()
+        model = app_module.reloader.current
+        self.log_step("Même requête écrite autrement (accents, majuscules, espaces) -> servie par le cache...")
+        first = json.loads(self.client.get('/api/search?q=Avion  Crash').data)
+        hits = search_cache.stats()['hits']
+        second = json.loads(self.client.get('/api/search?q=  avion crash ').data)
+        if first != second or search_cache.stats()['hits'] != hits + 1:
+            self.log_fail("La requête normalisée n'a pas été servie par le cache.")
+            self.fail()
+
+        self.log_step("Frappe progressive : les candidats du préfixe sont réutilisés, résultat inchangé...")
+        prefix = [app_module.SEARCH_PREFIX.value(mode) for mode in ('reused', 'seeded')]
+        served = [json.loads(self.client.get(f'/api/search?q={typed}').data) for typed in ("avi", "avio", "avion")]
+        used = sum(app_module.SEARCH_PREFIX.value(mode) for mode in ('reused', 'seeded')) - sum(prefix)
+        app_module.search_cache = LRUCache()  # Calcul de référence, sans préfixe en cache
+        try:
+            expected = [search_results(model, typed)['results'] for typed in ("avi", "avio", "avion")]
+        finally:
+            app_module.search_cache = search_cache
+        if served != expected:
+            self.log_fail("Résultats différents du calcul sans cache")
+            self.fail()
+        if used != 2:
+            self.log_fail(f"Préfixes réutilisés : {used} au lieu de 2")
+            self.fail()
+        stats = json.loads(self.client.get('/api/stats').data)['search_cache']
+        self.log_success(f"Taux de hits {stats['hit_rate']:.0%}, préfixes {stats['prefix']}.")
+
+    def test_24_suggest(self):
+        self.print_section("Suggestions pendant la frappe (index de préfixes)", "GET /api/suggest")
+        index = SuggestIndex(["Breaking Bad", "Bad Sisters", "Better Call Saul", "L'Île Mystérieuse"], [10, 1, 5, 0],
+                             ["bad", "breaking", "breaking bad", "ile", "better"], [3, 1, 1, 2, 1])
+        self.log_step("Titres par début de mot, classés par popularité ; termes par nombre de séries...")
+        checks = [
+            (index.series("b"), [0, 2, 1]),
+            (index.series("bad"), [0, 1]),     # Mot du milieu ("Breaking Bad") compris
+            (index.series("ÎLE"), [3]),        # Accents et majuscules ignorés
+            (index.words("b", 2), ["bad", "better"]),
+            (index.words("breaking b", 2), ["breaking bad", "breaking better"]),
+            (index.series(""), []),
+        ]
+        for got, expected in checks:
+            if got != expected:
+                self.log_fail(f"Attendu {expected}, reçu {got}")
+                self.fail()
+
+        self.log_step("Appel de l'API avec le début du titre de la série de test...")
+        data = json.loads(self.client.get('/api/suggest?prefix=Serie%20Te').data)
+        if not any(s['id'] == 1 for s in data['series']):
+            self.log_fail(f"Série de test absente des suggestions : {data}")
+            self.fail()
+        self.log_success(f"Suggestions correctes ({len(data['series'])} titres, {len(data['terms'])} termes).")
+
+    def test_25_metrics(self):
+        self.print_section("Métriques de latence et profilage échantillonné", "GET /metrics")
+        self.log_step("Histogramme cumulatif au format texte Prometheus...")
+        registry = Registry()
+        latency = registry.histogram('test_seconds', "Test.", ('route',), buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 2.0):
+            latency.observe(value, '/api/x')
+        text = registry.render()
+        for line in ('test_seconds_bucket{route="/api/x",le="0.1"} 1', 'test_seconds_bucket{route="/api/x",le="1.0"} 2',
+                     'test_seconds_bucket{route="/api/x",le="+Inf"} 3', 'test_seconds_count{route="/api/x"} 3'):
+            if line not in text.splitlines():
+                self.log_fail(f"Ligne absente : {line}")
+                self.fail()
+
+        self.log_step("Latence par route et par étape après une recherche et une recommandation...")
+        self.client.get('/api/search?q=metrics%20test')
+        self.client.get('/api/recommend')
+        response = self.client.get('/metrics')
+        text = response.data.decode()
+        expected = ['seriesminer_http_request_duration_seconds_count{route="/api/search",method="GET",status="200"}',
+                    'seriesminer_stage_seconds_count{route="/api/search",stage="transform"}',
+                    'seriesminer_cache_hits{cache="search"}']
+        if not response.content_type.startswith('text/plain') or any(e not in text for e in expected):
+            self.log_fail(f"Métriques incomplètes : {[e for e in expected if e not in text]}")
+            self.fail()
+
+        self.log_step("Profil cProfile sauvegardé pour une requête lente (échantillonnage 100 %)...")
+        folder = tempfile.mkdtemp()
+        try:
+            profiler = SamplingProfiler(rate=1.0, slow_seconds=0.0, folder=folder)
+            profile = profiler.start()
+            busy = profiler.start()  # Un seul profil à la fois
+            sum(range(1000))
+            path = profiler.finish(profile, '/api/similar/<int:serie_id>', 0.3)
+            if busy is not None or path is None or not os.path.exists(path) or not path.endswith('.prof'):
+                self.log_fail(f"Profil non sauvegardé : {path}")
+                self.fail()
+        finally:
+            shutil.rmtree(folder)
+
+        self.log_step("Requête profilée qui lève une exception -> profileur arrêté, verrou rendu...")
+        previous = app_profiler.rate, app_profiler.slow_seconds
+        app_profiler.rate, app_profiler.slow_seconds = 1.0, float('inf')  # Aucun profil écrit
+        try:
+            with self.assertRaises(KeyError):  # TESTING : l'exception remonte, after_request sauté
+                self.client.post('/api/login', json={})
+            leaked = sys.getprofile() is not None or app_profiler._busy.locked()
+        finally:
+            sys.setprofile(None)
+            app_profiler.rate, app_profiler.slow_seconds = previous
+            if app_profiler._busy.locked():
+                app_profiler._busy.release()
+        if leaked:
+            self.log_fail("Profileur resté actif après l'exception")
+            self.fail()
+        self.log_success(f"/metrics : {len(text.splitlines())} lignes, profil {os.path.basename(path)}.")
+
+    def test_26_bench_corpus(self):
+        self.print_section("Corpus synthétique du banc d'essai", "scripts/bench_suite.py")
+        self.log_step("Deux générations avec la même graine, zips de saison imbriqués 3 fois...")
+        folders = [tempfile.mkdtemp(), tempfile.mkdtemp()]
+        try:
+            stats = [generate_corpus(folder, 2, 12, 3, 40, seed=7)[0] for folder in folders]
+            if stats[0]['sha1'] != stats[1]['sha1'] or stats[0]['files'] != 4:
+                self.log_fail(f"Corpus non reproductible : {stats}")
+                self.fail()
+
+            self.log_step("Lecture d'une saison par l'ETL (zip dans zip dans zip)...")
+            serie = sorted(os.listdir(folders[0]))[0]
+            entries = []
+            text = read_file_content(os.path.join(folders[0], serie, 'Saison_01.zip'), entries)
+            if len(entries) != 10 or len(text.split()) < 10 * 20:
+                self.log_fail(f"{len(entries)} épisodes lus, {len(text.split())} mots")
+                self.fail()
+        finally:
+            for folder in folders:
+                shutil.rmtree(folder)
+        self.log_success(f"Corpus identique (sha1 {stats[0]['sha1'][:12]}), {len(entries)} épisodes relus.")
+
+    def test_27_search_batch(self):
+        self.print_section("Recherche par lots (un produit creux pour toutes les requêtes)", "POST /api/search/batch")
+        import app as app_module
+        model = app_module.reloader.current
+        terms = [t for t in app_module.vocabulary_terms(model.vectorizer) if " " not in t][:40]
+        queries = [normalize_query(q) for q in terms[:10] + [" ".join(terms[i:i + 3]) for i in range(0, 30, 3)]
+                   + ["Série TEST", "motinconnu", ""]]
+        self.log_step(f"Comparaison de search_many avec search_results sur {len(queries)} requêtes...")
+        expected = [(search_results(model, q) or {'results': []})['results'] if q else [] for q in queries]
+        if search_many(model, queries) != expected:
+            self.log_fail("Classements différents entre le lot et les requêtes une à une")
+            self.fail()
+
+        self.log_step("Appel de l'API (ordre conservé, requête vide, format invalide)...")
+        data = json.loads(self.client.post('/api/search/batch', json={'queries': ["serie test", "", "serie test"]}).data)
+        bad = self.client.post('/api/search/batch', json={'queries': "serie"})
+        if len(data['results']) != 3 or data['results'][1] != [] or data['results'][0] != data['results'][2] \
+                or bad.status_code != 400:
+            self.log_fail(f"Réponse inattendue : {data}, statut {bad.status_code}")
+            self.fail()
+        self.log_success(f"Lot identique aux recherches une à une ({len(queries)} requêtes).")
+
+    def test_28_streaming_fit(self):
+        self.print_section("Entraînement TF-IDF en flux (par paquets)", "engine/model.py")
+        rng = np.random.default_rng(3)
+        words = [f"mot{i}" for i in range(4000)]
+        zipf = 1.0 / np.arange(1, len(words) + 1)
+        corpus = [" ".join(rng.choice(words, size=250, p=zipf / zipf.sum())) for _ in range(600)] + [""]
+        self.log_step("Mode exact : même vocabulaire plafonné, même IDF, même matrice que fit_transform...")
+        vectorizer, matrix = fit_tfidf(corpus)
+        streamed, streamed_matrix = fit_tfidf_streaming(corpus, chunk_rows=37)
+        if vocabulary_terms(streamed) != vocabulary_terms(vectorizer) or not np.array_equal(streamed.idf_, vectorizer.idf_) \
+                or not all(np.array_equal(getattr(streamed_matrix, a), getattr(matrix, a)) for a in ('data', 'indices', 'indptr')):
+            self.log_fail("Résultat différent de TfidfVectorizer.fit_transform")
+            self.fail()
+
+        self.log_step("Plafond mémoire : comptage élagué, vocabulaire approché...")
+        capped, capped_matrix = fit_tfidf_streaming(corpus, chunk_rows=37, memory_mb=0.001)
+        common = len(set(vocabulary_terms(capped)) & set(vocabulary_terms(vectorizer))) / len(vectorizer.vocabulary_)
+        if capped_matrix.shape != matrix.shape or common < 0.8:  # Queue de distribution plate : seuil bas
+            self.log_fail(f"Vocabulaire trop différent : {common:.1%} en commun")
+            self.fail()
+        self.log_success(f"Identique en mode exact ({matrix.shape[1]} termes), {common:.1%} du vocabulaire avec plafond.")
+
+    def test_29_series_text(self):
+        self.print_section("Texte nettoyé compressé hors de la table series", "engine/schema.py")
+        from engine.catalogue import iter_series
+        tmp = tempfile.mkdtemp()
+        try:
+            conn = sqlite3.connect(os.path.join(tmp, 'legacy.db'))
+            conn.execute("CREATE TABLE series (id INTEGER PRIMARY KEY AUTOINCREMENT, title TEXT NOT NULL, cleaned_text TEXT)")
+            legacy = [(1, 'Alpha', 'avion crash pilote ' * 200), (2, 'Beta', None), (3, 'Gamma', 'été café noël')]
+            conn.executemany("INSERT INTO series VALUES (?, ?, ?)", legacy)
+            conn.commit()
+
+            self.log_step("Migration d'une base de l'ancienne version...")
+            if not create_series_text(conn, chunk=2) or create_series_text(conn):
+                self.log_fail("Migration non faite, ou refaite au second appel")
+                self.fail()
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(series)")]
+            if columns != ['id', 'title'] or list(iter_series(conn, chunk=2)) != [(i, t, x or '') for i, t, x in legacy]:
+                self.log_fail(f"Colonnes {columns} ou textes relus différents")
+                self.fail()
+            stored = conn.execute("SELECT LENGTH(text) FROM series_text WHERE serie_id = 1").fetchone()[0]
+            if stored * 10 > len(legacy[0][2].encode('utf-8')):
+                self.log_fail(f"Texte répétitif mal compressé : {stored} octets")
+                self.fail()
+
+            self.log_step("Empreintes stockées à l'écriture = empreintes recalculées depuis le texte...")
+            conn.execute("CREATE TABLE old_text (serie_id INTEGER PRIMARY KEY, text BLOB NOT NULL)")
+            conn.execute("INSERT INTO old_text SELECT serie_id, text FROM series_text")
+            conn.execute("DROP TRIGGER trg_series_delete")
+            conn.execute("DROP TABLE series_text")
+            conn.execute("ALTER TABLE old_text RENAME TO series_text")  # Table sans empreintes (version précédente)
+            create_series_text(conn)
+            digests, computed = stored_digests(conn), series_digests(iter_series(conn))
+            if digests[0] != computed[0] or not np.array_equal(digests[2], computed[2]):
+                self.log_fail("Empreintes stockées différentes du texte")
+                self.fail()
+            plan = " ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {SERIES_DIGESTS_SQL}"))
+            if 'COVERING INDEX' not in plan:
+                self.log_fail(f"Empreintes lues dans la table du texte : {plan}")
+                self.fail()
+
+            self.log_step("Suppression d'une série -> texte supprimé par le trigger...")
+            conn.execute("DELETE FROM series WHERE id = 1")
+            if conn.execute("SELECT serie_id FROM series_text ORDER BY serie_id").fetchall() != [(3,)]:
+                self.log_fail("Texte orphelin après suppression de la série")
+                self.fail()
+
+            self.log_step("Version du schéma : vérifiée par l'application, mise à niveau par les scripts...")
+            conn.execute("CREATE TABLE ratings (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, serie_id INTEGER, rating INTEGER)")
+            try:
+                check_schema(conn)
+                self.log_fail("Base non versionnée acceptée")
+                self.fail()
+            except RuntimeError:
+                pass
+            if not ensure_schema(conn) or ensure_schema(conn):
+                self.log_fail("Mise à niveau non faite, ou refaite au second appel")
+                self.fail()
+            check_schema(conn)
+            conn.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+        conn = get_db_connection()
+        plan = " ".join(row[-1] for row in conn.execute("EXPLAIN QUERY PLAN SELECT id, title FROM series ORDER BY title"))
+        conn.close()
+        if 'idx_series_title' not in plan:
+            self.log_fail(f"Index des titres non utilisé : {plan}")
+            self.fail()
+        self.log_success(f"Migration, trigger et index OK (texte répétitif : {stored} octets compressés).")
+
+    def test_30_collaborative(self):
+        self.print_section("Filtrage collaboratif item-item (co-occurrences)", "engine/collaborative.py")
+        rng = np.random.default_rng(5)
+        catalogue = Catalogue(np.arange(40) * 2 + 3, [f"serie_{i}" for i in range(40)])
+        likes = {u: set(rng.choice(40, size=rng.integers(1, 9), replace=False).tolist()) for u in range(60)}
+
+        def dense_similarity(likes):
+            liked = np.zeros((len(likes), 40))
+            for u, rows in likes.items():
+                liked[u, list(rows)] = 1
+            co = liked.T @ liked
+            norms = np.sqrt(np.diag(co))
+            np.fill_diagonal(co, 0)
+            return np.divide(co, np.outer(norms, norms), out=np.zeros_like(co), where=np.outer(norms, norms) > 0)
+
+        def pairs(likes):
+            return [(u, int(catalogue.ids[r])) for u, rows in likes.items() for r in rows]
+
+        self.log_step("Similarités creuses = cosinus dense des colonnes utilisateurs × séries...")
+        index = CooccurrenceIndex.from_likes(pairs(likes), catalogue)
+        if not np.allclose(index.similarity().toarray(), dense_similarity(likes), atol=1e-6):
+            self.log_fail("Similarités différentes du calcul dense")
+            self.fail()
+
+        self.log_step("Notes arrivées une à une -> même résultat qu'une reconstruction...")
+        for _ in range(150):
+            u, row = int(rng.integers(0, 60)), int(rng.integers(0, 40))
+            was_liked = row in likes[u]
+            likes[u] ^= {row}
+            index.rate(int(catalogue.ids[row]), catalogue.ids[list(likes[u])], was_liked, row in likes[u])
+        rebuilt = CooccurrenceIndex.from_likes(pairs(likes), catalogue)
+        rows, weights = np.array([0, 5, 9]), np.array([1.0, 4.0, 2.0])
+        if index.n_pending == 0 or not np.allclose(index.scores(rows, weights), rebuilt.scores(rows, weights), atol=1e-6):
+            self.log_fail("Scores incrémentaux (en attente de fusion) différents")
+            self.fail()
+        if not np.allclose(index.similarity().toarray(), dense_similarity(likes), atol=1e-6) or index.n_pending:
+            self.log_fail("Fusion des co-occurrences en attente incorrecte")
+            self.fail()
+
+        self.log_step("Mélange content-based / collaboratif : seul = par lots ; poids 0 = content-based...")
+        _, matrix = fit_tfidf([" ".join(rng.choice(["avion", "crash", "pilote", "zombie", "ville", "police"], size=4))
+                               for _ in range(40)])
+        neighbors = build_neighbor_index(matrix, k=10)
+        users = [[(int(catalogue.ids[r]), 4) for r in rows] for rows in list(likes.values())[:20] if rows]
+        blended = Recommender(neighbors, catalogue, collaborative=index, blend=0.5)
+        for (rows_a, scores_a), (rows_b, scores_b) in zip(blended.recommend_many(users), [blended.recommend(r) for r in users]):
+            if not np.array_equal(rows_a, rows_b) or not np.allclose(scores_a, scores_b, atol=1e-5):
+                self.log_fail("Mélange différent seul / par lots")
+                self.fail()
+        content = Recommender(neighbors, catalogue)
+        off = Recommender(neighbors, catalogue, collaborative=index, blend=0.0)
+        if any(not np.array_equal(a[0], b[0]) for a, b in zip(content.recommend_many(users), off.recommend_many(users))):
+            self.log_fail("Poids 0 : résultat différent du content-based seul")
+            self.fail()
+
+        self.log_step("POST /api/rate -> co-occurrences du modèle servi mises à jour...")
+        import app as app_module
+        live = app_module.reloader.current.recommender.collaborative
+        self.client.post('/api/login', json={'username': self.test_user, 'password': self.test_pass})
+        serie_id = int(app_module.reloader.current.catalogue.ids[-1])
+        counts = live.counts.copy()
+        self.client.post('/api/rate', json={'serie_id': serie_id, 'rating': 5})
+        liked_counts = live.counts.copy()
+        self.client.delete('/api/rate', json={'serie_id': serie_id})
+        if liked_counts[-1] != counts[-1] + 1 or not np.array_equal(live.counts, counts):
+            self.log_fail("Note non prise en compte par le filtrage collaboratif")
+            self.fail()
+
+        self.log_step("Note écrite pendant un rechargement -> rejouée sur le nouvel instantané avant publication...")
+        loader = app_module.reloader.loader
+
+        def loader_with_rating():
+            snapshot = loader()  # Notes lues, instantané pas encore publié
+            self.client.post('/api/rate', json={'serie_id': serie_id, 'rating': 5})
+            return snapshot
+        app_module.reloader.loader = loader_with_rating
+        try:
+            current = app_module.reloader.reload()
+        finally:
+            app_module.reloader.loader = loader
+        conn = get_db_connection()
+        rebuilt = CooccurrenceIndex.from_likes(conn.execute("SELECT user_id, serie_id FROM ratings WHERE rating >= 3"),
+                                               current.catalogue)
+        conn.close()
+        fresh = current.recommender.collaborative
+        replayed = fresh is not live and fresh.updates == 1 and np.array_equal(fresh.counts, rebuilt.counts) \
+            and np.allclose(fresh.similarity().toarray(), rebuilt.similarity().toarray(), atol=1e-6)
+        self.client.delete('/api/rate', json={'serie_id': serie_id})
+        if not replayed:
+            self.log_fail("Note écrite pendant le rechargement perdue par le nouvel instantané")
+            self.fail()
+        live = fresh
+
+        self.log_step("Note invalide -> 400, sans verrou d'écriture ni connexion perdue...")
+        idle = app_module.db_pool.stats()['idle']
+        bad = self.client.post('/api/rate', json={'serie_id': serie_id, 'rating': 'abc'})
+        other = sqlite3.connect(DB_PATH, timeout=0.1)
+        try:
+            other.execute('BEGIN IMMEDIATE')
+            other.rollback()
+        except sqlite3.OperationalError as e:
+            self.log_fail(f"Base verrouillée après une note invalide : {e}")
+            self.fail()
+        finally:
+            other.close()
+        if bad.status_code != 400 or app_module.db_pool.stats()['idle'] < idle:
+            self.log_fail(f"HTTP {bad.status_code}, connexions au repos {idle} -> {app_module.db_pool.stats()['idle']}")
+            self.fail()
+        self.log_success(f"Collaboratif exact, incrémental et mélangé ({live.updates} notes reçues par le modèle servi).")
+
+    def test_31_analyzer(self):
+        self.print_section("Analyseur partagé (ETL, vectoriseur, requêtes)", "engine/analyzer.py")
+        raw = "L'Été à <i>Paris</i> : the Walking-Dead!! 00:01:02,500 et les ZOMBIES"
+        self.log_step("Même nettoyage pour le texte de l'ETL et la requête...")
+        if normalize_query(raw) != clean_text_content(raw) or normalize_query(raw) != "ete paris walking dead zombies":
+            self.log_fail(f"Requête {normalize_query(raw)!r} / document {clean_text_content(raw)!r}")
+            self.fail()
+
+        self.log_step("Racinisation Snowball mémoïsée...")
+        analyzer = Analyzer(languages=['english'], stemmer='english')
+        first, again = analyzer.terms("walking walked walks the"), analyzer.terms("walks walking")
+        if first != ['walk'] * 3 or again != ['walk'] * 2 or analyzer.stem.cache_info()[:2] != (2, 3):
+            self.log_fail(f"Racines {analyzer.terms('walking walked walks')} ({analyzer.stem.cache_info()})")
+            self.fail()
+        try:
+            Analyzer(languages=['klingon'])
+            self.log_fail("Langue inconnue acceptée")
+            self.fail()
+        except ValueError:
+            pass
+
+        self.log_step("Configuration racinisée : vectoriseur, requête et manifeste du modèle...")
+        previous = dict(ANALYZER_CONFIG)
+        ANALYZER_CONFIG['stemmer'] = 'english'
+        try:
+            vectorizer, _ = fit_tfidf([clean_text_content("Walking with the zombies"), clean_text_content("Cooking show")])
+            query = vectorizer.transform([normalize_query("Zombie walks")])
+            config = model_config()['analyzer']
+        finally:
+            ANALYZER_CONFIG.update(previous)
+        if query.nnz != 2 or config['stemmer'] != 'english' or model_config()['analyzer']['stemmer'] is not None:
+            self.log_fail(f"Requête racinisée : {query.nnz} termes, configuration {config}")
+            self.fail()
+        self.log_success(f"Analyse commune ({len(get_analyzer().stop_words)} mots vides {'/'.join(get_analyzer().config['languages'])}).")
+
+    def test_32_incremental_etl(self):
+        self.print_section("ETL incrémental (manifeste, journal, comptes et notes gardés)", "scripts/setup_etl.py --incremental")
+        tmp = tempfile.mkdtemp()
+        data_dir = os.path.join(tmp, 'data')
+
+        def write_serie(name, text, file='s01e01.srt'):
+            os.makedirs(os.path.join(data_dir, name), exist_ok=True)
+            with open(os.path.join(data_dir, name, file), 'w', encoding='utf-8') as f:
+                f.write(text * 3)  # Au-delà des 50 caractères d'une série indexée
+
+        def run_etl(conn):
+            with contextlib.redirect_stdout(io.StringIO()):
+                process_etl(conn, incremental=True, data_dir=data_dir, metrics_path=None)
+            return {title: (serie_id, decompress_text(text)) for serie_id, title, text in conn.execute(
+                "SELECT s.id, s.title, t.text FROM series s JOIN series_text t ON t.serie_id = s.id")}
+
+        def journal(conn, after=0):
+            return sorted(conn.execute("SELECT s.title, c.change FROM series_changes c LEFT JOIN series s ON s.id = c.serie_id "
+                                       "WHERE c.version > ?", (after,)).fetchall(), key=str)
+
+        try:
+            write_serie('Lost', "Crash d'avion sur une ile deserte, survie des passagers du vol")
+            write_serie('Dexter', "Detective de la police scientifique, meurtres en serie a Miami")
+            write_serie('Vikings', "Guerriers nordiques, raids en drakkar et batailles contre les saxons")
+            with contextlib.redirect_stdout(io.StringIO()):
+                conn = init_database(reset=True, db_path=os.path.join(tmp, 'series.db'))
+            self.log_step("Premier passage sur une base vide : toutes les séries ajoutées et journalisées...")
+            first = run_etl(conn)
+            if sorted(first) != ['Dexter', 'Lost', 'Vikings'] or journal(conn) != sorted(
+                    [('Dexter', 'upsert'), ('Lost', 'upsert'), ('Vikings', 'upsert')], key=str):
+                self.log_fail(f"Séries {sorted(first)}, journal {journal(conn)}")
+                self.fail()
+
+            conn.execute("INSERT INTO users (username, password) VALUES ('fan', 'x')")
+            user_id = conn.execute("SELECT id FROM users WHERE username = 'fan'").fetchone()[0]
+            conn.executemany(UPSERT_RATING_SQL, [(user_id, first[t][0], r) for t, r in (('Lost', 5), ('Dexter', 4), ('Vikings', 2))])
+            conn.commit()
+            version = conn.execute("SELECT MAX(version) FROM series_changes").fetchone()[0]
+
+            self.log_step("Fichier modifié, série ajoutée, série supprimée...")
+            write_serie('Lost', "Crash d'avion sur une ile mysterieuse, fumee noire et trappe dans la jungle")
+            write_serie('Breaking Bad', "Professeur de chimie, laboratoire clandestin et cartel de la drogue")
+            shutil.rmtree(os.path.join(data_dir, 'Vikings'))
+            second = run_etl(conn)
+            if (sorted(second) != ['Breaking Bad', 'Dexter', 'Lost'] or second['Lost'][0] != first['Lost'][0]
+                    or 'fumee' not in second['Lost'][1] or second['Dexter'] != first['Dexter']):
+                self.log_fail(f"Séries après l'ETL incrémental : {second}")
+                self.fail()
+            if journal(conn, version) != sorted([('Breaking Bad', 'upsert'), ('Lost', 'upsert'), (None, 'delete')], key=str):
+                self.log_fail(f"Journal : {journal(conn, version)}")
+                self.fail()
+            paths = {row[0] for row in conn.execute("SELECT serie_name FROM etl_manifest")}
+            if paths != {'Breaking Bad', 'Dexter', 'Lost'}:
+                self.log_fail(f"Manifeste : {paths}")
+                self.fail()
+
+            self.log_step("Comptes et notes gardés, notes de la série supprimée retirées (series_stats compris)...")
+            ratings = sorted(conn.execute("SELECT serie_id, rating FROM ratings WHERE user_id = ?", (user_id,)).fetchall())
+            stats = sorted(r[0] for r in conn.execute("SELECT serie_id FROM series_stats"))
+            if ratings != sorted([(first['Lost'][0], 5), (first['Dexter'][0], 4)]) or stats != sorted([first['Lost'][0], first['Dexter'][0]]):
+                self.log_fail(f"Notes {ratings}, agrégats {stats}")
+                self.fail()
+            if conn.execute("SELECT COUNT(*) FROM users WHERE username IN ('fan', 'etudiant')").fetchone()[0] != 2:
+                self.log_fail("Comptes perdus par l'ETL incrémental")
+                self.fail()
+
+            self.log_step("Aucun changement -> aucune série retraitée...")
+            version = conn.execute("SELECT MAX(version) FROM series_changes").fetchone()[0]
+            if run_etl(conn) != second or journal(conn, version):
+                self.log_fail(f"Séries retraitées sans changement : {journal(conn, version)}")
+                self.fail()
+            conn.close()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.log_success("Manifeste comparé, séries mises à jour / ajoutées / supprimées, notes des autres séries gardées.")
+
+    def test_33_parallel_etl(self):
+        self.print_section("ETL parallèle = ETL séquentiel", "scripts/setup_etl.py --workers")
+        tmp = tempfile.mkdtemp()
+        data_dir = os.path.join(tmp, 'data')
+        rng = np.random.default_rng(3)
+        words = ["avion", "crash", "ile", "survie", "police", "meurtre", "dragon", "chateau", "Hôpital", "été"]
+        try:
+            for i in range(12):
+                folder = os.path.join(data_dir, f"Serie {i:02d}", "Saison 1")
+                os.makedirs(folder)
+                for e in range(3):
+                    text = " ".join(rng.choice(words, size=40))
+                    with open(os.path.join(folder, f"e{e}.srt"), 'wb') as f:
+                        f.write(text.encode('latin-1' if e == 1 else 'utf-8'))
+                with open(os.path.join(folder, "mots_vides.txt"), 'w', encoding='utf-8') as f:
+                    f.write("le la les et\n")  # Texte brut sans mot nettoyé : séparateur gardé
+                open(os.path.join(folder, "vide.srt"), 'w').close()
+                with zipfile.ZipFile(os.path.join(folder, "bonus.zip"), 'w') as z:
+                    z.writestr('bonus.srt', " ".join(rng.choice(words, size=20)))
+            os.makedirs(os.path.join(data_dir, "Dossier vide"))
+
+            contents = {}
+            for workers in (1, 2):
+                self.log_step(f"ETL complet avec {workers} worker(s)...")
+                with contextlib.redirect_stdout(io.StringIO()):
+                    conn = init_database(reset=True, db_path=os.path.join(tmp, f"series_{workers}.db"))
+                    process_etl(conn, workers=workers, data_dir=data_dir, metrics_path=None)
+                contents[workers] = (
+                    conn.execute("SELECT id, title FROM series ORDER BY id").fetchall(),
+                    [(i, decompress_text(t)) for i, t in conn.execute("SELECT serie_id, text FROM series_text ORDER BY serie_id")])
+                conn.close()
+            if contents[1] != contents[2] or len(contents[1][0]) != 12:
+                self.log_fail(f"Séries ou textes différents : {len(contents[1][0])} / {len(contents[2][0])} séries")
+                self.fail()
+
+            self.log_step("Concaténation des fichiers comme l'ETL d'origine (texte brut non vide -> un morceau)...")
+            folder = os.path.join(data_dir, "Serie 00")
+            parts = []
+            for root, _, files in os.walk(folder):
+                for file in files:
+                    if file.endswith('.zip'):
+                        parts.append(read_file_content(os.path.join(root, file)))
+                    elif os.path.getsize(os.path.join(root, file)):
+                        with open(os.path.join(root, file), 'rb') as f:
+                            data = f.read()
+                        try:
+                            parts.append(clean_text_content(data.decode('utf-8')))
+                        except UnicodeDecodeError:
+                            parts.append(clean_text_content(data.decode('latin-1')))
+            title_id = {title: serie_id for serie_id, title in contents[1][0]}
+            if dict(contents[1][1])[title_id["Serie 00"]] != " ".join(parts) or "" not in parts:
+                self.log_fail("Texte d'une série différent de la concaténation d'origine")
+                self.fail()
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.log_success("Mêmes séries, mêmes ids et mêmes textes avec 1 ou 2 workers.")
+
 if __name__ == '__main__':
     # Verbosity 0 pour cacher les "..." de unittest et ne voir que nos prints
     runner = unittest.TextTestRunner(verbosity=0)
@@ -1,93 +1,131 @@
 import os
 import sqlite3
-import re
 import zipfile
 import shutil
-import unicodedata # Pour gérer les accents
-import io # Ajout pour la gestion des zips en mémoire
+import codecs
+import tempfile
+import time
+import argparse
+import hashlib
+import uuid
+from collections import deque
+from contextlib import contextmanager
+import sys
+from concurrent.futures import ProcessPoolExecutor
 
 # --- CONFIGURATION ---
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-DATA_DIR = os.path.join(BASE_DIR, 'data')
-DB_PATH = os.path.join(BASE_DIR, 'database', 'series.db')
+sys.path.insert(0, BASE_DIR)  # Package engine (schéma partagé avec app.py)
 
-# Mots vides (Stop Words)
-STOP_WORDS = set([
-    'le', 'la', 'les', 'de', 'des', 'du', 'un', 'une', 'et', 'à', 'en', 'il', 'elle', 'ils', 'elles',
-    'je', 'tu', 'nous', 'vous', 'ce', 'se', 'que', 'qui', 'dans', 'pour', 'sur', 'pas', 'ne',
-    'mais', 'ou', 'est', 'sont', 'cette', 'par', 'avec', 'tout', 'faire', 'plus', 'mon', 'ton', 'son',
-    'the', 'a', 'an', 'and', 'of', 'to', 'in', 'is', 'it', 'you', 'that', 'he', 'she', 'we', 'they'
-])
+from engine.metrics import render_gauge, write_textfile
+from engine.paths import DATA_DIR, DB_PATH, ETL_METRICS_PATH as METRICS_PATH  # SERIESMINER_DATABASE_DIR, SERIESMINER_DATA_DIR
+from engine.schema import SCHEMA_VERSION, ensure_schema, rebuild_series_stats, write_series_text
+from engine.analyzer import get_analyzer
+from engine.text import remove_accents, strip_srt_lines
 
-def remove_accents(input_str):
+INSERT_BATCH = 100      # Séries insérées par executemany
+PROGRESS_EVERY = 2.0    # Secondes entre deux rapports de progression
+SOURCE_EXTENSIONS = ('.srt', '.txt', '.zip')  # Fichiers lus par l'ETL
+READ_CHUNK = 1024 * 1024          # Octets lus (ou décompressés) à la fois
+SNIFF_BYTES = 64 * 1024           # Préfixe servant à choisir l'encodage
+NESTED_SPOOL = 16 * 1024 * 1024   # Zip imbriqué compressé : en mémoire jusqu'à 16 Mo, sur disque au-delà
+MAX_PENDING = 1024 * 1024         # Texte gardé au plus en attente de la fermeture d'une balise
+SKIP_SRT_LINES = False            # Ignorer numéros de réplique et lignes '-->' (change le texte produit)
+ETL_STAGES = ('read', 'decode', 'clean', 'hash', 'insert')
+
+def clean_text_content(text):
+    """Nettoyage complet d'un texte brut (accents, timestamps, balises, mots vides) -> mots séparés par un espace."""
+    return get_analyzer().clean(text, srt=SKIP_SRT_LINES)
+
+class TextCleaner:
     """
-    Transforme les caractères accentués en caractères normaux.
-    Exemple: 'Île' -> 'Ile', 'été' -> 'ete', 'çà' -> 'ca'
+    Nettoyage incrémental : le texte arrive par morceaux et n'est nettoyé que jusqu'au
+    dernier espace où la coupure est sûre (ni au milieu d'un mot ou d'un timestamp,
+    ni dans une balise <...> pas encore fermée). Résultat identique à clean_text_content
+    sur le texte complet, sans jamais garder ce texte en mémoire.
     """
-    if not isinstance(input_str, str): return str(input_str)
-    # Normalisation NFD (décompose les caractères : é devient e + ')
-    nfkd_form = unicodedata.normalize('NFKD', input_str)
-    # On garde seulement les caractères de base (non combinés)
-    return "".join([c for c in nfkd_form if not unicodedata.combining(c)])
 
-def clean_text_content(text):
+    def __init__(self, srt=SKIP_SRT_LINES):
+        self.srt = srt
+        self.analyzer = get_analyzer()
+        self.tokens = []
+        self.pending = ""
+        self.fed = False  # Du texte brut (même vide une fois nettoyé) a été lu
 
-    # 1. Enlever les accents D'ABORD
-    text = remove_accents(text)
-    
-    # 2. Supprimer les timestamps SRT (00:00:20,000 --> ...)
-    text = re.sub(r'\d{2}:\d{2}:\d{2}[,.]\d{3}.*?', ' ', text)
-    
-    # 3. Supprimer les balises HTML
-    text = re.sub(r'<[^>]+>', ' ', text)
-    
-    # 4. Ne garder que les lettres et chiffres (plus d'accents ici)
-    text = re.sub(r'[^a-zA-Z0-9\s]', ' ', text)
-    
-    # 5. Minuscules et nettoyage espaces
-    text = text.lower().strip()
-    
-    # 6. Filtrer les stop words
-    words = text.split()
-    meaningful_words = [w for w in words if w not in STOP_WORDS and len(w) > 2]
-    
-    return " ".join(meaningful_words)
+    def _last_break(self, text, end=None):
+        """Position juste après le dernier séparateur sûr (fin de ligne seulement en mode SRT)."""
+        end = len(text) if end is None else end
+        if self.srt and len(text) <= MAX_PENDING:
+            return text.rfind('\n', 0, end) + 1
+        return max(text.rfind('\n', 0, end), text.rfind(' ', 0, end)) + 1
 
-def decode_bytes(content_bytes):
-    """Essaie de lire le fichier avec plusieurs encodages."""
-    encodings = ['utf-8', 'latin-1', 'cp1252']
-    for encoding in encodings:
-        try:
-            return content_bytes.decode(encoding)
-        except UnicodeDecodeError:
-            continue
-    return ""
-
-def init_database():
-    """Crée la structure de la base de données (Tables + Index)."""
-    print(" Création de la base de données...")
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    def feed(self, text):
+        self.fed = self.fed or bool(text)
+        pending = self.pending + remove_accents(text)
+        if self.srt:
+            # Lignes complètes retirées tout de suite : le '>' d'un '-->' ne doit pas fermer une balise
+            end = pending.rfind('\n') + 1
+            pending = strip_srt_lines(pending[:end]) + pending[end:]
+        cut = self._last_break(pending)
+        while cut > 0 and len(pending) <= MAX_PENDING:
+            lt = pending.rfind('<', 0, cut)
+            if lt <= pending.rfind('>', 0, cut):
+                break
+            # Balise peut-être ouverte : on coupe avant elle
+            cut = self._last_break(pending, lt)
+        if cut > 0:
+            self.tokens.extend(self.analyzer.tokens(pending[:cut], self.srt, normalized=True))
+        self.pending = pending[cut:]
+
+    def mark(self):
+        """Point de reprise (avant un membre d'archive qui pourrait être relu ou ignoré)."""
+        return len(self.tokens), self.pending, self.fed
+
+    def rollback(self, mark):
+        del self.tokens[mark[0]:]
+        self.pending, self.fed = mark[1], mark[2]
+
+    def result(self):
+        self.tokens.extend(self.analyzer.tokens(self.pending, self.srt, normalized=True))
+        self.pending = ""
+        return " ".join(self.tokens)
+
+def init_database(reset=True, db_path=DB_PATH):
+    """
+    Crée la structure de la base de données (Tables + Index).
+    Avec reset=False (ETL incrémental), les tables existantes sont gardées, dont users et ratings.
+    """
+    print(" Création de la base de données..." if reset else " Ouverture de la base de données...")
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
     
-    conn = sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
-    # On part de zéro pour éviter les conflits
-    cursor.execute("DROP TABLE IF EXISTS ratings")
-    cursor.execute("DROP TABLE IF EXISTS users")
-    cursor.execute("DROP TABLE IF EXISTS series")
+    if reset:
+        # On part de zéro pour éviter les conflits
+        cursor.execute("DROP TABLE IF EXISTS series_changes")
+        cursor.execute("DROP TABLE IF EXISTS etl_manifest")
+        cursor.execute("DROP TABLE IF EXISTS etl_meta")
+        cursor.execute("DROP TABLE IF EXISTS series_stats")
+        cursor.execute("DROP TABLE IF EXISTS ratings")
+        cursor.execute("DROP TABLE IF EXISTS users")
+        cursor.execute("DROP TABLE IF EXISTS series_text")
+        cursor.execute("DROP TABLE IF EXISTS series")
+        cursor.execute("PRAGMA user_version = 0")  # Schéma recréé par ensure_schema
+        conn.commit()
+        cursor.execute("VACUUM")  # Rend au disque les pages de l'ancienne base
     
-    # Table SÉRIES
+    # Table SÉRIES (catalogue seul) ; texte nettoyé compressé dans series_text (cf. ensure_schema)
     cursor.execute('''
-        CREATE TABLE series (
+        CREATE TABLE IF NOT EXISTS series (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            cleaned_text TEXT
+            title TEXT NOT NULL
         )
     ''')
     
     # Table UTILISATEURS
     cursor.execute('''
-        CREATE TABLE users (
+        CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
             password TEXT NOT NULL
@@ -96,7 +134,7 @@ def init_database():
     
     # Table NOTES (Ratings)
     cursor.execute('''
-        CREATE TABLE ratings (
+        CREATE TABLE IF NOT EXISTS ratings (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER,
             serie_id INTEGER,
@@ -105,91 +143,477 @@ def init_database():
             FOREIGN KEY(serie_id) REFERENCES series(id)
         )
     ''')
+
+    # Manifeste de l'ETL : un fichier source (ou membre d'archive) par ligne
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS etl_manifest (
+            serie_name TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER,
+            mtime REAL,
+            content_hash TEXT,
+            PRIMARY KEY (serie_name, path)
+        )
+    ''')
+
+    # Journal des séries modifiées (lu par app.py pour mettre à jour le modèle)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS series_changes (
+            version INTEGER PRIMARY KEY AUTOINCREMENT,
+            serie_id INTEGER NOT NULL,
+            change TEXT NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE TABLE IF NOT EXISTS etl_meta (key TEXT PRIMARY KEY, value TEXT)")
     
     # CRÉATION DES INDEX (Pour accélérer les recherches SQL)
-    cursor.execute("CREATE INDEX idx_user_rating ON ratings(user_id)")
-    cursor.execute("CREATE INDEX idx_serie_rating ON ratings(serie_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_user_rating ON ratings(user_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_serie_rating ON ratings(serie_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_series_title ON series(title)")
     
     # Utilisateur par défaut
-    cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", ('etudiant', '1234'))
-    
+    cursor.execute("INSERT OR IGNORE INTO users (username, password) VALUES (?, ?)", ('etudiant', '1234'))
+
+    # Génération : change à chaque reconstruction complète (le journal repart de zéro)
+    if reset or not cursor.execute("SELECT 1 FROM etl_meta WHERE key = 'generation'").fetchone():
+        cursor.execute("INSERT OR REPLACE INTO etl_meta (key, value) VALUES ('generation', ?)", (uuid.uuid4().hex,))
     conn.commit()
+
+    # Agrégats des notes (series_stats, triggers), une note par (utilisateur, série), table series_text ;
+    # base d'une version précédente : texte déplacé et compressé, empreintes calculées, version du schéma
+    if ensure_schema(conn) and not reset:
+        print(f"   Base mise à niveau (schéma v{SCHEMA_VERSION}).")
     return conn
 
-# --- NOUVELLE FONCTION POUR LES ZIPS IMBRIQUÉS ---
-def read_zip_content(zip_file):
-    """Lit récursivement un objet ZipFile."""
-    text_content = ""
+# Durées cumulées par étape du fichier en cours (une copie par processus worker)
+_stage_seconds = dict.fromkeys(ETL_STAGES, 0.0)
+
+def timed_read(f, size):
+    """f.read(size), compté dans l'étape 'read' (lecture disque et décompression zip)."""
+    start = time.perf_counter()
+    block = f.read(size)
+    _stage_seconds['read'] += time.perf_counter() - start
+    return block
+
+def decode_and_feed(cleaner, decode, block):
+    """Décode un bloc puis le passe au nettoyeur (étapes 'decode' et 'clean')."""
+    start = time.perf_counter()
+    text = decode(block)
+    decoded = time.perf_counter()
+    cleaner.feed(text)
+    _stage_seconds['decode'] += decoded - start
+    _stage_seconds['clean'] += time.perf_counter() - decoded
+
+def stream_text(opener, cleaner):
+    """
+    Décode un fichier texte (ou membre d'archive) par blocs dans le nettoyeur.
+    L'encodage est choisi sur le préfixe : UTF-8, sinon Latin-1. Si un octet invalide
+    apparaît plus loin, le membre est relu en Latin-1 (même résultat qu'un décodage complet).
+    """
+    mark = cleaner.mark()
+    with opener() as f:
+        head = timed_read(f, SNIFF_BYTES)
+        if is_utf8_prefix(head):
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            try:
+                decode_and_feed(cleaner, decoder.decode, head)
+                for block in iter(lambda: timed_read(f, READ_CHUNK), b""):
+                    decode_and_feed(cleaner, decoder.decode, block)
+                decode_and_feed(cleaner, lambda b: decoder.decode(b, final=True), b"")
+                return
+            except UnicodeDecodeError:
+                cleaner.rollback(mark)
+    with opener() as f:
+        for block in iter(lambda: timed_read(f, READ_CHUNK), b""):
+            decode_and_feed(cleaner, lambda b: b.decode('latin-1'), block)
+
+def is_utf8_prefix(head):
+    """Le début du fichier est-il de l'UTF-8 valide (un caractère coupé en fin de bloc est toléré) ?"""
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(head, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+def open_nested_zip(zip_file, name):
+    """
+    Ouvre un zip imbriqué sans le charger en entier : lecture directe s'il est stocké
+    sans compression, sinon copie dans un fichier temporaire (en mémoire jusqu'à NESTED_SPOOL).
+    """
+    if zip_file.getinfo(name).compress_type == zipfile.ZIP_STORED:
+        return zip_file.open(name)
+    spool = tempfile.SpooledTemporaryFile(max_size=NESTED_SPOOL)
+    start = time.perf_counter()
+    with zip_file.open(name) as zf_nested:
+        shutil.copyfileobj(zf_nested, spool, READ_CHUNK)
+    spool.seek(0)
+    _stage_seconds['read'] += time.perf_counter() - start
+    return spool
+
+# --- LECTURE DES ZIPS IMBRIQUÉS (en flux) ---
+def read_zip_content(zip_file, cleaner, members=None, prefix=""):
+    """
+    Lit récursivement un objet ZipFile, membre par membre, dans le nettoyeur.
+    Si `members` est une liste, chaque membre lu y est ajouté pour le manifeste
+    (chemin 'archive.zip::membre', taille, CRC).
+    """
     for name in zip_file.namelist():
         # Si c'est un fichier texte
         if name.endswith(('.srt', '.txt')) and '__MACOSX' not in name:
-            with zip_file.open(name) as zf:
-                text_content += " " + decode_bytes(zf.read())
+            cleaner.feed(" ")
+            stream_text(lambda: zip_file.open(name), cleaner)
+            if members is not None:
+                info = zip_file.getinfo(name)
+                members.append((prefix + name, info.file_size, None, f"crc32:{info.CRC:08x}"))
         
         # Si c'est un ZIP imbriqué (Zip dans Zip)
         elif name.endswith('.zip'):
+            mark, listed = cleaner.mark(), len(members) if members is not None else 0
             try:
-                with zip_file.open(name) as zf_nested:
-                    # On lit le zip imbriqué en mémoire (BytesIO)
-                    nested_data = io.BytesIO(zf_nested.read())
+                cleaner.feed(" ")
+                with open_nested_zip(zip_file, name) as nested_data:
                     with zipfile.ZipFile(nested_data) as z_nested:
-                        text_content += " " + read_zip_content(z_nested)
-            except:
-                pass
-    return text_content
-
-def process_etl(conn):
-    """Parcourt les dossiers, nettoie et insère."""
-    print("Traitement des fichiers (ETL)...")
-    
-    if not os.path.exists(DATA_DIR):
-        print(f"❌ Dossier {DATA_DIR} introuvable.")
-        return
+                        read_zip_content(z_nested, cleaner, members, prefix + name + "::")
+            except Exception:
+                # Zip imbriqué illisible : ignoré en entier (texte et membres déjà notés au manifeste)
+                cleaner.rollback(mark)
+                if members is not None:
+                    del members[listed:]
 
-    cursor = conn.cursor()
-    series_dirs = [d for d in os.listdir(DATA_DIR) if os.path.isdir(os.path.join(DATA_DIR, d))]
-    
-    count = 0
-    for serie_name in series_dirs:
-        serie_path = os.path.join(DATA_DIR, serie_name)
-        full_text = []
+def read_file_content(file_path, members=None, prefix=""):
+    """
+    Lit un fichier texte ou une archive ZIP -> texte nettoyé (lu en flux, jamais en entier),
+    ou None si le fichier ne donne aucun texte brut (vide, illisible, archive sans sous-titres).
+    """
+    cleaner = TextCleaner()
+    file = os.path.basename(file_path)
+    listed = len(members) if members is not None else 0
+    try:
+        # Lecture Fichier
+        if file.endswith(('.srt', '.txt')):
+            stream_text(lambda: open(file_path, 'rb'), cleaner)
+        # Lecture ZIP
+        elif file.endswith('.zip'):
+            with zipfile.ZipFile(file_path, 'r') as z:
+                # Appel de la fonction récursive ici
+                read_zip_content(z, cleaner, members, prefix)
+    except Exception:
+        if members is not None:
+            del members[listed:]  # Membres lus avant l'erreur : leur texte n'est pas gardé
+        return None # Fichier illisible : ignoré en entier
+    return cleaner.result() if cleaner.fed else None
+
+def file_hash(file_path):
+    """Empreinte SHA-1 du contenu d'un fichier (lecture par blocs)."""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
+def clean_file(task):
+    """
+    Tâche d'un worker : (série, chemin, chemin relatif)
+    -> (série, texte nettoyé ou None, octets lus, entrées du manifeste, durées par étape).
+    """
+    serie_name, file_path, rel_path = task
+    _stage_seconds.update(dict.fromkeys(ETL_STAGES, 0.0))
+    if file_path is None: # Dossier sans fichier
+        return serie_name, None, 0, [], dict(_stage_seconds)
+    try:
+        stat = os.stat(file_path)
+        start = time.perf_counter()
+        entries = [(rel_path, stat.st_size, stat.st_mtime, file_hash(file_path))]
+        _stage_seconds['hash'] += time.perf_counter() - start
+    except OSError:
+        return serie_name, None, 0, [], dict(_stage_seconds)
+    text = read_file_content(file_path, entries, rel_path + "::")
+    return serie_name, text, stat.st_size, entries, dict(_stage_seconds)
+
+def scan_serie(serie_path):
+    """Fichiers sources d'une série -> {chemin relatif: (taille, date de modification)}."""
+    found = {}
+    # Parcours récursif
+    for root, dirs, files in os.walk(serie_path):
+        for file in files:
+            if file.endswith(SOURCE_EXTENSIONS):
+                file_path = os.path.join(root, file)
+                stat = os.stat(file_path)
+                found[os.path.relpath(file_path, serie_path)] = (stat.st_size, stat.st_mtime)
+    return found
+
+def list_etl_tasks(series_dirs, data_dir=DATA_DIR):
+    """Liste ordonnée des fichiers à traiter, série par série."""
+    for serie_name in series_dirs:
+        serie_path = os.path.join(data_dir, serie_name)
+        found = False
         # Parcours récursif
         for root, dirs, files in os.walk(serie_path):
             for file in files:
-                raw_content = ""
-                file_path = os.path.join(root, file)
-                
-                # Lecture Fichier
-                if file.endswith(('.srt', '.txt')):
-                    try:
-                        with open(file_path, 'rb') as f:
-                            raw_content = decode_bytes(f.read())
-                    except: pass
-                # Lecture ZIP
-                elif file.endswith('.zip'):
-                    try:
-                        with zipfile.ZipFile(file_path, 'r') as z:
-                            # Appel de la fonction récursive ici
-                            raw_content += read_zip_content(z)
-                    except: pass
-                
-                if raw_content:
-                    full_text.append(clean_text_content(raw_content))
+                if file.endswith(SOURCE_EXTENSIONS):
+                    found = True
+                    file_path = os.path.join(root, file)
+                    yield serie_name, file_path, os.path.relpath(file_path, serie_path)
+        if not found:
+            yield serie_name, None, None
+
+def load_manifest(conn):
+    """Manifeste de l'ETL précédent -> {série: {chemin: (taille, mtime, empreinte)}}."""
+    manifest = {}
+    for serie_name, path, size, mtime, content_hash in conn.execute(
+            "SELECT serie_name, path, size, mtime, content_hash FROM etl_manifest"):
+        manifest.setdefault(serie_name, {})[path] = (size, mtime, content_hash)
+    return manifest
+
+def is_unchanged(scanned, previous):
+    """Compare taille et date des fichiers (les membres d'archives suivent leur archive)."""
+    files = {path: (size, mtime) for path, (size, mtime, _) in previous.items() if '::' not in path}
+    return scanned == files
+
+def ordered_results(executor, func, tasks, window):
+    """
+    Comme executor.map, mais avec au plus `window` tâches en vol :
+    les résultats arrivent dans l'ordre et la mémoire reste bornée.
+    """
+    pending = deque()
+    for task in tasks:
+        pending.append(executor.submit(func, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+class EtlProgress:
+    """Compteurs de débit de l'ETL (fichiers/s et Mo/s)."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.files = 0
+        self.bytes = 0
+        self.stages = dict.fromkeys(ETL_STAGES, 0.0)  # Secondes par étape (cumulées sur les workers)
+
+    def add(self, size, stages=None):
+        self.files += 1
+        self.bytes += size
+        for name, seconds in (stages or {}).items():
+            self.stages[name] += seconds
+        now = time.perf_counter()
+        if now - self.last_report >= PROGRESS_EVERY:
+            self.last_report = now
+            print(f"   ... {self.report()}")
+
+    def report(self):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        return (f"{self.files} fichiers, {self.bytes / 1e6:.1f} Mo en {elapsed:.1f} s "
+                f"({self.files / elapsed:.1f} fichiers/s, {self.bytes / 1e6 / elapsed:.2f} Mo/s)")
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - start
+
+    def stage_report(self):
+        return ", ".join(f"{name} {seconds:.2f} s" for name, seconds in self.stages.items())
+
+    def metric_lines(self):
+        """Durées du dernier ETL au format texte Prometheus (fichier lu par /metrics)."""
+        elapsed = time.perf_counter() - self.start
+        return (render_gauge('seriesminer_etl_stage_seconds',
+                             "Durée par étape du dernier ETL (secondes cumulées sur les workers).",
+                             self.stages, label='stage')
+                + render_gauge('seriesminer_etl_seconds', "Durée totale du dernier ETL.", elapsed)
+                + render_gauge('seriesminer_etl_files', "Fichiers lus par le dernier ETL.", self.files)
+                + render_gauge('seriesminer_etl_bytes', "Octets lus par le dernier ETL.", self.bytes)
+                + render_gauge('seriesminer_etl_last_run_timestamp', "Fin du dernier ETL (epoch).", time.time()))
+
+class SeriesWriter:
+    """
+    Unique écrivain de l'ETL : insère les séries par lots dans une transaction.
+    En mode incrémental, met à jour les séries existantes (par titre), ne touche
+    pas aux séries inchangées et note chaque modification dans series_changes.
+    """
+
+    def __init__(self, conn, manifest=None):
+        self.conn = conn
+        self.manifest = manifest  # None = reconstruction complète
+        self.batch = []
+        self.manifest_batch = []
+        self.changed = 0
+        self.deleted = 0
+
+    def write(self, serie_name, final_text, entries):
+        if self.manifest is not None:
+            return self._upsert(serie_name, final_text, entries)
 
         # Insertion
-        final_text = " ".join(full_text)
         if len(final_text) > 50: # On ignore les dossiers vides
-            cursor.execute("INSERT INTO series (title, cleaned_text) VALUES (?, ?)", (serie_name, final_text))
-            conn.commit()
+            self.batch.append((serie_name, final_text))
             print(f"   ✅ {serie_name} indexée.")
-            count += 1
         else:
             print(f"   ⚠️ {serie_name} ignorée (vide).")
+        self.manifest_batch.extend((serie_name,) + e for e in entries)
+        if len(self.batch) >= INSERT_BATCH:
+            self.flush()
+
+    def _upsert(self, serie_name, final_text, entries):
+        previous = {path: h for path, (_, _, h) in self.manifest.get(serie_name, {}).items()}
+        row = self.conn.execute("SELECT id FROM series WHERE title = ?", (serie_name,)).fetchone()
+        same_content = previous == {e[0]: e[3] for e in entries}
+
+        if same_content and (row is not None or len(final_text) <= 50):
+            print(f"   = {serie_name} inchangée (dates seules).")
+        elif len(final_text) > 50:
+            if row is not None:
+                serie_id = row[0]
+            else:
+                serie_id = self.conn.execute("INSERT INTO series (title) VALUES (?)", (serie_name,)).lastrowid
+            write_series_text(self.conn, [(serie_id, final_text)])
+            self.conn.execute("INSERT INTO series_changes (serie_id, change) VALUES (?, 'upsert')", (serie_id,))
+            print(f"   ✅ {serie_name} {'mise à jour' if row else 'ajoutée'}.")
+            self.changed += 1
+        else:
+            print(f"   ⚠️ {serie_name} ignorée (vide).")
+            if row is not None:
+                self.remove(serie_name)
+                return
+
+        self.conn.execute("DELETE FROM etl_manifest WHERE serie_name = ?", (serie_name,))
+        self.manifest_batch.extend((serie_name,) + e for e in entries)
+
+    def remove(self, serie_name):
+        """
+        Supprime une série disparue du dossier data, avec ses notes (même transaction) : ni la
+        recommandation, ni le filtrage collaboratif, ni series_stats (triggers) ne gardent d'id inconnu.
+        """
+        for (serie_id,) in self.conn.execute("SELECT id FROM series WHERE title = ?", (serie_name,)).fetchall():
+            self.conn.execute("DELETE FROM ratings WHERE serie_id = ?", (serie_id,))
+            self.conn.execute("DELETE FROM series WHERE id = ?", (serie_id,))
+            self.conn.execute("INSERT INTO series_changes (serie_id, change) VALUES (?, 'delete')", (serie_id,))
+            self.deleted += 1
+        self.conn.execute("DELETE FROM etl_manifest WHERE serie_name = ?", (serie_name,))
+        print(f"   🗑️ {serie_name} supprimée.")
+
+    def flush(self):
+        if self.batch:
+            ids = [self.conn.execute("INSERT INTO series (title) VALUES (?)", (title,)).lastrowid
+                   for title, _ in self.batch]
+            write_series_text(self.conn, [(serie_id, text) for serie_id, (_, text) in zip(ids, self.batch)])
+            self.batch.clear()
+        if self.manifest_batch:
+            self.conn.executemany("INSERT OR REPLACE INTO etl_manifest (serie_name, path, size, mtime, content_hash) "
+                                  "VALUES (?, ?, ?, ?, ?)", self.manifest_batch)
+            self.manifest_batch.clear()
+
+def process_etl(conn, workers=1, incremental=False, data_dir=DATA_DIR, metrics_path=METRICS_PATH):
+    """
+    Parcourt les dossiers, nettoie et insère.
+    Avec workers > 1, les fichiers sont nettoyés en parallèle (pool de processus)
+    et un seul écrivain insère les séries par lots dans une transaction.
+    En mode incrémental, seules les séries dont les fichiers ont changé sont retraitées.
+    Durées par étape écrites dans `metrics_path` (None : pas de fichier).
+    Retourne les compteurs de débit et les durées par étape (EtlProgress).
+    """
+    print(f"Traitement des fichiers (ETL{' incrémental' if incremental else ''}, {workers} worker(s))...")
+    
+    if not os.path.exists(data_dir):
+        print(f"❌ Dossier {data_dir} introuvable.")
+        return
+
+    series_dirs = [d for d in os.listdir(data_dir) if os.path.isdir(os.path.join(data_dir, d))]
+    writer = SeriesWriter(conn, load_manifest(conn) if incremental else None)
+
+    if incremental:
+        # Séries disparues : présentes en base ou au manifeste mais plus sur le disque
+        known = set(writer.manifest) | {r[0] for r in conn.execute("SELECT title FROM series")}
+        for serie_name in sorted(known - set(series_dirs)):
+            writer.remove(serie_name)
+        # Séries inchangées : même taille et même date pour chaque fichier, et toujours en base
+        titles = {r[0] for r in conn.execute("SELECT title FROM series")}
+        todo = [d for d in series_dirs
+                if not (is_unchanged(scan_serie(os.path.join(data_dir, d)), writer.manifest.get(d, {}))
+                        and (d in titles or not writer.manifest.get(d)))]
+        print(f"   {len(series_dirs) - len(todo)} série(s) inchangée(s), {len(todo)} à traiter.")
+        series_dirs = todo
+
+    tasks = list_etl_tasks(series_dirs, data_dir)
+    progress = EtlProgress()
+
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    if executor:
+        results = ordered_results(executor, clean_file, tasks, window=workers * 4)
+    else:
+        results = map(clean_file, tasks)
 
-    print(f"\n SUCCÈS ! {count} séries prêtes dans la base de données.")
+    try:
+        # Une seule transaction pour toutes les insertions
+        current, full_text, entries = None, [], []
+        for serie_name, cleaned, size, file_entries, stages in results:
+            if serie_name != current:
+                if current is not None:
+                    with progress.timer('insert'):
+                        writer.write(current, " ".join(full_text), entries)
+                current, full_text, entries = serie_name, [], []
+            if cleaned is not None: # Comme la version séquentielle d'origine : texte brut non vide,
+                full_text.append(cleaned) # même sans mot une fois nettoyé (séparateur gardé)
+            entries.extend(file_entries)
+            progress.add(size, stages)
+        with progress.timer('insert'):
+            if current is not None:
+                writer.write(current, " ".join(full_text), entries)
+            writer.flush()
+            conn.commit()
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+    print(f"\n   Débit : {progress.report()}")
+    print(f"   Étapes : {progress.stage_report()}")
+    if metrics_path:
+        write_textfile(metrics_path, progress.metric_lines())
+    if incremental:
+        print(f"   {writer.changed} série(s) ajoutée(s)/modifiée(s), {writer.deleted} supprimée(s).")
+    total = conn.execute("SELECT COUNT(*) FROM series").fetchone()[0]
+    print(f"\n SUCCÈS ! {total} séries prêtes dans la base de données.")
+    return progress
 
 if __name__ == '__main__':
-    db_conn = init_database()
-    process_etl(db_conn)
-    db_conn.close()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ETL SeriesMiner : nettoyage des sous-titres vers SQLite.")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Processus de nettoyage en parallèle (1 = séquentiel)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Ne retraite que les séries modifiées (garde users et ratings)")
+    parser.add_argument('--rebuild-stats', action='store_true',
+                        help="Recalcule seulement la table series_stats depuis ratings, sans ETL")
+    parser.add_argument('--migrate', action='store_true',
+                        help="Met seulement à niveau le schéma d'une base existante, sans ETL (avant de lancer app.py)")
+    args = parser.parse_args()
+
+    if args.migrate:
+        if not os.path.exists(DB_PATH):
+            print(f"❌ Base {DB_PATH} absente : lancez l'ETL complet.")
+            sys.exit(1)
+        start = time.perf_counter()
+        init_database(reset=False).close()
+        print(f"✅ Schéma v{SCHEMA_VERSION} à jour ({time.perf_counter() - start:.2f} s).")
+        sys.exit(0)
+
+    if args.rebuild_stats:
+        db_conn = init_database(reset=False)
+        start = time.perf_counter()
+        count = rebuild_series_stats(db_conn)
+        db_conn.commit()
+        db_conn.close()
+        print(f"✅ series_stats recalculée : {count} séries notées ({time.perf_counter() - start:.2f} s).")
+        sys.exit(0)
+
+    db_conn = init_database(reset=not args.incremental)
+    process_etl(db_conn, workers=max(1, args.workers), incremental=args.incremental)
+    db_conn.close()
+
+    # Pré-calcul du modèle pour que app.py démarre sans ré-entraînement
+    from build_model import build_model
+    build_model(DB_PATH)
\ No newline at end of file